@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks and load-testing tools for falcon_marshmallow
+
+These are not part of the distributed package. Run them from the
+repository root, e.g. ``python -m benchmarks.loadtest --help``.
+"""
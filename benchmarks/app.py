@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Sample Falcon application used by the benchmarks
+
+The application mirrors a typical ReST API: a collection endpoint that
+dumps many objects at once, an item endpoint, and a POST endpoint that
+loads and validates a body. Everything is kept in memory so that the
+numbers reflect (de)serialization and framework overhead rather than
+I/O.
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from datetime import date
+
+from typing import Any
+
+# Third party
+from falcon import API
+from marshmallow import fields, Schema, validate
+
+# Local
+from falcon_marshmallow import Marshmallow
+
+
+class Philosopher(Schema):
+    """Philosopher schema"""
+
+    id = fields.Integer()
+    name = fields.String(required=True, validate=validate.Length(max=200))
+    birth = fields.Date()
+    death = fields.Date()
+    schools = fields.List(fields.String())
+    works = fields.List(fields.String())
+
+
+def make_philosopher(phil_id):
+    # type: (int) -> dict
+    """Return a philosopher record suitable for dumping"""
+    return {
+        "id": phil_id,
+        "name": "Søren Kierkegaard %s" % phil_id,
+        "birth": date(1813, 5, 5),
+        "death": date(1855, 11, 11),
+        "schools": ["existentialism"],
+        "works": ["Fear and Trembling", "Either/Or", "The Sickness unto Death"],
+    }
+
+
+def make_payload(phil_id):
+    # type: (int) -> dict
+    """Return a philosopher as a client would POST it"""
+    phil = make_philosopher(phil_id)
+    phil.pop("id")
+    phil["birth"] = phil["birth"].isoformat()
+    phil["death"] = phil["death"].isoformat()
+    return phil
+
+
+class PhilosopherResource:
+    """A single philosopher"""
+
+    schema = Philosopher()
+
+    def on_get(self, req, resp, phil_id):
+        """Get a philosopher"""
+        req.context["result"] = make_philosopher(int(phil_id))
+
+
+class PhilosopherCollection:
+    """A collection of philosophers"""
+
+    post_schema = Philosopher()
+    get_schema = Philosopher(many=True)
+
+    def __init__(self, page_size=50):
+        # type: (int) -> None
+        """Pre-build the page of results returned by GET"""
+        self._page = [make_philosopher(i) for i in range(page_size)]
+
+    def on_get(self, req, resp):
+        """List philosophers"""
+        req.context["result"] = self._page
+
+    def on_post(self, req, resp):
+        """Create a philosopher"""
+        created = dict(req.context["json"])
+        created["id"] = 1
+        req.context["result"] = created
+
+
+def create_app(page_size=50, **middleware_kwargs):
+    # type: (int, **Any) -> API
+    """Create the sample application
+
+    :param page_size: the number of philosophers returned by a GET
+        against the collection
+    :param middleware_kwargs: keyword arguments passed through to the
+        ``Marshmallow`` middleware
+    """
+    app = API(middleware=[Marshmallow(**middleware_kwargs)])
+    app.add_route("/philosophers", PhilosopherCollection(page_size))
+    app.add_route("/philosophers/{phil_id}", PhilosopherResource())
+    return app
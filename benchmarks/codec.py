@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the codec pipeline used for schema (de)serialization
+
+Show that, for resources with schemas, request bodies are decoded and
+response bodies are encoded exactly once per request, both with the
+``json_module`` configured on the ``Marshmallow`` middleware, and compare
+the cost of encoding dumped data with that module against encoding it
+with the schema's default ``render_module`` (the stdlib ``json`` module).
+
+Example::
+
+    python -m benchmarks.codec --iterations 2000
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+
+from typing import Any, Callable, Dict, List, Optional
+
+# Third party
+import simplejson
+from falcon import testing
+
+# Local
+from benchmarks.app import (
+    Philosopher,
+    create_app,
+    make_payload,
+    make_philosopher,
+)
+
+
+class CountingCodec:
+    """Wrap a json module, counting calls to ``loads()`` and ``dumps()``"""
+
+    def __init__(self, module):
+        # type: (Any) -> None
+        """Wrap the given module"""
+        self._module = module
+        self.JSONDecodeError = getattr(module, "JSONDecodeError", ValueError)
+        self.calls = {"loads": 0, "dumps": 0}  # type: Dict[str, int]
+
+    def loads(self, *args, **kwargs):
+        # type: (*Any, **Any) -> Any
+        """Decode with the wrapped module"""
+        self.calls["loads"] += 1
+        return self._module.loads(*args, **kwargs)
+
+    def dumps(self, *args, **kwargs):
+        # type: (*Any, **Any) -> Any
+        """Encode with the wrapped module"""
+        self.calls["dumps"] += 1
+        return self._module.dumps(*args, **kwargs)
+
+    def reset(self):
+        # type: () -> None
+        """Reset call counts"""
+        self.calls = {"loads": 0, "dumps": 0}
+
+
+def _peak_allocation(func):
+    # type: (Callable[[], Any]) -> int
+    """Return the peak bytes allocated while calling ``func`` once"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def codec_calls(page_size):
+    # type: (int) -> List[tuple]
+    """Count codec calls made by the middleware for each kind of request"""
+    codec = CountingCodec(simplejson)
+    client = testing.TestClient(
+        create_app(page_size=page_size, json_module=codec)
+    )
+    body = simplejson.dumps(make_payload(1))
+    rows = []
+    for name, call in (
+        ("GET item", lambda: client.simulate_get("/philosophers/1")),
+        ("GET list", lambda: client.simulate_get("/philosophers")),
+        ("POST", lambda: client.simulate_post("/philosophers", body=body)),
+    ):
+        codec.reset()
+        result = call()
+        rows.append(
+            (
+                name,
+                result.status_code,
+                codec.calls["loads"],
+                codec.calls["dumps"],
+            )
+        )
+    return rows
+
+
+def encode_costs(page_size, iterations):
+    # type: (int, int) -> List[tuple]
+    """Compare encoding dumped data with each available backend"""
+    schema = Philosopher(many=True)
+    page = [make_philosopher(i) for i in range(page_size)]
+    candidates = [
+        ("schema.dumps (render_module=json)", lambda: schema.dumps(page)),
+        ("json.dumps(schema.dump())", lambda: json.dumps(schema.dump(page))),
+        (
+            "simplejson.dumps(schema.dump())",
+            lambda: simplejson.dumps(schema.dump(page)),
+        ),
+    ]
+    rows = []
+    for name, func in candidates:
+        seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+        rows.append(
+            (name, seconds / iterations * 1e6, _peak_allocation(func) / 1024.0)
+        )
+    return rows
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print("Codec calls per request (json_module=CountingCodec(simplejson))")
+    print("%-10s %6s %6s %6s" % ("request", "status", "loads", "dumps"))
+    for row in codec_calls(args.page_size):
+        print("%-10s %6d %6d %6d" % row)
+
+    print("")
+    print("Encoding a page of %d dumped objects" % args.page_size)
+    print("%-36s %12s %12s" % ("path", "us/call", "peak KiB"))
+    for row in encode_costs(args.page_size, args.iterations):
+        print("%-36s %12.1f %12.1f" % row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
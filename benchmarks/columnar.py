@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Benchmark loading large arrays of records column by column
+
+Compare loading a large ``many=True`` payload of flat records with
+Marshmallow alone and with ``ColumnarLoader``, for several fractions of
+invalid records, checking that both produce the same data and errors.
+
+Example::
+
+    python -m benchmarks.columnar --records 100000
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import random
+import sys
+import timeit
+
+from typing import Any, Callable, List, Optional, Tuple
+
+# Third party
+from marshmallow import Schema, ValidationError, fields, validate
+
+# Local
+from falcon_marshmallow.columnar import ColumnarLoader
+
+
+class Reading(Schema):
+    """A sensor reading, as posted in bulk by a telemetry client"""
+
+    sensor = fields.String(required=True, validate=validate.Length(1, 16))
+    value = fields.Float(
+        required=True, validate=validate.Range(min=-1000, max=1000)
+    )
+    sequence = fields.Integer(required=True, validate=validate.Range(min=0))
+    unit = fields.String(
+        validate=validate.OneOf(["C", "F", "K"]), load_default="C"
+    )
+    calibrated = fields.Boolean(load_default=False)
+
+
+def make_records(count, invalid_rate, seed=0):
+    # type: (int, float, int) -> List[dict]
+    """Return raw readings, about ``invalid_rate`` of which are invalid"""
+    rand = random.Random(seed)
+    records = []
+    for index in range(count):
+        record = {
+            "sensor": "sensor-%d" % (index % 500),
+            "value": rand.uniform(-50.0, 150.0),
+            "sequence": index,
+            "unit": rand.choice(["C", "F", "K"]),
+            "calibrated": rand.random() < 0.5,
+        }
+        if rand.random() < invalid_rate:
+            record["value"] = 5000.0
+        records.append(record)
+    return records
+
+
+def _outcome(load):
+    # type: (Callable[[], Any]) -> Tuple[Any, Any]
+    """Return the data and errors of a load"""
+    try:
+        return load(), None
+    except ValidationError as exc:
+        return exc.valid_data, exc.messages
+
+
+def compare(count, invalid_rate, repeat):
+    # type: (int, float, int) -> Tuple[float, float, int]
+    """Time both loaders on the same payload
+
+    :return: the best seconds for Marshmallow and for the loader, and the
+        number of invalid records
+    """
+    schema = Reading(many=True)
+    loader = ColumnarLoader()
+    records = make_records(count, invalid_rate)
+
+    def plain():
+        # type: () -> Any
+        return _outcome(lambda: schema.load(records))
+
+    def columnar():
+        # type: () -> Any
+        return _outcome(lambda: loader.load(schema, records))
+
+    expected, actual = plain(), columnar()
+    if expected != actual:
+        raise AssertionError("ColumnarLoader disagrees with marshmallow")
+    errors = len(expected[1] or ())
+    return (
+        min(timeit.repeat(plain, number=1, repeat=repeat)),
+        min(timeit.repeat(columnar, number=1, repeat=repeat)),
+        errors,
+    )
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print("Loading %d records" % args.records)
+    print(
+        "%-8s %8s %14s %14s %8s"
+        % ("invalid", "errors", "marshmallow s", "columnar s", "speedup")
+    )
+    for rate in (0.0, 0.01, 0.1, 0.5):
+        plain, columnar, errors = compare(args.records, rate, args.repeat)
+        print(
+            "%-8s %8d %14.3f %14.3f %7.1fx"
+            % ("%g%%" % (rate * 100), errors, plain, columnar, plain / columnar)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Benchmark dumping many objects with and without a DumpAccelerator
+
+Compare ``schema.dump()`` with ``DumpAccelerator.dump()`` for a page of
+rows held in each kind of object a list endpoint commonly returns,
+checking that both produce the same data.
+
+Example::
+
+    python -m benchmarks.dump --rows 20000
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import sys
+import timeit
+from collections import namedtuple
+
+from typing import Any, Callable, List, Optional
+
+# Third party
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow.accelerator import DumpAccelerator
+
+
+class Row(Schema):
+    """A typical ORM row"""
+
+    id = fields.Integer()
+    name = fields.String()
+    email = fields.String()
+    balance = fields.Float()
+    active = fields.Boolean()
+    group_id = fields.Integer(data_key="groupId")
+
+
+COLUMNS = ("id", "name", "email", "balance", "active", "group_id")
+
+
+class PlainRow:
+    """A row as a plain object, like most ORM models"""
+
+    def __init__(self, *values):
+        # type: (*Any) -> None
+        """Set each column"""
+        for name, value in zip(COLUMNS, values):
+            setattr(self, name, value)
+
+
+class SlottedRow:
+    """A row as an object with __slots__"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, *values):
+        # type: (*Any) -> None
+        """Set each column"""
+        for name, value in zip(COLUMNS, values):
+            setattr(self, name, value)
+
+
+TupleRow = namedtuple("TupleRow", COLUMNS)  # type: ignore
+
+KINDS = [
+    ("dict", lambda *values: dict(zip(COLUMNS, values))),
+    ("object", PlainRow),
+    ("__slots__", SlottedRow),
+    ("namedtuple", TupleRow),
+]  # type: List[Any]
+
+
+def make_rows(kind, count):
+    # type: (Callable[..., Any], int) -> List[Any]
+    """Return ``count`` rows of the given kind"""
+    return [
+        kind(i, "user %d" % i, "u%d@example.com" % i, i * 1.5, i % 2 == 0, i)
+        for i in range(count)
+    ]
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    schema = Row(many=True)
+    accelerator = DumpAccelerator()
+    print("Dumping %d rows" % args.rows)
+    print(
+        "%-12s %14s %14s %8s"
+        % ("kind", "marshmallow s", "accelerated s", "speedup")
+    )
+    for name, kind in KINDS:
+        rows = make_rows(kind, args.rows)
+        if schema.dump(rows) != accelerator.dump(schema, rows):
+            raise AssertionError("DumpAccelerator disagrees with marshmallow")
+        plain = min(
+            timeit.repeat(
+                lambda: schema.dump(rows), number=1, repeat=args.repeat
+            )
+        )
+        fast = min(
+            timeit.repeat(
+                lambda: accelerator.dump(schema, rows),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print("%-12s %14.3f %14.3f %7.1fx" % (name, plain, fast, plain / fast))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
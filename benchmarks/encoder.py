@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Benchmark encoding rich types without a schema
+
+Compare encoding a page of records holding datetimes, UUIDs, enums and
+sets with the ``TypeDispatchEncoder`` used by the ``Marshmallow``
+middleware for schema-less results, with a naive ``isinstance()`` chain
+as the ``default`` hook, and with dumping the records through a schema
+first, as resources had to before.
+
+Example::
+
+    python -m benchmarks.encoder --page-size 500
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import datetime
+import sys
+import timeit
+import uuid
+from enum import Enum
+
+from typing import Any, Dict, List, Optional
+
+# Third party
+import simplejson
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow.encoding import default_encoder
+
+
+class Status(Enum):
+    """An order status"""
+
+    OPEN = "open"
+    SHIPPED = "shipped"
+
+
+class Order(Schema):
+    """A schema for the same records"""
+
+    id = fields.UUID()
+    placed = fields.DateTime()
+    due = fields.Date()
+    status = fields.Function(lambda obj: obj["status"].value)
+    tags = fields.Function(lambda obj: list(obj["tags"]))
+    total = fields.Float()
+
+
+def make_orders(count):
+    # type: (int) -> List[Dict[str, Any]]
+    """Return ``count`` records holding rich types"""
+    placed = datetime.datetime(2020, 1, 1, 12, 0, 0)
+    return [
+        {
+            "id": uuid.UUID(int=index),
+            "placed": placed + datetime.timedelta(minutes=index),
+            "due": placed.date() + datetime.timedelta(days=index % 30),
+            "status": Status.OPEN if index % 2 else Status.SHIPPED,
+            "tags": {"priority"} if index % 5 == 0 else set(),
+            "total": index * 1.25,
+        }
+        for index in range(count)
+    ]
+
+
+def isinstance_default(obj):
+    # type: (Any) -> Any
+    """A typical hand-written default hook"""
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(repr(obj))
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    orders = make_orders(args.page_size)
+    schema = Order(many=True)
+    candidates = [
+        (
+            "dumps(default=TypeDispatchEncoder)",
+            lambda: simplejson.dumps(orders, default=default_encoder),
+        ),
+        (
+            "dumps(default=isinstance chain)",
+            lambda: simplejson.dumps(orders, default=isinstance_default),
+        ),
+        (
+            "dumps(schema.dump())",
+            lambda: simplejson.dumps(schema.dump(orders)),
+        ),
+    ]
+
+    print("Encoding %d records with rich types" % args.page_size)
+    print("%-38s %12s" % ("path", "us/page"))
+    for name, func in candidates:
+        seconds = min(timeit.repeat(func, number=args.iterations, repeat=3))
+        print("%-38s %12.1f" % (name, seconds / args.iterations * 1e6))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Measure the cold-start import cost of falcon_marshmallow
+
+Each statement is run in a fresh interpreter with ``python -X importtime``
+(Python 3.7+), and the time it spends importing modules, beyond those
+imported at interpreter startup, is reported along with the number of
+modules loaded.
+
+Example::
+
+    python -m benchmarks.importtime --repeat 5
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import subprocess
+import sys
+
+from typing import Dict, List, Optional, Tuple
+
+STATEMENTS = (
+    "import falcon_marshmallow",
+    "from falcon_marshmallow import __version__",
+    "from falcon_marshmallow import LoadShedder",
+    "from falcon_marshmallow import Marshmallow",
+    "from falcon_marshmallow import Marshmallow; Marshmallow()",
+)
+
+
+def measure(statement):
+    # type: (str) -> Tuple[int, Dict[str, int]]
+    """Run a statement in a fresh interpreter and record its imports
+
+    :param statement: the Python code to run
+
+    :return: the total time spent in top-level imports, in microseconds,
+        and a mapping of each module imported to its cumulative time
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    total = 0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative)
+        # Nested imports are indented beyond the single separating space
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total, modules
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    baseline = min(measure("pass")[0] for _ in range(args.repeat))
+    print("Interpreter startup imports: %.1f ms" % (baseline / 1000.0))
+    print("%-58s %10s %8s" % ("statement", "ms", "modules"))
+    for statement in STATEMENTS:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        best = min(total for total, _ in runs) - baseline
+        print("%-58s %10.1f %8d" % (statement, best / 1000.0, len(runs[0][1])))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+"""Multi-process load-test harness for falcon_marshmallow
+
+Serve the sample application from ``benchmarks.app`` with a local WSGI
+server forked across N worker processes, drive it with a concurrent
+in-process load generator, and report:
+
+* throughput (requests/second)
+* an HDR-style latency histogram (log-linear buckets, ~1% precision)
+* server CPU time per request, from ``/proc/<pid>/stat``
+* worker RSS over time, from ``/proc/<pid>/status``
+
+Only the standard library is used, so the harness runs fully offline
+on a plain Linux box. Unlike ``falcon.testing`` micro-benchmarks, this
+exercises socket I/O, contention between worker processes, serialization
+under the GIL (with ``--threads``), and memory drift across many
+thousands of requests.
+
+Example::
+
+    python -m benchmarks.loadtest --workers 4 --concurrency 16 \\
+        --requests 20000 --scenario mixed
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from http.client import HTTPConnection
+from multiprocessing.process import BaseProcess
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import (
+    WSGIRequestHandler,
+    WSGIServer,
+    make_server,
+)
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Local
+from benchmarks.app import create_app, make_payload
+
+
+CLOCK_TICKS = os.sysconf(str("SC_CLK_TCK"))
+PERCENTILES = (50.0, 75.0, 90.0, 95.0, 99.0, 99.9, 99.99)
+
+
+class LatencyHistogram:
+    """A log-linear latency histogram in the style of HdrHistogram
+
+    Values are recorded as integer microseconds. Values below
+    ``2 ** significant_bits`` are recorded exactly; above that, each
+    power-of-two range is split into ``2 ** (significant_bits - 1)``
+    linear sub-buckets, bounding the relative error of any reported
+    value to ``2 ** -(significant_bits - 1)`` (about 1.6% by default).
+    Buckets are stored sparsely, so memory does not depend on the
+    largest value recorded.
+    """
+
+    def __init__(self, significant_bits=7):
+        # type: (int) -> None
+        """Create an empty histogram
+
+        :param significant_bits: the number of bits of precision to
+            keep for each recorded value
+        """
+        self._bits = significant_bits
+        self._sub_count = 1 << significant_bits
+        self._half_count = self._sub_count >> 1
+        self._counts = {}  # type: Dict[int, int]
+        self.total = 0
+        self.min = None  # type: Optional[int]
+        self.max = 0
+
+    def _index(self, value):
+        # type: (int) -> int
+        """Return the bucket index for a value"""
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self._bits
+        return (
+            self._sub_count
+            + (shift - 1) * self._half_count
+            + ((value >> shift) - self._half_count)
+        )
+
+    def _lowest_value(self, index):
+        # type: (int) -> int
+        """Return the lowest value that falls into a bucket"""
+        if index < self._sub_count:
+            return index
+        shift, offset = divmod(index - self._sub_count, self._half_count)
+        return (offset + self._half_count) << (shift + 1)
+
+    def _highest_value(self, index):
+        # type: (int) -> int
+        """Return the highest value that falls into a bucket"""
+        return self._lowest_value(index + 1) - 1
+
+    def record(self, value):
+        # type: (float) -> None
+        """Record a value, in microseconds"""
+        value = max(int(value), 0)
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.total += 1
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other):
+        # type: (LatencyHistogram) -> None
+        """Add all values recorded by another histogram to this one"""
+        if other._bits != self._bits:
+            raise ValueError("Cannot merge histograms of differing precision")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = (
+                other.min if self.min is None else min(self.min, other.min)
+            )
+
+    def mean(self):
+        # type: () -> float
+        """Return the approximate mean of recorded values"""
+        if not self.total:
+            return 0.0
+        weighted = sum(
+            self._highest_value(index) * count
+            for index, count in self._counts.items()
+        )
+        return weighted / self.total
+
+    def value_at_percentile(self, percentile):
+        # type: (float) -> int
+        """Return the value at or below which ``percentile`` values fall"""
+        if not self.total:
+            return 0
+        target = max(int(round(percentile / 100.0 * self.total)), 1)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._highest_value(index), self.max)
+        return self.max
+
+    def distribution(self, ticks_per_half=5):
+        # type: (int) -> List[Tuple[float, int, int]]
+        """Return an HDR-style percentile distribution
+
+        Percentiles are generated ever closer to 100, ``ticks_per_half``
+        steps for each halving of the distance, as in HdrHistogram's
+        ``outputPercentileDistribution``.
+
+        :return: a list of ``(percentile, value, total_count)`` tuples
+        """
+        rows = []  # type: List[Tuple[float, int, int]]
+        if not self.total:
+            return rows
+        percentile = 0.0
+        half_distance = 50.0
+        while percentile < 100.0:
+            step = half_distance / ticks_per_half
+            for _ in range(ticks_per_half):
+                value = self.value_at_percentile(percentile)
+                count = int(round(percentile / 100.0 * self.total))
+                if not rows or rows[-1][1] != value:
+                    rows.append((percentile, value, count))
+                percentile += step
+            if self.total - count <= 1:
+                break
+            half_distance /= 2.0
+        rows.append((100.0, self.max, self.total))
+        return rows
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Request handler that does not log every request to stderr"""
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Discard request logs"""
+
+
+class _WSGIServer(WSGIServer):
+    """A WSGI server with a listen backlog deep enough for load testing"""
+
+    request_queue_size = 1024
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, _WSGIServer):
+    """A WSGI server handling each connection in its own thread"""
+
+    daemon_threads = True
+
+
+def _read_proc_stat(pid):
+    # type: (int) -> float
+    """Return user + system CPU seconds consumed by a process"""
+    with open("/proc/%d/stat" % pid) as stat_file:
+        stat = stat_file.read()
+    # The command name may contain spaces, so split after its closing paren
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def _read_proc_rss(pid):
+    # type: (int) -> int
+    """Return the resident set size of a process in KiB"""
+    with open("/proc/%d/status" % pid) as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+class WorkerPool:
+    """A pre-forked pool of WSGI server processes sharing one socket"""
+
+    def __init__(self, app, workers, host="127.0.0.1", port=0, threads=False):
+        # type: (Callable, int, str, int, bool) -> None
+        """Bind the listening socket
+
+        :param app: the WSGI application to serve
+        :param workers: the number of worker processes to fork
+        :param host: the interface to bind
+        :param port: the port to bind, or ``0`` for any free port
+        :param threads: whether each worker should handle connections
+            concurrently on threads rather than one at a time
+        """
+        server_class = _ThreadingWSGIServer if threads else _WSGIServer
+        self._server = make_server(
+            host,
+            port,
+            app,
+            server_class=server_class,
+            handler_class=_QuietHandler,
+        )
+        self._workers = workers
+        self._procs = []  # type: List[BaseProcess]
+        # The bound address, with the port chosen if port was 0
+        address = self._server.server_address
+        self.address = (str(address[0]), int(address[1]))
+
+    @property
+    def pids(self):
+        # type: () -> List[int]
+        """Return the process ids of the running workers"""
+        return [proc.pid for proc in self._procs if proc.pid is not None]
+
+    def start(self):
+        # type: () -> None
+        """Fork the worker processes and start serving"""
+        context = multiprocessing.get_context("fork")
+        for _ in range(self._workers):
+            proc = context.Process(target=self._server.serve_forever)
+            proc.daemon = True
+            proc.start()
+            self._procs.append(proc)
+
+    def stop(self):
+        # type: () -> None
+        """Terminate the worker processes"""
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            proc.join()
+        self._server.server_close()
+
+
+class ProcessSampler(threading.Thread):
+    """Periodically sample the RSS of a set of processes"""
+
+    def __init__(self, pids, interval=0.5):
+        # type: (List[int], float) -> None
+        """Create the sampler
+
+        :param pids: the processes to sample
+        :param interval: seconds between samples
+        """
+        super(ProcessSampler, self).__init__()
+        self.daemon = True
+        self._pids = pids
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._start_time = time.time()
+        self.samples = []  # type: List[Tuple[float, List[int]]]
+
+    def sample(self):
+        # type: () -> None
+        """Record the current RSS of every process"""
+        self.samples.append(
+            (
+                time.time() - self._start_time,
+                [_read_proc_rss(pid) for pid in self._pids],
+            )
+        )
+
+    def run(self):
+        # type: () -> None
+        """Sample until stopped"""
+        self.sample()
+        while not self._stop_event.wait(self._interval):
+            self.sample()
+
+    def stop(self):
+        # type: () -> None
+        """Stop sampling, taking one final sample"""
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+def _scenario(name, page_size):
+    # type: (str, int) -> Callable[[random.Random], Tuple[str, str, bytes]]
+    """Return a function producing (method, path, body) for a scenario"""
+    post_body = json.dumps(make_payload(1)).encode("utf-8")
+
+    def get_item(rand):
+        # type: (random.Random) -> Tuple[str, str, bytes]
+        return "GET", "/philosophers/%d" % rand.randint(1, 10000), b""
+
+    def get_list(rand):
+        # type: (random.Random) -> Tuple[str, str, bytes]
+        return "GET", "/philosophers", b""
+
+    def post(rand):
+        # type: (random.Random) -> Tuple[str, str, bytes]
+        return "POST", "/philosophers", post_body
+
+    def mixed(rand):
+        # type: (random.Random) -> Tuple[str, str, bytes]
+        roll = rand.random()
+        if roll < 0.6:
+            return get_item(rand)
+        if roll < 0.8:
+            return get_list(rand)
+        return post(rand)
+
+    return {"get": get_item, "list": get_list, "post": post, "mixed": mixed}[
+        name
+    ]
+
+
+class LoadGenerator:
+    """Drive a server with a number of concurrent client threads"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        address,
+        scenario,
+        concurrency=8,
+        requests=None,
+        duration=None,
+        timeout=30.0,
+        seed=0,
+    ):
+        # type: (Tuple[str, int], Callable, int, Optional[int], Optional[float], float, int) -> None
+        """Configure the load
+
+        :param address: the ``(host, port)`` to connect to
+        :param scenario: a callable returning ``(method, path, body)``
+            for each request, as returned by ``_scenario()``
+        :param concurrency: the number of client threads
+        :param requests: the total number of requests to send
+        :param duration: the number of seconds to send requests for,
+            used if ``requests`` is not given
+        :param timeout: the socket timeout for each request
+        :param seed: seed for the per-thread random request mix
+        """
+        if requests is None and duration is None:
+            raise ValueError("One of requests or duration is required")
+        self._address = address
+        self._scenario = scenario
+        self._concurrency = concurrency
+        self._requests = requests
+        self._duration = duration
+        self._timeout = timeout
+        self._seed = seed
+        self._counter = itertools.count()
+        self._deadline = None  # type: Optional[float]
+        self.histogram = LatencyHistogram()
+        self.statuses = {}  # type: Dict[int, int]
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def _more(self):
+        # type: () -> bool
+        """Return whether another request should be sent"""
+        if self._requests is not None:
+            return next(self._counter) < self._requests
+        return time.time() < self._deadline  # type: ignore
+
+    def _client(self, index, results):
+        # type: (int, list) -> None
+        """Send requests from a single thread until told to stop"""
+        rand = random.Random(self._seed + index)
+        histogram = LatencyHistogram()
+        statuses = {}  # type: Dict[int, int]
+        errors = 0
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        while self._more():
+            method, path, body = self._scenario(rand)
+            start = time.perf_counter()
+            try:
+                conn = HTTPConnection(*self._address, timeout=self._timeout)
+                conn.request(method, path, body=body or None, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                conn.close()
+            except (OSError, IOError):
+                errors += 1
+                continue
+            histogram.record((time.perf_counter() - start) * 1e6)
+            statuses[resp.status] = statuses.get(resp.status, 0) + 1
+        results.append((histogram, statuses, errors))
+
+    def run(self):
+        # type: () -> None
+        """Run the load to completion"""
+        results = []  # type: list
+        threads = [
+            threading.Thread(target=self._client, args=(i, results))
+            for i in range(self._concurrency)
+        ]
+        start = time.perf_counter()
+        if self._duration is not None:
+            self._deadline = time.time() + self._duration
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        for histogram, statuses, errors in results:
+            self.histogram.merge(histogram)
+            for status, count in statuses.items():
+                self.statuses[status] = self.statuses.get(status, 0) + count
+            self.errors += errors
+
+
+def _warm_up(address, scenario, count):
+    # type: (Tuple[str, int], Callable, int) -> None
+    """Send some requests to get workers past import and first-use costs"""
+    if count:
+        LoadGenerator(address, scenario, concurrency=4, requests=count).run()
+
+
+def run(args):
+    # type: (argparse.Namespace) -> dict
+    """Run a load test as configured by parsed command line arguments"""
+    app = create_app(page_size=args.page_size)
+    pool = WorkerPool(app, args.workers, port=args.port, threads=args.threads)
+    pool.start()
+    try:
+        scenario = _scenario(args.scenario, args.page_size)
+        _warm_up(pool.address, scenario, args.warmup)
+
+        generator = LoadGenerator(
+            pool.address,
+            scenario,
+            concurrency=args.concurrency,
+            requests=args.requests,
+            duration=args.duration,
+        )
+        sampler = ProcessSampler(pool.pids, interval=args.sample_interval)
+        server_cpu_start = sum(_read_proc_stat(pid) for pid in pool.pids)
+        client_cpu_start = sum(os.times()[:2])
+        sampler.start()
+
+        generator.run()
+
+        sampler.stop()
+        server_cpu = (
+            sum(_read_proc_stat(pid) for pid in pool.pids) - server_cpu_start
+        )
+        client_cpu = sum(os.times()[:2]) - client_cpu_start
+    finally:
+        pool.stop()
+
+    completed = generator.histogram.total
+    return {
+        "config": vars(args),
+        "completed": completed,
+        "errors": generator.errors,
+        "statuses": generator.statuses,
+        "elapsed_s": generator.elapsed,
+        "throughput_rps": (
+            completed / generator.elapsed if generator.elapsed else 0.0
+        ),
+        "latency_us": {
+            "min": generator.histogram.min or 0,
+            "mean": generator.histogram.mean(),
+            "max": generator.histogram.max,
+            "percentiles": {
+                str(p): generator.histogram.value_at_percentile(p)
+                for p in PERCENTILES
+            },
+            "distribution": generator.histogram.distribution(),
+        },
+        "cpu": {
+            "server_s": server_cpu,
+            "client_s": client_cpu,
+            "server_us_per_request": (
+                server_cpu / completed * 1e6 if completed else 0.0
+            ),
+        },
+        "rss_kib": [
+            {"t": round(t, 3), "total": sum(rss), "workers": rss}
+            for t, rss in sampler.samples
+        ],
+    }
+
+
+def format_report(report):
+    # type: (dict) -> str
+    """Format a report returned by ``run()`` for humans"""
+    lines = []
+    cfg = report["config"]
+    lines.append(
+        "workers=%s threads=%s concurrency=%s scenario=%s"
+        % (cfg["workers"], cfg["threads"], cfg["concurrency"], cfg["scenario"])
+    )
+    lines.append(
+        "completed %d requests in %.2fs (%d errors), status counts: %s"
+        % (
+            report["completed"],
+            report["elapsed_s"],
+            report["errors"],
+            ", ".join(
+                "%s=%s" % item for item in sorted(report["statuses"].items())
+            ),
+        )
+    )
+    lines.append("throughput: %.1f req/s" % report["throughput_rps"])
+    lines.append(
+        "server CPU: %.2fs total, %.1f us/request; client CPU: %.2fs"
+        % (
+            report["cpu"]["server_s"],
+            report["cpu"]["server_us_per_request"],
+            report["cpu"]["client_s"],
+        )
+    )
+
+    latency = report["latency_us"]
+    lines.append("")
+    lines.append(
+        "latency (us): min=%d mean=%.0f max=%d"
+        % (latency["min"], latency["mean"], latency["max"])
+    )
+    lines.append("%12s %12s %12s" % ("value(us)", "percentile", "count"))
+    for percentile, value, count in latency["distribution"]:
+        lines.append("%12d %12.5f %12d" % (value, percentile / 100.0, count))
+
+    lines.append("")
+    lines.append("RSS over time (KiB):")
+    samples = report["rss_kib"]
+    step = max(len(samples) // 10, 1)
+    shown = samples[::step]
+    if samples and shown[-1] is not samples[-1]:
+        shown.append(samples[-1])
+    for sample in shown:
+        lines.append(
+            "%8.2fs %10d  %s"
+            % (
+                sample["t"],
+                sample["total"],
+                " ".join(str(rss) for rss in sample["workers"]),
+            )
+        )
+    if samples:
+        lines.append(
+            "RSS drift: %+d KiB" % (samples[-1]["total"] - samples[0]["total"])
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    # type: (Optional[List[str]]) -> argparse.Namespace
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Load test the falcon_marshmallow sample application"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="handle connections on threads within each worker",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("--requests", type=int, default=None)
+    limit.add_argument("--duration", type=float, default=None)
+    parser.add_argument(
+        "--scenario",
+        choices=("get", "list", "post", "mixed"),
+        default="mixed",
+    )
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument(
+        "--json", metavar="PATH", help="also write the full report as JSON"
+    )
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 10000
+    return args
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the harness from the command line"""
+    args = parse_args(argv)
+    report = run(args)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
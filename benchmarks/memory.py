@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the memory held by a large loaded ``many=True`` payload
+
+Parse a JSON array of records, load it with ``schema.load()`` into dicts
+and with a ``CompactLoader`` into namedtuples, and report the memory the
+loaded records hold and the peak RSS of a fresh process doing each. Also
+report how many distinct key strings the parsed document holds, which
+shows that the JSON decoder already shares one string per key.
+
+Example::
+
+    python -m benchmarks.memory --records 200000
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import argparse
+import gc
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+from typing import Any, Dict, List, Optional
+
+# Third party
+import simplejson
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow.records import CompactLoader
+
+
+class Reading(Schema):
+    """A typical sensor reading"""
+
+    sensor_id = fields.Integer()
+    timestamp = fields.Integer()
+    value = fields.Float()
+    unit = fields.String()
+    ok = fields.Boolean()
+
+
+MODES = ("dict", "compact")
+
+
+def make_body(count):
+    # type: (int) -> str
+    """Return a JSON array of ``count`` readings"""
+    readings = [
+        {
+            "sensor_id": index % 100,
+            "timestamp": 1600000000 + index,
+            "value": index * 0.5,
+            "unit": "C",
+            "ok": index % 7 != 0,
+        }
+        for index in range(count)
+    ]
+    body = simplejson.dumps(readings)  # type: str
+    return body
+
+
+def measure(mode, count):
+    # type: (str, int) -> Dict[str, Any]
+    """Load a body in one mode, and return the memory used"""
+    body = make_body(count)
+    schema = Reading(many=True)
+    loader = CompactLoader()
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+
+    parsed = simplejson.loads(body)
+    keys = len({id(key) for record in parsed for key in record})
+    if mode == "dict":
+        loaded = schema.load(parsed)
+    else:
+        loaded = loader.load(schema, parsed)
+    del parsed
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(loaded) == count
+    return {
+        "keys": keys,
+        "held": held,
+        "peak": peak,
+        "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+    }
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(simplejson.dumps(measure(args.mode, args.records)))
+        return 0
+
+    print("Loading %d records" % args.records)
+    print(
+        "%-10s %12s %14s %14s %16s"
+        % ("mode", "key strings", "held MiB", "peak MiB", "peak RSS MiB")
+    )
+    for mode in MODES:
+        # A fresh process for each, so that peak RSS is comparable
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.memory",
+                "--records",
+                str(args.records),
+                "--mode",
+                mode,
+            ]
+        )
+        result = simplejson.loads(output)
+        print(
+            "%-10s %12d %14.1f %14.1f %16.1f"
+            % (
+                mode,
+                result["keys"],
+                result["held"] / 2**20,
+                result["peak"] / 2**20,
+                # ru_maxrss is in KiB on Linux
+                result["rss"] / 2**10,
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,111 @@
 # -*- coding: utf-8 -*-
 """Middleware to integrate Marshmallow with Falcon"""
 
+import sys
+
 from ._version import __version__, __version_info__
 
-from .middleware import EmptyRequestDropper, JSONEnforcer, Marshmallow
+# Public names, and the submodules that define them. These are imported on
+# first access, so that importing the package (e.g. to read its version)
+# does not pull in Falcon, Marshmallow and the JSON backends.
+_LAZY_ATTRS = {
+    "DumpAccelerator": "accelerator",
+    "BatchResource": "batch",
+    "Discriminated": "discriminator",
+    "TypeDispatchEncoder": "encoding",
+    "HTTPSerializationError": "errors",
+    "HTTPValidationError": "errors",
+    "IdempotencyCache": "idempotency",
+    "MemoryStore": "idempotency",
+    "SQLiteStore": "idempotency",
+    "JSONLimits": "limits",
+    "LoadCache": "loadcache",
+    "EmptyRequestDropper": "middleware",
+    "JSONEnforcer": "middleware",
+    "Marshmallow": "middleware",
+    "DumpOptions": "options",
+    "LoadOptions": "options",
+    "QueryOptions": "options",
+    "SchemaPool": "pool",
+    "FieldProfiler": "profiling",
+    "CompactLoader": "records",
+    "SchemaRegistry": "registry",
+    "LoadShedder": "shedding",
+    "TrustPolicy": "trust",
+    "ResponseValidator": "validation",
+}
+_LAZY_MODULES = (
+    "accelerator",
+    "batch",
+    "discriminator",
+    "encoding",
+    "errors",
+    "idempotency",
+    "limits",
+    "loadcache",
+    "middleware",
+    "options",
+    "pool",
+    "profiling",
+    "records",
+    "registry",
+    "shedding",
+    "trust",
+    "validation",
+)
+
+# Always true for type checkers, which do not need to import typing for it
+MYPY = False
+
+
+if MYPY or sys.version_info < (3, 7):
+    # Module-level __getattr__ (PEP 562) requires Python 3.7
+    from typing import Any, List
+
+    from .accelerator import DumpAccelerator
+    from .batch import BatchResource
+    from .discriminator import Discriminated
+    from .encoding import TypeDispatchEncoder
+    from .errors import HTTPSerializationError, HTTPValidationError
+    from .idempotency import IdempotencyCache, MemoryStore, SQLiteStore
+    from .limits import JSONLimits
+    from .loadcache import LoadCache
+    from .middleware import EmptyRequestDropper, JSONEnforcer, Marshmallow
+    from .options import DumpOptions, LoadOptions, QueryOptions
+    from .pool import SchemaPool
+    from .profiling import FieldProfiler
+    from .records import CompactLoader
+    from .registry import SchemaRegistry
+    from .shedding import LoadShedder
+    from .trust import TrustPolicy
+    from .validation import ResponseValidator
+
+else:
+
+    def _import_submodule(name):
+        # type: (str) -> Any
+        """Import a submodule of the package"""
+        # __import__ rather than importlib, so -X importtime reports it
+        full_name = "%s.%s" % (__name__, name)
+        __import__(full_name)
+        return sys.modules[full_name]
+
+    def __getattr__(name):
+        # type: (str) -> Any
+        """Import public names and submodules on first access"""
+        if name in _LAZY_ATTRS:
+            module = _import_submodule(_LAZY_ATTRS[name])
+            value = getattr(module, name)
+        elif name in _LAZY_MODULES:
+            value = _import_submodule(name)
+        else:
+            raise AttributeError(
+                "module %r has no attribute %r" % (__name__, name)
+            )
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        # type: () -> List[str]
+        """List public names, including those not yet imported"""
+        return sorted(set(globals()) | set(_LAZY_ATTRS) | set(_LAZY_MODULES))
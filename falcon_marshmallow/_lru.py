@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""A small, thread-safe LRU mapping shared by the caching middlewares"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from collections import OrderedDict
+from threading import Lock
+
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """A size-bounded mapping that evicts the least recently used key"""
+
+    def __init__(self, max_entries):
+        # type: (int) -> None
+        """Create an empty cache
+
+        :param max_entries: the maximum number of keys to hold
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # type: OrderedDict
+        self._lock = Lock()
+
+    def __len__(self):
+        # type: () -> int
+        """Return the number of cached keys"""
+        return len(self._data)
+
+    def __contains__(self, key):
+        # type: (Hashable) -> bool
+        """Return whether a key is cached, without updating its recency"""
+        return key in self._data
+
+    def get(self, key, default=None):
+        # type: (Hashable, Any) -> Any
+        """Return the value for a key, marking it most recently used"""
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        # type: (Hashable, Any) -> None
+        """Cache a value, evicting the least recently used if full"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        # type: () -> None
+        """Remove all cached keys"""
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Faster dumping of objects through precompiled attribute getters"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+from operator import attrgetter, itemgetter
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Third party
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+
+# Local
+from ._lru import LRUCache
+
+
+log = logging.getLogger(__name__)
+
+
+# A plan is a getter returning a tuple of raw values from an object, and
+# for each dumped field its output key, the field, its name, and the index
+# of its value in the tuple, or None if the field must fetch it itself.
+_Entry = Tuple[str, fields.Field, str, Optional[int]]
+_Plan = Tuple[Callable[[Any], tuple], List[_Entry]]
+
+_UNSUPPORTED = object()
+
+
+def _has_hooks(sch, tag):
+    # type: (Schema, str) -> bool
+    """Return whether a schema has processors registered for a tag"""
+    # Older releases of Marshmallow 3 key hooks by (tag, pass_many)
+    return any(
+        hooks
+        for key, hooks in sch._hooks.items()
+        if key == tag or (isinstance(key, tuple) and key[0] == tag)
+    )
+
+
+def _tuple_getter(getter, count):
+    # type: (Callable[[Any], Any], int) -> Callable[[Any], tuple]
+    """Return a getter that always returns a tuple of ``count`` values"""
+    if count == 0:
+        return lambda obj: ()
+    if count == 1:
+        return lambda obj: (getter(obj),)
+    return getter
+
+
+def _plan(sch, cls):
+    # type: (Schema, type) -> Optional[_Plan]
+    """Compile the plan for dumping instances of a class with a schema
+
+    :return: the plan, or None if instances of the class cannot be read
+        the way Marshmallow reads them with a plain getter
+    """
+    if type(sch).get_attribute is not Schema.get_attribute:
+        return None
+    if issubclass(cls, dict):
+        make_getter = itemgetter  # type: Callable[..., Any]
+    elif hasattr(cls, "__getitem__") and not (
+        issubclass(cls, tuple) and hasattr(cls, "_fields")
+    ):
+        # Marshmallow tries obj[name] before getattr() for these
+        return None
+    else:
+        make_getter = attrgetter
+
+    names = []  # type: List[str]
+    entries = []  # type: List[_Entry]
+    for name, field in sch.dump_fields.items():
+        key = field.data_key if field.data_key is not None else name
+        attr = field.attribute or name
+        if (
+            not field._CHECK_ATTRIBUTE
+            or "." in attr
+            or type(field).get_value is not fields.Field.get_value
+            or type(field).serialize is not fields.Field.serialize
+        ):
+            entries.append((key, field, name, None))
+        else:
+            entries.append((key, field, name, len(names)))
+            names.append(attr)
+
+    getter = make_getter(*names) if names else None
+    return _tuple_getter(getter, len(names)), entries  # type: ignore
+
+
+class DumpAccelerator:
+    """Dump objects with attribute getters compiled once per class
+
+    Marshmallow reads every field of every dumped object through its
+    generic ``get_value()``, which tries item access, then attribute
+    access, and handles dotted names, for each value in turn. For each
+    combination of schema and object class, the accelerator instead
+    builds a single ``operator.attrgetter`` (or ``itemgetter`` for dicts)
+    that fetches all of an object's values at once, caches it, and passes
+    the values straight to each field's serializer.
+
+    Plain objects, ``__slots__`` classes, dataclasses, namedtuples, ORM
+    models and dicts are supported. Objects missing a value, and fields
+    that fetch their own values (``Method``, ``Function``, dotted
+    ``attribute`` names, or custom ``get_value()``), are handled exactly
+    as Marshmallow would handle them, as are schemas overriding
+    ``get_attribute()`` and other mapping types. ``pre_dump`` and
+    ``post_dump`` hooks run as usual.
+
+    Use it as the ``dump_accelerator`` of the ``Marshmallow`` middleware.
+    """
+
+    def __init__(self, max_plans=1024):
+        # type: (int) -> None
+        """Create the accelerator
+
+        :param max_plans: the maximum number of (schema, class) plans to
+            keep, evicting the least recently used
+        """
+        self._plans = LRUCache(max_plans)
+
+    def _get_plan(self, sch, cls):
+        # type: (Schema, type) -> Optional[_Plan]
+        """Return the cached plan for a schema and class"""
+        plan = self._plans.get((sch, cls), _UNSUPPORTED)
+        if plan is _UNSUPPORTED:
+            plan = _plan(sch, cls)
+            if plan is None:
+                log.debug("Cannot accelerate dumping %s with %s", cls, sch)
+            self._plans.set((sch, cls), plan)
+        return plan  # type: ignore
+
+    def dump(self, sch, obj, many=None):
+        # type: (Schema, Any, Optional[bool]) -> Any
+        """Dump an object, or a collection of objects, with a schema
+
+        :param sch: a Marshmallow schema instance
+        :param obj: the object or objects to dump
+        :param many: whether ``obj`` is a collection. Defaults to the
+            schema's ``many``.
+
+        :return: the same data as ``sch.dump(obj, many=many)``
+        """
+        many = sch.many if many is None else bool(many)
+        if obj is None:
+            return sch.dump(obj, many=many)
+
+        processed = obj
+        if _has_hooks(sch, PRE_DUMP):
+            processed = sch._invoke_dump_processors(
+                PRE_DUMP, obj, many=many, original_data=obj
+            )
+
+        if many:
+            result = []  # type: Any
+            last_cls = plan = None
+            for item in processed:
+                if type(item) is not last_cls:
+                    last_cls = type(item)
+                    plan = self._get_plan(sch, last_cls)
+                result.append(self._dump_one(sch, plan, item))
+        else:
+            plan = self._get_plan(sch, type(processed))
+            result = self._dump_one(sch, plan, processed)
+
+        if _has_hooks(sch, POST_DUMP):
+            result = sch._invoke_dump_processors(
+                POST_DUMP, result, many=many, original_data=obj
+            )
+        return result
+
+    @staticmethod
+    def _dump_one(sch, plan, obj):
+        # type: (Schema, Optional[_Plan], Any) -> Dict[str, Any]
+        """Dump a single object with the plan for its class"""
+        if plan is not None:
+            getter, entries = plan
+            try:
+                values = getter(obj)
+            except (AttributeError, KeyError):
+                # Some value is absent, so defaults may apply
+                pass
+            else:
+                ret = sch.dict_class()
+                for key, field, name, index in entries:
+                    if index is None or values[index] is missing:
+                        value = field.serialize(
+                            name, obj, accessor=sch.get_attribute
+                        )
+                        if value is missing:
+                            continue
+                    else:
+                        value = field._serialize(values[index], name, obj)
+                    ret[key] = value
+                return ret
+
+        ret = sch.dict_class()
+        for name, field in sch.dump_fields.items():
+            value = field.serialize(name, obj, accessor=sch.get_attribute)
+            if value is missing:
+                continue
+            key = field.data_key if field.data_key is not None else name
+            ret[key] = value
+        return ret
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""A resource running several sub-requests through the app at once"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+import os
+import sys
+from functools import partial
+from io import BytesIO
+
+from typing import Any, Dict, List, Optional
+
+try:
+    from urllib.parse import unquote_to_bytes
+except ImportError:  # pragma: no cover
+    from urllib import unquote as unquote_to_bytes  # type: ignore
+
+# Third party
+from falcon import HTTPBadRequest, Request, Response
+from marshmallow import Schema, fields, validate
+
+
+log = logging.getLogger(__name__)
+
+
+BATCH_ENV_KEY = "falcon_marshmallow.batch"
+BATCH_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+# Headers describing the batch request's own body, or applying to the batch
+# request alone, which sub-requests do not inherit
+_UNINHERITED_ENV_KEYS = (
+    "CONTENT_TYPE",
+    "CONTENT_LENGTH",
+    "HTTP_CONTENT_ENCODING",
+    "HTTP_TRANSFER_ENCODING",
+    "HTTP_IDEMPOTENCY_KEY",
+    "HTTP_IF_MATCH",
+    "HTTP_IF_NONE_MATCH",
+    "HTTP_IF_MODIFIED_SINCE",
+    "HTTP_IF_UNMODIFIED_SINCE",
+)
+
+
+class SubRequest(Schema):
+    """One request in a batch"""
+
+    method = fields.String(
+        required=True, validate=validate.OneOf(BATCH_METHODS)
+    )
+    path = fields.String(required=True, validate=validate.Regexp(r"^/"))
+    headers = fields.Dict()
+    body = fields.Raw(allow_none=True)
+
+
+class BatchResource:
+    """Run a JSON array of sub-requests through the app, in one request
+
+    Each sub-request is an object with a ``method``, a ``path`` (which may
+    include a query string), and optionally ``headers`` and a JSON
+    ``body``. It is dispatched through the whole app, so routing,
+    middleware (including ``Marshmallow`` schema loading and dumping) and
+    error handling apply exactly as for a direct request. Sub-requests
+    inherit the batch request's headers, e.g. for authentication, and may
+    override them. Headers that only apply to the batch request itself,
+    such as its ``Content-Length``, ``Idempotency-Key`` and conditional
+    ``If-*`` headers, are not inherited.
+
+    The response is a JSON array holding a ``{"status", "body"}`` object
+    for each sub-request, in order. JSON bodies are embedded as they are,
+    without being parsed again, other bodies as strings.
+
+    With ``max_workers``, each worker process creates its thread pool on
+    its first concurrent batch, and keeps it until ``close()`` is called.
+
+    Requires the ``Marshmallow`` middleware, which loads the batch.
+    """
+
+    post_request_schema = SubRequest(many=True)
+
+    def __init__(
+        self,
+        app,
+        max_requests=50,
+        max_workers=0,
+        req_key="json",
+        json_module=None,
+    ):
+        # type: (Any, int, int, str, Any) -> None
+        """Create the resource
+
+        :param app: the falcon app to dispatch sub-requests to, usually
+            the one this resource is added to
+        :param max_requests: the maximum number of sub-requests in a
+            batch
+        :param max_workers: if greater than zero, run sub-requests
+            concurrently on a pool of this many threads. Only use this
+            if the sub-requests of a batch are independent of each other.
+        :param req_key: the ``req_key`` of the ``Marshmallow`` middleware
+        :param json_module: the json module used to encode sub-request
+            bodies, whose ``dumps()`` may return text or UTF-8 bytes.
+            Defaults to ``simplejson``.
+        """
+        if json_module is None:
+            import simplejson
+
+            json_module = simplejson
+        self._app = app
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+        self._req_key = req_key
+        self._json = json_module
+        self._executor = None  # type: Any
+        self._executor_pid = None  # type: Optional[int]
+
+    def _get_executor(self):
+        # type: () -> Any
+        """Return the thread pool for the current process"""
+        pid = os.getpid()
+        if self._executor_pid != pid:
+            # Threads do not survive a fork, so each worker needs its own
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(self.max_workers)
+            self._executor_pid = pid
+        return self._executor
+
+    def close(self):
+        # type: () -> None
+        """Shut down this process's thread pool, waiting for its threads
+
+        A later concurrent batch creates a new one.
+        """
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown()
+        self._executor = None
+        self._executor_pid = None
+
+    def _dumps(self, obj):
+        # type: (Any) -> str
+        """Encode an object as JSON text with the json module"""
+        encoded = self._json.dumps(obj)
+        if isinstance(encoded, bytes):
+            return encoded.decode("utf-8")
+        return encoded  # type: ignore
+
+    def _make_environ(self, parent, sub):
+        # type: (Dict[str, Any], Dict[str, Any]) -> Dict[str, Any]
+        """Return the WSGI environ for a sub-request"""
+        env = {
+            k: v for k, v in parent.items() if k not in _UNINHERITED_ENV_KEYS
+        }
+        path, _, query = sub["path"].partition("?")
+        path_info = unquote_to_bytes(path)  # type: Any
+        if sys.version_info >= (3,):
+            # PEP 3333 strings are bytes decoded as latin-1
+            path_info = path_info.decode("iso-8859-1")
+
+        body = b""
+        if sub.get("body") is not None:
+            body = self._dumps(sub["body"]).encode("utf-8")
+            env["CONTENT_TYPE"] = "application/json"
+
+        env.update(
+            {
+                "REQUEST_METHOD": sub["method"],
+                "PATH_INFO": path_info,
+                "QUERY_STRING": query,
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": BytesIO(body),
+                BATCH_ENV_KEY: True,
+            }
+        )
+        for name, value in (sub.get("headers") or {}).items():
+            key = name.upper().replace("-", "_")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = "HTTP_" + key
+            env[key] = str(value)
+        return env
+
+    def _dispatch(self, parent, sub):
+        # type: (Dict[str, Any], Dict[str, Any]) -> str
+        """Run a sub-request, returning its result as a JSON fragment"""
+        started = []  # type: List[Any]
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        chunks = self._app(self._make_environ(parent, sub), start_response)
+        try:
+            body = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+        status, headers = started
+        content_type = ""
+        for name, value in headers:
+            if name.lower() == "content-type":
+                content_type = value
+        if not body:
+            encoded = "null"
+        elif "json" in content_type:
+            encoded = body.decode("utf-8")
+        else:
+            encoded = self._dumps(body.decode("utf-8", "replace"))
+        return '{"status": %d, "body": %s}' % (
+            int(status.split(" ", 1)[0]),
+            encoded,
+        )
+
+    def on_post(self, req, resp):
+        # type: (Request, Response) -> None
+        """Run the batch of sub-requests
+
+        :raises falcon.HTTPBadRequest: if the batch is empty or too
+            large, or is itself a sub-request
+        """
+        if req.env.get(BATCH_ENV_KEY):
+            raise HTTPBadRequest(description="Batches cannot be nested")
+        subs = req.context.get(self._req_key)
+        if subs is None:
+            # The middleware loads nothing from an empty body
+            raise HTTPBadRequest(
+                description="A batch must be a JSON array of requests"
+            )
+        if len(subs) > self.max_requests:
+            raise HTTPBadRequest(
+                description="A batch may hold at most %d requests"
+                % self.max_requests
+            )
+
+        log.debug("Running a batch of %d requests", len(subs))
+        dispatch = partial(self._dispatch, req.env)
+        if self.max_workers > 0 and len(subs) > 1:
+            results = list(self._get_executor().map(dispatch, subs))
+        else:
+            results = [dispatch(sub) for sub in subs]
+
+        resp.content_type = "application/json"
+        resp.body = "[%s]" % ", ".join(results)
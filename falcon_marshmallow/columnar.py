@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""Vectorized loading of large, homogeneous ``many=True`` payloads
+
+Requires NumPy (``pip install falcon-marshmallow[columnar]``).
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+import math
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Third party
+from marshmallow import INCLUDE, RAISE, fields, missing, validate
+from marshmallow import Schema, ValidationError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+
+log = logging.getLogger(__name__)
+
+
+# The exact Python types each supported field accepts on the fast path.
+# Anything else (e.g. numeric strings for an Integer) is left to
+# Marshmallow, which knows how to coerce it or report the error.
+_FAST_TYPES = {
+    fields.Integer: (int,),
+    fields.Float: (int, float),
+    fields.String: (str,),
+    fields.Boolean: (bool,),
+}
+
+
+class _Column:
+    """How to load and validate one field of a schema"""
+
+    def __init__(self, name, field):
+        # type: (str, fields.Field) -> None
+        """Record everything needed about the field up front"""
+        self.attr = field.attribute or name
+        self.key = field.data_key if field.data_key is not None else name
+        self.kind = type(field)
+        self.types = _FAST_TYPES[self.kind]
+        self.required = field.required
+        self.allow_none = field.allow_none
+        self.default = getattr(field, "load_default", missing)
+        self.validators = list(field.validators)
+
+
+def _supports(field, validator):
+    # type: (fields.Field, Any) -> bool
+    """Return whether a validator of a field can be vectorized"""
+    kind = type(validator)
+    if kind is validate.Range:
+        return type(field) in (fields.Integer, fields.Float)
+    if kind is validate.Length:
+        return type(field) is fields.String
+    if kind is validate.OneOf:
+        types = _FAST_TYPES[type(field)]
+        return all(type(choice) in types for choice in validator.choices)
+    return False
+
+
+def _plan(sch):
+    # type: (Schema) -> Optional[List[_Column]]
+    """Return the columns of a schema, or None if it is unsupported"""
+    if sch.partial or any(sch._hooks.values()):
+        return None
+    columns = []
+    for name, field in sch.load_fields.items():
+        if type(field) not in _FAST_TYPES:
+            return None
+        if not all(_supports(field, v) for v in field.validators):
+            return None
+        default = getattr(field, "load_default", missing)
+        if callable(default):
+            return None
+        columns.append(_Column(name, field))
+    return columns
+
+
+class ColumnarLoader:
+    """Load ``many=True`` payloads of flat records column by column
+
+    Instead of deserializing and validating each field of each record in
+    turn, the loader pivots the records into one column per field, checks
+    value types, and runs ``Range``, ``Length`` and ``OneOf`` validators
+    and ``required`` checks with NumPy over whole columns at once.
+
+    Only records that fail a check, or that need something the fast path
+    does not do (type coercion such as ``"12"`` to ``12``, unknown keys
+    under ``unknown=RAISE``, non-finite floats, ...), are passed to
+    Marshmallow, so their errors, and the results of any coercion, are
+    exactly those Marshmallow would produce. Schemas with fields other
+    than ``Integer``, ``Float``, ``String`` and ``Boolean``, with other
+    validators, with callable defaults, or with any processing or
+    validation hooks are always loaded by Marshmallow.
+
+    Use it as the ``bulk_loader`` of the ``Marshmallow`` middleware.
+    """
+
+    def __init__(self, min_records=1000):
+        # type: (int) -> None
+        """Create the loader
+
+        :param min_records: payloads with fewer records than this are
+            loaded by Marshmallow, since the vectorized path only pays
+            off for large payloads
+        """
+        if np is None:
+            raise ImportError(
+                "ColumnarLoader requires numpy. Install it with "
+                "`pip install falcon-marshmallow[columnar]`."
+            )
+        self.min_records = min_records
+        self._plans = {}  # type: Dict[Schema, Optional[List[_Column]]]
+
+    def _get_plan(self, sch):
+        # type: (Schema) -> Optional[List[_Column]]
+        """Return the cached columns for a schema"""
+        try:
+            return self._plans[sch]
+        except KeyError:
+            plan = self._plans[sch] = _plan(sch)
+            if plan is None:
+                log.debug("%s is not supported by ColumnarLoader", sch)
+            return plan
+
+    def load(self, sch, records):
+        # type: (Schema, List[Any]) -> List[Any]
+        """Load a list of records with a schema
+
+        :param sch: a Marshmallow schema instance
+        :param records: the parsed list of records
+
+        :raises marshmallow.ValidationError: if any records are invalid,
+            with messages keyed by record index as for ``many=True``
+        """
+        if len(records) < self.min_records:
+            return sch.load(records, many=True)  # type: ignore
+        plan = self._get_plan(sch)
+        if plan is None:
+            return sch.load(records, many=True)  # type: ignore
+
+        count = len(records)
+        fallback = np.zeros(count, dtype=bool)
+        known = set(column.key for column in plan)
+
+        is_dict = np.fromiter(
+            (type(r) is dict for r in records), dtype=bool, count=count
+        )
+        if is_dict.all():
+            dicts = records
+        else:
+            fallback |= ~is_dict
+            dicts = [r if type(r) is dict else {} for r in records]
+        if sch.unknown == RAISE:
+            fallback |= np.fromiter(
+                (not r.keys() <= known for r in dicts),
+                dtype=bool,
+                count=count,
+            )
+
+        loaded = []  # type: List[Tuple[_Column, List[Any], Any]]
+        for column in plan:
+            values, present = self._load_column(column, dicts, fallback)
+            loaded.append((column, values, present))
+
+        good = np.flatnonzero(~fallback).tolist()
+        bad = np.flatnonzero(fallback).tolist()
+        log.debug(
+            "ColumnarLoader loaded %d records, %d passed to marshmallow",
+            len(good),
+            len(bad),
+        )
+
+        attrs = [column.attr for column, _, _ in loaded]
+        if not bad and all(present is None for _, _, present in loaded):
+            results = [
+                dict(zip(attrs, row))
+                for row in zip(*(values for _, values, _ in loaded))
+            ]  # type: List[Any]
+        else:
+            results = [None] * count
+            for index in good:
+                results[index] = {}
+            for attr, (_, values, present) in zip(attrs, loaded):
+                if present is None:
+                    for index in good:
+                        results[index][attr] = values[index]
+                else:
+                    present = present.tolist()
+                    for index in good:
+                        if present[index]:
+                            results[index][attr] = values[index]
+        if sch.unknown == INCLUDE:
+            for index in good:
+                for key, value in records[index].items():
+                    if key not in known:
+                        results[index][key] = value
+
+        if bad:
+            errors = {}  # type: Dict[Any, Any]
+            try:
+                slow = sch.load([records[i] for i in bad], many=True)
+            except ValidationError as exc:
+                slow = exc.valid_data
+                messages = exc.messages
+                if not isinstance(messages, dict):
+                    messages = {"_schema": messages}
+                for slow_index, message in messages.items():
+                    if isinstance(slow_index, int):
+                        slow_index = bad[slow_index]
+                    errors[slow_index] = message
+            for slow_index, index in enumerate(bad):
+                results[index] = slow[slow_index]
+            if errors:
+                raise ValidationError(errors, valid_data=results)
+
+        return results
+
+    def _load_column(self, column, records, fallback):
+        # type: (_Column, List[dict], Any) -> Tuple[List[Any], Any]
+        """Check one column, flagging records that need Marshmallow
+
+        :return: the column's loaded values, and a boolean array of
+            which records have a value (or None if all of them do)
+        """
+        count = len(records)
+        key = column.key
+        raw = [r.get(key, missing) for r in records]
+        types = column.types
+        is_missing = np.fromiter(
+            (v is missing for v in raw), dtype=bool, count=count
+        )
+        is_none = np.fromiter((v is None for v in raw), dtype=bool, count=count)
+        typed = np.fromiter(
+            (type(v) in types for v in raw), dtype=bool, count=count
+        )
+
+        present = None
+        if is_missing.any():
+            if column.required:
+                fallback |= is_missing
+            elif column.default is not missing:
+                for index in np.flatnonzero(is_missing).tolist():
+                    raw[index] = column.default
+            else:
+                present = ~is_missing
+        if is_none.any() and not column.allow_none:
+            fallback |= is_none
+        fallback |= ~(typed | is_missing | is_none)
+
+        check = typed & ~fallback
+        if not check.any():
+            return raw, present
+        indices = np.flatnonzero(check)
+        values = [raw[i] for i in indices.tolist()]
+
+        if column.kind is fields.Float:
+            try:
+                array = np.array(values, dtype=np.float64)
+            except OverflowError:
+                fallback[indices] = True
+                return raw, present
+            finite = np.isfinite(array)
+            if not finite.all():
+                fallback[indices[~finite]] = True
+            for index, value in zip(indices.tolist(), array.tolist()):
+                raw[index] = value
+        elif column.kind is fields.Integer:
+            try:
+                array = np.array(values, dtype=np.int64)
+            except OverflowError:
+                fallback[indices] = True
+                return raw, present
+        elif column.kind is fields.String:
+            array = np.array(values, dtype=object)
+        else:
+            array = np.array(values, dtype=bool)
+
+        ok = np.ones(len(values), dtype=bool)
+        for validator in column.validators:
+            ok &= self._validate(validator, column, values, array)
+        if not ok.all():
+            fallback[indices[~ok]] = True
+        return raw, present
+
+    @staticmethod
+    def _validate(validator, column, values, array):
+        # type: (Any, _Column, List[Any], Any) -> Any
+        """Return a boolean array of which values pass a validator"""
+        if isinstance(validator, validate.Range):
+            ok = np.ones(len(values), dtype=bool)
+            if validator.min is not None:
+                if getattr(validator, "min_inclusive", True):
+                    ok &= array >= validator.min
+                else:
+                    ok &= array > validator.min
+            if validator.max is not None:
+                if getattr(validator, "max_inclusive", True):
+                    ok &= array <= validator.max
+                else:
+                    ok &= array < validator.max
+            return ok
+
+        if isinstance(validator, validate.Length):
+            lengths = np.fromiter(
+                (len(v) for v in values), dtype=np.int64, count=len(values)
+            )
+            if validator.equal is not None:
+                return lengths == validator.equal
+            ok = np.ones(len(values), dtype=bool)
+            if validator.min is not None:
+                ok &= lengths >= validator.min
+            if validator.max is not None:
+                ok &= lengths <= validator.max
+            return ok
+
+        # OneOf
+        choices = list(validator.choices)
+        if column.kind is fields.String:
+            choice_set = set(choices)
+            return np.fromiter(
+                (v in choice_set for v in values),
+                dtype=bool,
+                count=len(values),
+            )
+        if column.kind is fields.Float:
+            finite = [c for c in choices if not math.isnan(c)]
+            return np.isin(array, np.array(finite, dtype=np.float64))
+        return np.isin(array, np.array(choices))
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Polymorphic schemas, choosing a schema per record by a field's value"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Third party
+from marshmallow import Schema, ValidationError, missing
+from marshmallow.utils import is_collection
+
+
+log = logging.getLogger(__name__)
+
+
+def _sorted(errors):
+    # type: (Dict[Any, Any]) -> Dict[Any, Any]
+    """Return errors ordered by record index, then other errors"""
+    indexes = sorted(key for key in errors if isinstance(key, int))
+    ordered = {index: errors[index] for index in indexes}
+    ordered.update(errors)
+    return ordered
+
+
+class Discriminated(Schema):
+    """Load and dump each record with the schema named by one of its fields
+
+    Endpoints accepting many kinds of documents, e.g. events with a
+    ``type``, would otherwise need a union schema trying each alternative
+    in turn, or to load the documents again in their handler. Instead,
+    given the name of the discriminator field and a mapping of its values
+    to schemas, each record is loaded with its own schema, chosen with a
+    single dict lookup. With ``many=True``, records are grouped by
+    schema, each group is loaded or dumped with one ``many=True`` call,
+    and the results are returned in their original order.
+
+    It is a ``Schema``, so resources use it like any other, e.g.::
+
+        class Events:
+            post_request_schema = Discriminated(
+                "type",
+                {"click": ClickSchema, "view": ViewSchema},
+                many=True,
+            )
+
+    Each schema gets the whole record, discriminator included, so it
+    should declare that field. Records whose discriminator is missing or
+    unknown are reported as errors on that field. Objects are dumped with
+    the schema named by their ``attribute`` (by default the field name),
+    read as a key of mappings and as an attribute of other objects.
+
+    ``pass_many`` hooks of the schemas each see one group of records
+    rather than the whole list. The middleware's ``bulk_loader`` and
+    ``dump_accelerator`` are not used for these schemas.
+    """
+
+    def __init__(self, field, schemas, attribute=None, many=False):
+        # type: (str, Mapping[Any, Any], Optional[str], bool) -> None
+        """Create the schema
+
+        :param field: the name of the discriminator in loaded data
+        :param schemas: a mapping of discriminator values to ``Schema``
+            instances or subclasses, which are instantiated once here
+        :param attribute: the name of the discriminator on dumped
+            objects, if different from ``field``
+        :param many: whether the data is a list of records
+        """
+        super(Discriminated, self).__init__(many=many)
+        self.discriminator = field
+        self.attribute = attribute or field
+        self.schemas = {
+            value: sch() if isinstance(sch, type) else sch
+            for value, sch in schemas.items()
+        }  # type: Dict[Any, Schema]
+        self._unknown_message = "Must be one of: %s." % ", ".join(
+            sorted(str(value) for value in self.schemas)
+        )
+
+    def _schema_for(self, value):
+        # type: (Any) -> Schema
+        """Return the schema for a discriminator value
+
+        :raises marshmallow.ValidationError: if the value is missing or
+            maps to no schema
+        """
+        try:
+            return self.schemas[value]
+        except (KeyError, TypeError):
+            pass
+        if value is missing:
+            message = "Missing data for required field."
+        else:
+            message = self._unknown_message
+        raise ValidationError({self.discriminator: [message]})
+
+    def _value(self, record, key, objects=False):
+        # type: (Any, str, bool) -> Any
+        """Return the discriminator of a record, or of an object
+
+        :param objects: whether to read the attributes of objects other
+            than mappings, rather than reject them
+        """
+        if isinstance(record, Mapping):
+            return record.get(key, missing)
+        if not objects:
+            raise ValidationError({"_schema": [self.error_messages["type"]]})
+        return getattr(record, key, missing)
+
+    def _group(self, records, key, objects=False):
+        # type: (Any, str, bool) -> Tuple[Dict[Any, Tuple[Schema, List[int], List[Any]]], Dict[int, Any]]
+        """Group records by discriminator value
+
+        :return: the schema, indexes and records of each group, and the
+            errors of records that belong to none
+        """
+        if not is_collection(records):
+            raise ValidationError({"_schema": [self.error_messages["type"]]})
+        groups = {}  # type: Dict[Any, Tuple[Schema, List[int], List[Any]]]
+        errors = {}  # type: Dict[int, Any]
+        for index, record in enumerate(records):
+            try:
+                value = self._value(record, key, objects)
+                group = groups.get(value)
+                if group is None:
+                    group = groups[value] = (self._schema_for(value), [], [])
+            except ValidationError as exc:
+                errors[index] = exc.messages
+                continue
+            except TypeError:
+                # An unhashable value, e.g. a list
+                errors[index] = {self.discriminator: [self._unknown_message]}
+                continue
+            group[1].append(index)
+            group[2].append(record)
+        return groups, errors
+
+    def load(self, data, many=None, partial=None, unknown=None):
+        # type: (Any, Optional[bool], Any, Optional[str]) -> Any
+        """Load data with the schema of each record
+
+        :raises marshmallow.ValidationError: if any records are invalid,
+            with errors keyed by their index in ``data`` when ``many``
+        """
+        many = self.many if many is None else bool(many)
+        kwargs = {"partial": partial, "unknown": unknown}
+        if not many:
+            sch = self._schema_for(self._value(data, self.discriminator))
+            return sch.load(data, **kwargs)
+
+        groups, errors = self._group(data, self.discriminator)
+        results = [{} for _ in data]  # type: List[Any]
+        for sch, indexes, records in groups.values():
+            try:
+                loaded = sch.load(records, many=True, **kwargs)
+            except ValidationError as exc:
+                loaded = exc.valid_data
+                messages = exc.messages
+                if not isinstance(messages, dict):
+                    messages = {"_schema": messages}
+                for position, message in messages.items():
+                    if isinstance(position, int):
+                        errors[indexes[position]] = message
+                    else:
+                        errors.setdefault(position, message)
+                if not isinstance(loaded, list) or len(loaded) != len(indexes):
+                    continue
+            for index, item in zip(indexes, loaded):
+                results[index] = item
+
+        if errors:
+            raise ValidationError(_sorted(errors), valid_data=results)
+        return results
+
+    def dump(self, obj, many=None):
+        # type: (Any, Optional[bool]) -> Any
+        """Dump an object, or a collection of objects, with their schemas
+
+        :raises marshmallow.ValidationError: if an object's discriminator
+            is missing or maps to no schema
+        """
+        many = self.many if many is None else bool(many)
+        if not many:
+            value = self._value(obj, self.attribute, objects=True)
+            return self._schema_for(value).dump(obj)
+
+        groups, errors = self._group(obj, self.attribute, objects=True)
+        if errors:
+            raise ValidationError(_sorted(errors))
+        results = [None] * len(obj)  # type: List[Any]
+        for sch, indexes, items in groups.values():
+            for index, item in zip(indexes, sch.dump(items, many=True)):
+                results[index] = item
+        return results
+
+    def validate(self, data, many=None, partial=None):
+        # type: (Any, Optional[bool], Any) -> Dict[Any, Any]
+        """Return the errors of loading data, or an empty dict"""
+        try:
+            self.load(data, many=many, partial=partial)
+        except ValidationError as exc:
+            return exc.messages  # type: ignore
+        return {}
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""A type-dispatched ``default`` hook for encoding rich types as JSON"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import datetime
+from enum import Enum
+from operator import attrgetter
+from uuid import UUID
+
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import dataclasses
+except ImportError:  # pragma: no cover
+    dataclasses = None  # type: ignore
+
+
+def _dataclass_fields(obj):
+    # type: (Any) -> Dict[str, Any]
+    """Encode a dataclass instance as a mapping of its fields"""
+    return {
+        field.name: getattr(obj, field.name)
+        for field in dataclasses.fields(obj)
+    }
+
+
+# Unbound methods and builtins, rather than wrapper functions, to save a
+# Python-level call per encoded object
+DEFAULT_HANDLERS = {
+    datetime.datetime: datetime.datetime.isoformat,
+    datetime.date: datetime.date.isoformat,
+    datetime.time: datetime.time.isoformat,
+    UUID: str,
+    Enum: attrgetter("value"),
+    set: list,
+    frozenset: list,
+}  # type: Dict[type, Callable[[Any], Any]]
+
+
+class TypeDispatchEncoder:
+    """Encode objects the JSON module does not know how to, by type
+
+    Instances are meant to be passed as the ``default`` argument of a json
+    module's ``dumps()``, which calls them for each object it cannot
+    encode itself. The handler for an object is looked up by its type,
+    walking the type's MRO, so a handler registered for a class also
+    applies to its subclasses. The result of that walk is cached per
+    type, so each call after the first costs a single dict lookup.
+    Dataclass instances are encoded as mappings of their fields.
+
+    Handlers may return any object the json module can encode, including
+    objects that themselves need a handler.
+    """
+
+    def __init__(self, handlers=None, include_defaults=True):
+        # type: (Optional[Dict[type, Callable[[Any], Any]]], bool) -> None
+        """Create the encoder
+
+        :param handlers: a mapping of types to callables returning a
+            JSON-encodable representation of an instance
+        :param include_defaults: whether to start with handlers for
+            ``datetime``, ``date``, ``time``, ``UUID``, ``Enum``, ``set``
+            and ``frozenset``
+        """
+        self._handlers = dict(DEFAULT_HANDLERS) if include_defaults else {}
+        self._handlers.update(handlers or {})
+        self._cache = {}  # type: Dict[type, Callable[[Any], Any]]
+
+    def register(self, cls, handler=None):
+        # type: (type, Optional[Callable[[Any], Any]]) -> Any
+        """Register a handler for a type and its subclasses
+
+        May also be used as a decorator, as ``@encoder.register(cls)``.
+
+        :param cls: the type to handle
+        :param handler: a callable returning a JSON-encodable
+            representation of an instance
+        """
+        if handler is None:
+
+            def decorator(func):
+                # type: (Callable[[Any], Any]) -> Callable[[Any], Any]
+                self.register(cls, func)
+                return func
+
+            return decorator
+
+        self._handlers[cls] = handler
+        self._cache = {}
+        return handler
+
+    def _resolve(self, cls):
+        # type: (type) -> Callable[[Any], Any]
+        """Find the handler for a type, and cache it
+
+        :raises TypeError: if no handler applies to the type
+        """
+        for base in cls.__mro__:
+            handler = self._handlers.get(base)
+            if handler is not None:
+                break
+        else:
+            if dataclasses is None or not dataclasses.is_dataclass(cls):
+                raise TypeError(
+                    "Object of type %s is not JSON serializable" % cls.__name__
+                )
+            handler = _dataclass_fields
+        self._cache[cls] = handler
+        return handler
+
+    def __call__(self, obj):
+        # type: (Any) -> Any
+        """Return a JSON-encodable representation of an object
+
+        :raises TypeError: if no handler applies to the object's type
+        """
+        handler = self._cache.get(type(obj))
+        if handler is None:
+            handler = self._resolve(type(obj))
+        return handler(obj)
+
+
+default_encoder = TypeDispatchEncoder()
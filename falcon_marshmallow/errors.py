@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""HTTP errors carrying Marshmallow error messages as structured data"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+
+from typing import Any, Callable, Dict, Optional
+
+# Third party
+from falcon.errors import HTTPInternalServerError, HTTPUnprocessableEntity
+
+
+log = logging.getLogger(__name__)
+
+
+def format_errors(error, messages):
+    # type: (Any, Any) -> Dict[str, Any]
+    """Return the body of an error response, with messages as they are
+
+    This is the simplest error formatter: the error's title, and the
+    messages under ``errors``, e.g.::
+
+        {"title": "422 Unprocessable Entity", "errors": {"name": [...]}}
+
+    :param error: the HTTP error being serialized
+    :param messages: the error messages, usually those of a
+        ``marshmallow.ValidationError``
+    """
+    return {"title": error.title, "errors": messages}
+
+
+def _encode(codec, obj):
+    # type: (Any, Any) -> str
+    """Encode an object with a codec, as text even if it returns bytes"""
+    encoded = codec.dumps(obj)
+    if isinstance(encoded, bytes):
+        return encoded.decode("utf-8")
+    return encoded  # type: ignore
+
+
+class _StructuredError:
+    """Serialize an HTTP error's messages once, with the configured codec
+
+    Without a formatter, the messages are encoded into the error's
+    ``description``, which Falcon then encodes again as a string in the
+    error body, as the middleware always did. This remains the default so
+    that clients parsing the description keep working. With a formatter,
+    the body is the mapping it returns, messages included as data,
+    encoded once.
+    """
+
+    def __init__(self, messages, codec, formatter=None, **kwargs):
+        # type: (Any, Any, Optional[Callable[[Any, Any], Any]], Any) -> None
+        """Create the error
+
+        :param messages: the error messages, usually those of a
+            ``marshmallow.ValidationError``
+        :param codec: the json module to encode the body with
+        :param formatter: a callable taking the error and the messages,
+            and returning the body of the error response as a mapping,
+            such as ``format_errors``
+        :param kwargs: passed to the Falcon error
+        """
+        if formatter is None:
+            kwargs["description"] = _encode(codec, messages)
+        super(_StructuredError, self).__init__(**kwargs)
+        self.messages = messages
+        self._codec = codec
+        self._formatter = formatter
+
+    def to_dict(self, obj_type=dict):
+        # type: (Any) -> Any
+        """Return the error response body as a mapping"""
+        if self._formatter is None:
+            # pylint: disable=no-member
+            return super(_StructuredError, self).to_dict(  # type: ignore
+                obj_type
+            )
+        body = self._formatter(self, self.messages)
+        return body if type(body) is obj_type else obj_type(body)
+
+    def to_json(self, *args):
+        # type: (Any) -> str
+        """Return the error response body, encoded once with the codec
+
+        Falcon 3 passes a media handler, which is not needed.
+        """
+        if self._formatter is None:
+            # pylint: disable=no-member
+            return super(_StructuredError, self).to_json(*args)  # type: ignore
+        return _encode(self._codec, self.to_dict())
+
+
+class HTTPValidationError(_StructuredError, HTTPUnprocessableEntity):
+    """A 422 for a request body that a schema could not load"""
+
+
+class HTTPSerializationError(_StructuredError, HTTPInternalServerError):
+    """A 500 for a result that a schema could not dump"""
+
+    def __init__(self, messages, codec, formatter=None, **kwargs):
+        # type: (Any, Any, Optional[Callable[[Any, Any], Any]], Any) -> None
+        """Create the error, titled "Could not serialize response"
+
+        See ``HTTPValidationError``.
+        """
+        kwargs.setdefault("title", "Could not serialize response")
+        super(HTTPSerializationError, self).__init__(
+            messages, codec, formatter, **kwargs
+        )
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Bounding the work and error output spent on invalid payloads"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+
+from typing import Any, Callable, Dict, List, Optional
+
+# Third party
+from marshmallow import Schema, ValidationError
+
+
+log = logging.getLogger(__name__)
+
+
+# The key added to error messages from which some errors were omitted
+TRUNCATED_KEY = "_truncated"
+
+
+def _has_many_hooks(sch):
+    # type: (Schema) -> bool
+    """Return whether a schema has hooks processing whole collections"""
+    for key, hooks in sch._hooks.items():
+        # Older releases of Marshmallow 3 key hooks by (tag, pass_many)
+        if isinstance(key, tuple):
+            if key[1] and hooks:
+                return True
+        elif any(hook[1] for hook in hooks):
+            return True
+    return False
+
+
+def count_errors(messages):
+    # type: (Any) -> int
+    """Return the number of errors in a set of error messages
+
+    Each list of messages of a field, at any depth of nesting, counts as
+    one error, as do messages that are not a dict.
+    """
+    if not isinstance(messages, dict):
+        return 1
+    return sum(
+        count_errors(message)
+        for key, message in messages.items()
+        if key != TRUNCATED_KEY
+    )
+
+
+def _take_errors(messages, max_errors):
+    # type: (Dict[Any, Any], int) -> Dict[Any, Any]
+    """Return the first ``max_errors`` errors of a dict of error messages
+
+    Nested dicts, such as those of ``Nested`` fields or the index maps of
+    ``List`` fields, are truncated as well.
+    """
+    taken = {}  # type: Dict[Any, Any]
+    for key, message in messages.items():
+        if max_errors <= 0:
+            break
+        if key == TRUNCATED_KEY:
+            continue
+        if isinstance(message, dict):
+            message = _take_errors(message, max_errors)
+        taken[key] = message
+        max_errors -= count_errors(message)
+    return taken
+
+
+def truncate_errors(messages, max_errors):
+    # type: (Any, int) -> Any
+    """Return at most ``max_errors`` errors of a dict of error messages
+
+    Errors are counted by ``count_errors()``, and dropped at any depth of
+    nesting, keeping those that come first. If any are dropped,
+    ``TRUNCATED_KEY`` is set in the result. Messages that are not a dict
+    are returned unchanged.
+    """
+    if not isinstance(messages, dict) or count_errors(messages) <= max_errors:
+        return messages
+    truncated = _take_errors(messages, max_errors)
+    truncated[TRUNCATED_KEY] = True
+    return truncated
+
+
+def load_in_chunks(sch, records, chunk_size=1000, load=None, max_errors=None):
+    # type: (Schema, List[Any], int, Optional[Callable[[List[Any]], Any]], Optional[int]) -> List[Any]
+    """Load a list with a ``many=True`` schema, a chunk at a time
+
+    Loading in chunks bounds the intermediate data held at once, and lets
+    loading stop early on errors. Schemas with ``pass_many`` hooks or
+    validators need the whole list at once, and are loaded in one go.
+
+    :param sch: the schema to load the records with
+    :param records: the parsed request body
+    :param chunk_size: the number of records to load at a time
+    :param load: the function loading a chunk of records, by default
+        ``sch.load``
+    :param max_errors: if set, the number of errors, as counted by
+        ``count_errors()``, after which to stop loading, and the maximum
+        number of errors reported. Lists nested in the records are loaded
+        in full, only their errors being truncated.
+
+    :raises marshmallow.ValidationError: if any records are invalid, with
+        their errors keyed by their index in ``records``
+    """
+    if load is None:
+        load = sch.load
+    if len(records) <= chunk_size or _has_many_hooks(sch):
+        try:
+            return load(records)  # type: ignore
+        except ValidationError as exc:
+            if max_errors is None:
+                raise
+            raise ValidationError(
+                truncate_errors(exc.messages, max_errors),
+                valid_data=exc.valid_data,
+            )
+
+    results = []  # type: List[Any]
+    errors = {}  # type: Dict[Any, Any]
+    total = 0
+    for start in range(0, len(records), chunk_size):
+        try:
+            results.extend(load(records[start : start + chunk_size]))
+            continue
+        except ValidationError as exc:
+            messages = exc.messages
+            results.extend(exc.valid_data or ())
+        if not isinstance(messages, dict):
+            messages = {"_schema": messages}
+        for index, message in messages.items():
+            if isinstance(index, int):
+                index += start
+            errors[index] = message
+        total += count_errors(messages)
+        if max_errors is not None and total >= max_errors:
+            if start + chunk_size < len(records):
+                log.debug(
+                    "Stopped loading after %d errors in %d of %d records",
+                    total,
+                    start + chunk_size,
+                    len(records),
+                )
+                errors[TRUNCATED_KEY] = True
+            break
+
+    if errors:
+        if max_errors is not None:
+            errors = truncate_errors(errors, max_errors)
+        raise ValidationError(errors, valid_data=results)
+    return results
+
+
+def load_fail_fast(sch, records, max_errors, chunk_size=1000, load=None):
+    # type: (Schema, List[Any], int, int, Optional[Callable[[List[Any]], Any]]) -> List[Any]
+    """Load a list with a ``many=True`` schema, stopping early on errors
+
+    The records are loaded in chunks of ``chunk_size``, and loading stops
+    after the first chunk that brings the number of errors to
+    ``max_errors``, so that a payload full of errors costs at most one
+    chunk more than it takes to find them. See ``load_in_chunks``.
+
+    :raises marshmallow.ValidationError: if any records are invalid, with
+        at most ``max_errors`` errors in its messages, keyed by the index
+        of their record in ``records``
+    """
+    return load_in_chunks(sch, records, chunk_size, load, max_errors)
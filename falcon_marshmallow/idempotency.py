@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Replay cached responses for retried requests with an Idempotency-Key"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from typing import Any, Callable, Iterable, Optional, Set
+
+# Third party
+from falcon import HTTPConflict, Request, Response
+
+# Local
+from ._lru import LRUCache
+from .middleware import get_stashed_content
+
+
+log = logging.getLogger(__name__)
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENT_METHODS = ("POST", "PUT")
+IDEMPOTENCY_KEY = "idempotency_key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+REPLAYED_KEY = "idempotent_replayed"
+# The response headers stored and replayed along with the body
+STORED_HEADERS = ("Location", "ETag", "Content-Location")
+
+
+# headers is a tuple of (name, value) pairs, empty by default
+StoredResponse = namedtuple(
+    "StoredResponse", "status content_type body headers"
+)
+StoredResponse.__new__.__defaults__ = ((),)
+
+
+class MemoryStore:
+    """Store responses in a per-process, size-bounded LRU mapping"""
+
+    def __init__(self, max_entries=1024):
+        # type: (int) -> None
+        """Create the store
+
+        :param max_entries: the maximum number of responses to keep
+        """
+        self._cache = LRUCache(max_entries)
+
+    def get(self, key):
+        # type: (str) -> Optional[StoredResponse]
+        """Return the response stored under a key, if any"""
+        return self._cache.get(key)  # type: ignore
+
+    def set(self, key, response):
+        # type: (str, StoredResponse) -> None
+        """Store a response under a key"""
+        self._cache.set(key, response)
+
+
+class SQLiteStore:
+    """Store responses in a SQLite database shared by worker processes
+
+    Each thread of each process opens its own connection on first use,
+    so a store may be created before a server forks its workers. The
+    database is put into WAL mode so that readers do not block behind
+    writers.
+    """
+
+    _PRUNE_EVERY = 100
+
+    def __init__(self, path, ttl=24 * 60 * 60, timeout=5.0):
+        # type: (str, Optional[float], float) -> None
+        """Create the store, initializing the database if needed
+
+        :param path: the path of the SQLite database file
+        :param ttl: the number of seconds for which stored responses
+            may be replayed, or ``None`` to keep them forever
+        :param timeout: the number of seconds to wait for a lock on
+            the database before giving up
+        """
+        self._path = path
+        self._ttl = ttl
+        self._timeout = timeout
+        self._local = threading.local()
+        self._sets = 0
+
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotent_responses ("
+                "key TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "content_type TEXT, body BLOB NOT NULL, "
+                "created REAL NOT NULL, headers TEXT)"
+            )
+            try:
+                # Databases created before headers were stored
+                conn.execute(
+                    "ALTER TABLE idempotent_responses ADD COLUMN headers TEXT"
+                )
+            except sqlite3.OperationalError:
+                pass
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idempotent_responses_created "
+                "ON idempotent_responses (created)"
+            )
+        finally:
+            conn.close()
+
+    def _connection(self):
+        # type: () -> sqlite3.Connection
+        """Return a connection for the current thread and process"""
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            self._local.conn = sqlite3.connect(
+                self._path, timeout=self._timeout, isolation_level=None
+            )
+            self._local.pid = pid
+        return self._local.conn  # type: ignore
+
+    def get(self, key):
+        # type: (str) -> Optional[StoredResponse]
+        """Return the response stored under a key, if any"""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT status, content_type, body, created, headers "
+                "FROM idempotent_responses WHERE key = ?",
+                (key,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        status, content_type, body, created, headers = row
+        if self._ttl is not None and created < time.time() - self._ttl:
+            return None
+        return StoredResponse(
+            status,
+            content_type,
+            bytes(body),
+            tuple(tuple(pair) for pair in json.loads(headers or "[]")),
+        )
+
+    def set(self, key, response):
+        # type: (str, StoredResponse) -> None
+        """Store a response under a key"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO idempotent_responses "
+            "(key, status, content_type, body, created, headers) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                response.status,
+                response.content_type,
+                sqlite3.Binary(response.body),
+                now,
+                json.dumps(response.headers),
+            ),
+        )
+        self._sets += 1
+        if self._ttl is not None and self._sets % self._PRUNE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM idempotent_responses WHERE created < ?",
+                (now - self._ttl,),
+            )
+
+
+class IdempotencyCache:
+    """Answer retried requests with the response stored for the first
+
+    Requests using one of the configured methods and carrying an
+    ``Idempotency-Key`` header are looked up in a store by that key,
+    the method and path, and a hash of the raw request body. If a
+    response was stored, it is replayed immediately, without routing the
+    request, parsing its body, or loading it with a schema. Otherwise,
+    the serialized response is stored once the request succeeds, along
+    with its ``Location``, ``ETag`` and ``Content-Location`` headers.
+
+    A request whose key is already being handled by this process, and
+    has no stored response yet, is rejected with a 409 Conflict, which
+    the client may retry. Requests handled by different processes
+    sharing a ``SQLiteStore`` are not checked this way, so each of them
+    may be handled.
+
+    This middleware should be listed *before* ``Marshmallow`` so that
+    it sees the response body after ``Marshmallow`` has serialized it.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        header=IDEMPOTENCY_HEADER,
+        methods=IDEMPOTENT_METHODS,
+        scope=None,
+        stored_headers=STORED_HEADERS,
+    ):
+        # type: (Any, str, Iterable[str], Optional[Callable[[Request], str]], Iterable[str]) -> None
+        """Initialize the middleware
+
+        :param store: an object with ``get(key)`` and
+            ``set(key, response)`` methods to hold responses. Defaults
+            to a ``MemoryStore``; use a ``SQLiteStore`` to share
+            responses across worker processes.
+        :param header: the request header holding the client's key
+        :param methods: the HTTP methods whose responses are stored
+        :param scope: an optional callable returning a string that
+            identifies the client of a request (e.g. an authenticated
+            user id). Keys are only replayed to requests in the same
+            scope, so that clients cannot replay one another's responses.
+        :param stored_headers: the response headers stored and replayed
+            along with the body
+        """
+        log.debug(
+            "IdempotencyCache.__init__(%s, %s, %s, %s, %s)",
+            store,
+            header,
+            methods,
+            scope,
+            stored_headers,
+        )
+        self._store = store if store is not None else MemoryStore()
+        self._header = header
+        self._methods = tuple(methods)
+        self._scope = scope
+        self._stored_headers = tuple(stored_headers)
+        self._in_flight = set()  # type: Set[str]
+        self._lock = threading.Lock()
+
+    def _get_key(self, req):
+        # type: (Request) -> Optional[str]
+        """Return the store key for a request, or None if not applicable"""
+        if req.method not in self._methods:
+            return None
+        client_key = req.get_header(self._header)
+        if not client_key:
+            return None
+        digest = hashlib.sha256(get_stashed_content(req) or b"").hexdigest()
+        scope = self._scope(req) if self._scope is not None else ""
+        return "\n".join((scope, client_key, req.method, req.path, digest))
+
+    def process_request(self, req, resp):
+        # type: (Request, Response) -> None
+        """Replay a stored response for the request, if there is one
+
+        :param req: the passed request object
+        :param resp: the passed response object
+        """
+        log.debug("IdempotencyCache.process_request(%s, %s)", req, resp)
+        key = self._get_key(req)
+        if key is None:
+            return
+
+        stored = self._store.get(key)
+        if stored is None:
+            with self._lock:
+                if key in self._in_flight:
+                    raise HTTPConflict(
+                        description=(
+                            "A request with this %s is already being "
+                            "handled." % self._header
+                        )
+                    )
+                self._in_flight.add(key)
+            req.context[IDEMPOTENCY_KEY] = key
+            return
+
+        resp.status = stored.status
+        if stored.content_type is not None:
+            resp.content_type = stored.content_type
+        for name, value in stored.headers:
+            resp.set_header(name, value)
+        resp.data = stored.body
+        resp.set_header(REPLAYED_HEADER, "true")
+        req.context[REPLAYED_KEY] = True
+        resp.complete = True
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        # type: (Request, Response, object, bool) -> None
+        """Store the serialized response of a successful request
+
+        :param req: the passed request object
+        :param resp: the passed response object
+        :param resource: the resource object
+        :param req_succeeded: whether the request was successful
+        """
+        log.debug(
+            "IdempotencyCache.process_response(%s, %s, %s, %s)",
+            req,
+            resp,
+            resource,
+            req_succeeded,
+        )
+        key = req.context.get(IDEMPOTENCY_KEY)
+        if key is None:
+            return
+        try:
+            if req_succeeded:
+                self._store_response(key, resp)
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def _store_response(self, key, resp):
+        # type: (str, Response) -> None
+        """Store the serialized response of a request, if not streamed"""
+        if resp.stream is not None:
+            # Streamed bodies cannot be read without consuming them
+            return
+
+        body = resp.data if resp.data is not None else resp.body
+        if body is None:
+            body = b""
+        elif not isinstance(body, bytes):
+            body = body.encode("utf-8")
+
+        headers = tuple(
+            (name, resp.get_header(name))
+            for name in self._stored_headers
+            if resp.get_header(name) is not None
+        )
+        self._store.set(
+            key, StoredResponse(resp.status, resp.content_type, body, headers)
+        )
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Limits on the complexity of JSON request bodies"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+import re
+
+from typing import Any, List, Optional, Tuple
+
+# Third party
+from falcon.errors import HTTPPayloadTooLarge, HTTPUnprocessableEntity
+
+log = logging.getLogger(__name__)
+
+
+# The bytes of a document that are neither brackets nor commas. Scalars
+# other than strings need no checks, and are always separated by commas.
+_NOT_STRUCTURE = bytes(
+    bytearray(byte for byte in range(256) if chr(byte) not in "[]{},")
+)
+# Arrays and objects holding no other arrays or objects
+_INNERMOST = re.compile(rb"\[,*\]|\{,*\}")
+# The levels of nesting removed at once, before walking what remains
+_MAX_PASSES = 16
+
+
+class JSONLimits:
+    """Reject JSON documents that are too complex, before parsing them
+
+    JSON modules offer no way to stop a parse part way through, so the
+    body is checked first, so that the expensive parse and the memory it
+    needs are never spent on a document that will be rejected. The check
+    splits the body on its quotes, and counts its strings, brackets and
+    commas with bytes methods rather than token by token, so that it
+    costs less than the parse. Only documents with more brackets or
+    commas in total than the depth or item limits have their nesting
+    checked, a level at a time.
+
+    Every limit defaults to ``None``, meaning unlimited.
+    """
+
+    def __init__(
+        self,
+        max_depth=None,
+        max_array_length=None,
+        max_object_keys=None,
+        max_string_length=None,
+        max_tokens=None,
+    ):
+        # type: (Optional[int], Optional[int], Optional[int], Optional[int], Optional[int]) -> None
+        """Set the limits
+
+        :param max_depth: the maximum nesting depth of arrays and objects
+        :param max_array_length: the maximum number of items in an array
+        :param max_object_keys: the maximum number of keys in an object
+        :param max_string_length: the maximum length of a string, in
+            characters as encoded in the document (i.e. counting escape
+            sequences), whether the body is text or bytes
+        :param max_tokens: the maximum total number of strings, brackets
+            and commas in the document
+        """
+        self.max_depth = max_depth
+        self.max_array_length = max_array_length
+        self.max_object_keys = max_object_keys
+        self.max_string_length = max_string_length
+        self.max_tokens = max_tokens
+
+    def check(self, body):
+        # type: (Any) -> None
+        """Check a raw JSON document against the limits
+
+        Malformed documents are not reported here, but left to the parser.
+
+        :param body: the document, as bytes or text
+
+        :raises falcon.HTTPPayloadTooLarge: if the document holds too many
+            tokens
+        :raises falcon.HTTPUnprocessableEntity: if the document is nested
+            too deeply, or holds an array, object or string that is too
+            long
+        """
+        if not body:
+            return
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        if b"\\" in body:
+            # Backslashes only appear in strings, each escaping the next
+            # character, so pairs are replaced from left to right, by as
+            # many characters, and the remaining quotes delimit strings
+            body = body.replace(b"\\\\", b"__").replace(b'\\"', b"__")
+        parts = body.split(b'"')
+        strings = parts[1::2]
+        structure = b"".join(parts[0::2]).translate(None, _NOT_STRUCTURE)
+
+        max_tokens = self.max_tokens
+        if (
+            max_tokens is not None
+            and len(strings) + len(structure) > max_tokens
+        ):
+            self._reject(
+                "holds more than %d tokens" % max_tokens, too_large=True
+            )
+
+        max_string = self.max_string_length
+        if (
+            max_string is not None
+            and strings
+            and max(map(len, strings)) > max_string
+        ):
+            for string in strings:
+                # A character may take several bytes
+                if len(string) > max_string and (
+                    len(string.decode("utf-8", "replace")) > max_string
+                ):
+                    self._reject(
+                        "holds a string longer than %d characters" % max_string
+                    )
+
+        # The number of opening brackets bounds the depth, and the number
+        # of commas the items of any one container
+        item_limits = [
+            limit
+            for limit in (self.max_array_length, self.max_object_keys)
+            if limit is not None
+        ]
+        if (
+            self.max_depth is not None
+            and structure.count(b"[") + structure.count(b"{") > self.max_depth
+        ) or (item_limits and structure.count(b",") >= min(item_limits)):
+            self._check_structure(structure)
+
+    def _check_structure(self, structure):
+        # type: (bytes) -> None
+        """Check the nesting of the brackets and commas of a document
+
+        The innermost arrays and objects are checked and removed, a level
+        of nesting at a time, so that the commas left in a container are
+        those separating its own items. Documents nested more deeply than
+        a few levels have the rest of their brackets walked one by one.
+        """
+        max_depth = self.max_depth
+        too_long = []  # type: List[Tuple[Any, str, int]]
+        for limit, opening, description in (
+            (self.max_array_length, b"[", "an array of more than %d items"),
+            (self.max_object_keys, b"{", "an object of more than %d keys"),
+        ):
+            if limit is not None:
+                # Reported on the limit-th comma, as items are counted
+                pattern = re.escape(opening) + b",{%d}" % max(limit, 1)
+                too_long.append((re.compile(pattern), description, limit))
+
+        if max_depth is not None and re.search(
+            b"[\\[{]{%d}" % (max_depth + 1), structure
+        ):
+            # As many brackets opened in a row need no further counting
+            self._reject("is nested deeper than %d levels" % max_depth)
+
+        depth = 0
+        while structure:
+            for pattern, description, limit in too_long:
+                if pattern.search(structure):
+                    self._reject("holds " + description % limit)
+            if depth == _MAX_PASSES:
+                self._walk(structure.decode("ascii"), depth)
+                return
+            structure, count = _INNERMOST.subn(b"", structure)
+            if not count:
+                # Unbalanced brackets are left to the parser
+                return
+            depth += 1
+            if max_depth is not None and depth > max_depth:
+                self._reject("is nested deeper than %d levels" % max_depth)
+
+    def _walk(self, structure, removed):
+        # type: (str, int) -> None
+        """Check brackets and commas one by one, keeping a stack
+
+        :param structure: the brackets and commas of a document
+        :param removed: the levels of nesting already removed from it
+        """
+        max_depth = self.max_depth
+        max_array = self.max_array_length
+        max_keys = self.max_object_keys
+        # For each open container: its number of commas, its item limit,
+        # and how to describe exceeding it
+        stack = []  # type: List[List[Any]]
+        for char in structure:
+            if char == ",":
+                if stack:
+                    container = stack[-1]
+                    container[0] += 1
+                    if (
+                        container[1] is not None
+                        and container[0] >= container[1]
+                    ):
+                        self._reject("holds " + container[2] % container[1])
+            elif char in "[{":
+                if max_depth is not None and len(stack) + removed >= max_depth:
+                    self._reject("is nested deeper than %d levels" % max_depth)
+                if char == "[":
+                    stack.append(
+                        [0, max_array, "an array of more than %d items"]
+                    )
+                else:
+                    stack.append(
+                        [0, max_keys, "an object of more than %d keys"]
+                    )
+            elif stack:
+                stack.pop()
+
+    @staticmethod
+    def _reject(reason, too_large=False):
+        # type: (str, bool) -> None
+        """Raise the error for a document exceeding a limit"""
+        description = "The request body %s." % reason
+        log.debug("Rejecting request: %s", description)
+        if too_large:
+            raise HTTPPayloadTooLarge(
+                title="Request body too complex", description=description
+            )
+        raise HTTPUnprocessableEntity(
+            title="Request body too complex", description=description
+        )
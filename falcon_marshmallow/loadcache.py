@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""A cache of the data loaded from repeated, identical request bodies"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import copy
+import hashlib
+import logging
+
+from typing import Any, Hashable, Optional
+
+# Local
+from ._lru import LRUCache
+
+
+log = logging.getLogger(__name__)
+
+
+# Returned by LoadCache.get() for keys that are not cached
+NOT_CACHED = object()
+
+
+class FrozenDict(dict):
+    """A dict that raises ``TypeError`` on any attempt to modify it
+
+    Unlike a ``MappingProxyType``, it is still a ``dict``, so that JSON
+    modules and ``isinstance()`` checks treat it as one.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        # type: (*Any, **Any) -> None
+        """Refuse to modify the dict"""
+        raise TypeError("Cached request data cannot be modified")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable  # type: ignore
+    # In-place union, d |= other, in Python 3.9+
+    __ior__ = _immutable  # type: ignore
+
+    def __copy__(self):
+        # type: () -> dict
+        """Return a mutable copy"""
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        # type: (Any) -> dict
+        """Return a mutable deep copy"""
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        # type: () -> Any
+        """Pickle as a plain dict"""
+        return dict, (dict(self),)
+
+
+def freeze(data):
+    # type: (Any) -> Any
+    """Return an immutable equivalent of loaded data
+
+    Dicts become ``FrozenDict`` instances, lists tuples, and sets
+    frozensets, recursively. Other objects are returned as they are.
+    """
+    kind = type(data)
+    if kind is dict or kind is FrozenDict:
+        return FrozenDict((key, freeze(value)) for key, value in data.items())
+    if kind is list or kind is tuple:
+        return tuple(freeze(item) for item in data)
+    if kind is set:
+        return frozenset(data)
+    return data
+
+
+class LoadCache:
+    """Cache the data loaded by a schema, keyed by the raw request body
+
+    Clients of search and report endpoints often post the same document
+    over and over. On a hit, the cached data is used without parsing the
+    body or loading it with the schema.
+
+    Handlers must not be able to corrupt the cache by modifying the data
+    they are given, so by default each hit returns a deep copy, and a deep
+    copy is stored on a miss. With ``freeze=True``, the data is instead
+    frozen once with ``freeze()``, and handlers get the frozen data, which
+    is cheaper on hits but means that they receive tuples instead of
+    lists, and that they cannot modify it.
+
+    Only use it with schemas whose loaded data depends on the body alone:
+    not with, e.g., fields with a ``load_default`` of ``uuid4``, or
+    ``post_load`` hooks creating database objects.
+    """
+
+    def __init__(self, max_entries=1024, max_body_size=64 * 1024, freeze=False):
+        # type: (int, int, bool) -> None
+        """Create an empty cache
+
+        :param max_entries: the maximum number of loaded bodies to keep.
+            The least recently used are evicted.
+        :param max_body_size: bodies larger than this, in bytes, are
+            never cached, which bounds the memory of the cache and keeps
+            it for the small documents that tend to be repeated
+        :param freeze: whether to return frozen data rather than copies
+        """
+        self.max_body_size = max_body_size
+        self.freeze = freeze
+        self._entries = LRUCache(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, sch, body, scope=()):
+        # type: (Any, Any, Optional[Hashable]) -> Optional[Hashable]
+        """Return the cache key for a body loaded by a schema, if cacheable
+
+        :param sch: the schema loading the body
+        :param body: the raw body, as bytes or text
+        :param scope: a hashable key of anything else the loaded data
+            depends on, such as the schema context of the request, or
+            ``None`` if the data must not be cached
+        """
+        if scope is None or not body or len(body) > self.max_body_size:
+            return None
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        return sch, hashlib.sha1(body).digest(), scope
+
+    def get(self, key):
+        # type: (Optional[Hashable]) -> Any
+        """Return the data cached for a key, or ``NOT_CACHED``"""
+        if key is None:
+            return NOT_CACHED
+        data = self._entries.get(key, NOT_CACHED)
+        if data is NOT_CACHED:
+            self.misses += 1
+            return NOT_CACHED
+        self.hits += 1
+        return data if self.freeze else copy.deepcopy(data)
+
+    def put(self, key, data):
+        # type: (Optional[Hashable], Any) -> Any
+        """Cache the data loaded for a key, returning the data to use
+
+        :param key: the key returned by ``key()``
+        :param data: the loaded data
+        """
+        if key is None:
+            return data
+        if self.freeze:
+            data = freeze(data)
+            self._entries.set(key, data)
+        else:
+            self._entries.set(key, copy.deepcopy(data))
+        return data
+
+    def clear(self):
+        # type: () -> None
+        """Remove all cached data"""
+        self._entries.clear()
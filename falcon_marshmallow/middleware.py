@@ -8,26 +8,61 @@ from __future__ import (
     print_function,
     unicode_literals,
 )
+import copy
 import logging
-
-from typing import Any, Iterable, Optional
+import zlib
+from functools import partial
+from timeit import default_timer
+
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
 
 # Third party
 from falcon.vendor import mimeparse
 import marshmallow
-from marshmallow import Schema, ValidationError
-
-import simplejson
+from marshmallow import Schema, ValidationError, fields
 
 from falcon import Request, Response
 from falcon.errors import (
     HTTPBadRequest,
+    HTTPConflict,
     HTTPInternalServerError,
     HTTPNotAcceptable,
-    HTTPUnprocessableEntity,
+    HTTPPayloadTooLarge,
+    HTTPServiceUnavailable,
     HTTPUnsupportedMediaType,
 )
 
+# Local
+from ._lru import LRUCache
+from .discriminator import Discriminated
+from .errors import HTTPSerializationError, HTTPValidationError
+from .failfast import load_fail_fast, truncate_errors
+from .limits import JSONLimits
+from .loadcache import NOT_CACHED, LoadCache
+from .options import DumpOptions, LoadOptions, QueryOptions
+from .patch import (
+    MERGE_PATCH_CONTENT_TYPE,
+    PATCH_CONTENT_TYPES,
+    PATCH_KEY,
+    PatchConflict,
+    PatchError,
+    apply_patch,
+)
+from .pool import SCHEMA_CONTEXT_KEY, SchemaPool, context_key
+from .profiling import FieldProfiler
+from .registry import SchemaRegistry
+from .shedding import LoadShedder
+from .trust import DESERIALIZE_ONLY, SKIP
 
 log = logging.getLogger(__name__)
 
@@ -35,11 +70,90 @@ log = logging.getLogger(__name__)
 JSON_CONTENT_REQUIRED_METHODS = ("POST", "PUT", "PATCH")
 JSON_CONTENT_TYPE = "application/json"
 CONTENT_KEY = "content"
+PARSED_CONTENT_KEY = "parsed_content"
+
+# Limits on decompressing request bodies, to defuse "zip bombs". The ratio
+# is only checked once a body has grown past RATIO_CHECK_MIN_SIZE, so that
+# small, very repetitive documents are accepted.
+MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
+MAX_COMPRESSION_RATIO = 100
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+# The zlib window bits for each supported Content-Encoding
+_DECOMPRESS_WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+_READ_CHUNK_SIZE = 64 * 1024
 MARSHMALLOW_2 = marshmallow.__version_info__ < (3,)
 
 
-def get_stashed_content(req):
-    # type: (Request) -> Any
+def _decompress(stream, wbits, max_size, max_ratio):
+    # type: (Any, int, int, float) -> bytes
+    """Read and decompress a stream, a chunk at a time, within limits
+
+    :raises falcon.HTTPPayloadTooLarge: if the decompressed data would
+        exceed ``max_size`` bytes, or ``max_ratio`` times the size of
+        the compressed data read so far
+    :raises falcon.HTTPBadRequest: if the data is corrupt or truncated
+    """
+    decompressor = zlib.decompressobj(wbits)
+    chunks = []
+    size = read = 0
+    try:
+        while not decompressor.eof:
+            data = stream.read(_READ_CHUNK_SIZE)
+            if not data:
+                break
+            read += len(data)
+            while data:
+                # Never inflate more than the remaining allowance at once
+                chunk = decompressor.decompress(data, max_size + 1 - size)
+                size += len(chunk)
+                chunks.append(chunk)
+                if size > max_size or (
+                    size > RATIO_CHECK_MIN_SIZE and size > read * max_ratio
+                ):
+                    raise HTTPPayloadTooLarge(
+                        description=(
+                            "The decompressed request body would be larger "
+                            "than the server allows."
+                        )
+                    )
+                data = decompressor.unconsumed_tail
+    except zlib.error:
+        raise HTTPBadRequest(
+            description="The request body could not be decompressed."
+        )
+    if not decompressor.eof:
+        raise HTTPBadRequest(description="The request body is truncated.")
+    return b"".join(chunks)
+
+
+def _loaded_keys(sch):
+    # type: (Schema) -> Iterator[Tuple[str, str, fields.Field]]
+    """Yield the keys of the input a schema loads, with the names of
+    their fields and the fields
+
+    Marshmallow 3 loads its ``load_fields`` from their ``data_key``, if
+    any, and Marshmallow 2 the fields that are not ``dump_only`` from
+    their name, or from their ``load_from`` key.
+    """
+    if not MARSHMALLOW_2:
+        for name, field in sch.load_fields.items():
+            yield field.data_key or name, name, field
+        return
+    for name, field in sch.fields.items():
+        if not field.dump_only:
+            yield name, name, field
+            load_from = getattr(field, "load_from", None)
+            if load_from:
+                yield load_from, name, field
+
+
+def get_stashed_content(req, max_size=None, max_ratio=None):
+    # type: (Request, Optional[int], Optional[float]) -> Any
     """Allow multiple middlewares acting on data in the request stream.
 
     For this to work, no middlewware should use `req.stream.read()` directly,
@@ -50,14 +164,98 @@ def get_stashed_content(req):
     some point), the first middleware to use `req.stream.read()` will make
     an following middleware get no data, as the stream is not seekable; it does
     not support being rewound (no `seek(0)`).
+
+    Bodies with a ``Content-Encoding`` of ``gzip`` or ``deflate`` are
+    decompressed as they are read, and the decompressed content stashed.
+    The limits only apply to the middleware reading the body first.
+
+    :param req: the request object
+    :param max_size: the maximum size of a decompressed body, in bytes.
+        Defaults to ``MAX_DECOMPRESSED_SIZE``.
+    :param max_ratio: the maximum ratio of the size of a decompressed
+        body to its compressed size. Defaults to ``MAX_COMPRESSION_RATIO``.
+
+    :raises falcon.HTTPPayloadTooLarge: if a compressed body exceeds
+        either limit once decompressed
+    :raises falcon.HTTPBadRequest: if a compressed body is corrupt
     """
     # This is the key which will hold the already-read content.
     if req.context.get(CONTENT_KEY) is None:
-        req.context[CONTENT_KEY] = req.bounded_stream.read()
+        encoding = req.get_header("Content-Encoding")
+        wbits = (
+            _DECOMPRESS_WBITS.get(encoding.strip().lower())
+            if encoding
+            else None
+        )
+        if wbits is None:
+            req.context[CONTENT_KEY] = req.bounded_stream.read()
+        else:
+            req.context[CONTENT_KEY] = _decompress(
+                req.bounded_stream,
+                wbits,
+                MAX_DECOMPRESSED_SIZE if max_size is None else max_size,
+                MAX_COMPRESSION_RATIO if max_ratio is None else max_ratio,
+            )
 
     return req.context[CONTENT_KEY]
 
 
+def get_parsed_content(req, loads=None):
+    # type: (Request, Optional[Callable[[Any], Any]]) -> Any
+    """Return the request body parsed as JSON, parsing it at most once
+
+    The first call parses the content returned by ``get_stashed_content``,
+    and stashes the result (or the error raised) under
+    ``req.context['parsed_content']``. Later calls, e.g. from other
+    middlewares, return the same document (or raise the same error)
+    without parsing the body again. Consumers must therefore not modify
+    the document they get.
+
+    :param req: the request object
+    :param loads: the function to parse the body with, if it has not been
+        parsed yet. Defaults to ``simplejson.loads``.
+
+    :raises ValueError: if the body is not valid JSON, or not encoded
+        as UTF-8 (e.g. a ``JSONDecodeError`` or ``UnicodeDecodeError``)
+    """
+    stashed = req.context.get(PARSED_CONTENT_KEY)
+    if stashed is None:
+        if loads is None:
+            import simplejson
+
+            loads = simplejson.loads
+        try:
+            stashed = (loads(get_stashed_content(req)), None)
+        except ValueError as exc:
+            stashed = (None, exc)
+        req.context[PARSED_CONTENT_KEY] = stashed
+
+    parsed, error = stashed
+    if error is not None:
+        raise error
+    return parsed
+
+
+class _Unpooled:
+    """Lend a schema itself, when there is no ``schema_pool``"""
+
+    __slots__ = ("sch",)
+
+    def __init__(self, sch):
+        # type: (Schema) -> None
+        """Lend a schema"""
+        self.sch = sch
+
+    def __enter__(self):
+        # type: () -> Schema
+        """Return the schema"""
+        return self.sch
+
+    def __exit__(self, *exc_info):
+        # type: (*Any) -> None
+        """Do nothing"""
+
+
 class JSONEnforcer:
     """Enforce that requests are JSON compatible"""
 
@@ -96,9 +294,9 @@ class JSONEnforcer:
             )
 
         if req.method in JSON_CONTENT_REQUIRED_METHODS:
-            if (
-                req.content_type is None
-                or "application/json" not in req.content_type
+            if req.content_type is None or (
+                "application/json" not in req.content_type
+                and MERGE_PATCH_CONTENT_TYPE not in req.content_type
             ):
                 raise HTTPUnsupportedMediaType(
                     description=(
@@ -142,20 +340,26 @@ class EmptyRequestDropper:
 class Marshmallow:
     """Attempt to deserialize objects with any available schemas"""
 
-    # TODO: consider some sort of config object as the options here
-    # continue to grow in number.
     def __init__(  # pylint: disable=too-many-arguments
         self,
-        req_key="json",
-        resp_key="result",
-        force_json=True,
+        req_key="json",  # type: str
+        resp_key="result",  # type: str
+        force_json=True,  # type: bool
         # TODO: deprecate `json_module` param and change name to something
         # more generic, e.g. `content_parser`, with a specified interface
-        json_module=simplejson,
-        expected_content_type=JSON_CONTENT_TYPE,
-        handle_unexpected_content_types=False,
+        json_module=None,  # type: Any
+        expected_content_type=JSON_CONTENT_TYPE,  # type: str
+        handle_unexpected_content_types=False,  # type: bool
+        schema_registry=None,  # type: Optional[SchemaRegistry]
+        schema_pool=None,  # type: Optional[SchemaPool]
+        load_shedder=None,  # type: Optional[LoadShedder]
+        field_profiler=None,  # type: Optional[FieldProfiler]
+        error_formatter=None,  # type: Optional[Callable[[Any, Any], Any]]
+        load_options=None,  # type: Optional[LoadOptions]
+        dump_options=None,  # type: Optional[DumpOptions]
+        query_options=None,  # type: Optional[QueryOptions]
     ):
-        # type: (str, str, bool, Any, str, bool) -> None
+        # type: (...) -> None
         """Instantiate the middleware object
 
         :param req_key: (default ``'json'``) the key on the
@@ -168,11 +372,10 @@ class Marshmallow:
             and responses for resources *without* any defined
             Marshmallow schemas should be parsed as json anyway.
         :param json_module: (default ``simplejson``) the json module to
-            use for  (de)serialization if no schema is available on a
-            resource and ``force_json`` is ``True`` - if you would like
-            to use an alternative serializer to the stdlib ``json``
-            module for your Marshmallow schemas, you will have to
-            specify using a schema metaclass, as defined in the
+            use for (de)serialization. Request bodies are always parsed
+            with this module, and data dumped by a schema is encoded
+            with it as well, unless the schema specifies its own
+            ``render_module`` in its ``Meta`` class, as defined in the
             `Marshmallow documentation`_
         :param expected_content_type: the expected CONTENT_TYPE header
             corresponding to content that should be parsed by the
@@ -187,6 +390,41 @@ class Marshmallow:
             True. If it is set to False, the middleware will attempt to
             parse ALL requests with the provided json_module and/or
             Marshmallow schema.
+        :param schema_registry: the ``SchemaRegistry`` used to resolve
+            schemas that resources reference by class or by name,
+            instantiating each on first use. Defaults to a new,
+            empty registry.
+        :param schema_pool: an optional ``SchemaPool`` lending each load
+            and dump its own copy of the schema, so that concurrent
+            requests do not share per-call state, or the schema's
+            ``context``, which is then taken from
+            ``req.context['schema_context']``
+        :param load_shedder: an optional ``LoadShedder`` used to track
+            the cost of (de)serialization per route and to reject large
+            requests with a 503 before reading their bodies when the
+            estimated work in flight exceeds its budget
+        :param field_profiler: an optional ``FieldProfiler`` with which
+            to instrument every schema used, to find out which fields and
+            validators the (de)serialization time of a route is spent in.
+            This slows every field down, so only use it for diagnostics.
+        :param error_formatter: an optional callable taking an
+            ``HTTPValidationError`` or ``HTTPSerializationError`` and the
+            schema's error messages, and returning the body of the error
+            response as a mapping, such as
+            ``falcon_marshmallow.errors.format_errors``. The body is then
+            encoded once, with the ``json_module``. By default, the
+            messages are encoded as a string in the error's
+            ``description``.
+        :param load_options: optional ``LoadOptions`` setting how request
+            bodies are read and loaded: limits on their size, nesting and
+            errors, and the bulk loader, cache and trust policy used
+        :param dump_options: optional ``DumpOptions`` setting how results
+            are dumped and encoded: the ``default`` function of the
+            ``json_module``, the dump accelerator, the response cache and
+            the response validator used
+        :param query_options: optional ``QueryOptions`` setting where
+            query strings loaded with a ``query_schema`` are stored, and
+            how many are cached
 
             .. _marshmallow documentation: http://marshmallow.readthedocs.io/
                 en/latest/api_reference.html#marshmallow.Schema.Meta
@@ -202,9 +440,45 @@ class Marshmallow:
         self._req_key = req_key
         self._resp_key = resp_key
         self._force_json = force_json
+        if json_module is None:
+            # Deferred, so that importing the middleware stays cheap
+            import simplejson
+
+            json_module = simplejson
         self._json = json_module
         self._expected_content_type = expected_content_type
         self._handle_unexpected_content_types = handle_unexpected_content_types
+        if load_options is None:
+            load_options = LoadOptions()
+        if dump_options is None:
+            dump_options = DumpOptions()
+        if query_options is None:
+            query_options = QueryOptions()
+        self._load_shedder = load_shedder
+        self._error_formatter = error_formatter
+        self._field_profiler = field_profiler
+        self._schema_pool = schema_pool
+        self._json_limits = load_options.json_limits
+        self._max_errors = load_options.max_errors
+        self._max_decompressed_size = load_options.max_decompressed_size
+        self._max_compression_ratio = load_options.max_compression_ratio
+        self._bulk_loader = load_options.bulk_loader
+        self._load_cache = load_options.load_cache
+        self._trust_policy = load_options.trust_policy
+        self._json_default = dump_options.json_default
+        self._dump_accelerator = dump_options.dump_accelerator
+        self._response_cache = dump_options.response_cache
+        self._response_cache_key = dump_options.response_cache_key
+        self._response_validator = dump_options.response_validator
+        self._query_key = query_options.key
+        self._query_cache = (
+            LRUCache(query_options.cache_size)
+            if query_options.cache_size
+            else None
+        )
+        self._schemas = (
+            schema_registry if schema_registry is not None else SchemaRegistry()
+        )
 
     @staticmethod
     def _get_specific_schema(resource, method, msg_type):
@@ -285,6 +559,140 @@ class Marshmallow:
             return specific_schema
         return getattr(resource, "schema", None)  # type: ignore
 
+    @staticmethod
+    def _get_query_schema(resource, method):
+        # type: (object, str) -> Optional[Schema]
+        """Return a method-specific query schema, a generic one, or None
+
+        Query schemas follow the same rules as body schemas: a
+        method-specific schema, e.g. ``get_query_schema``, takes
+        precedence over a generic ``query_schema``.
+
+        :param resource: the resource object passed to
+            ``process_resource``
+        :param method: the (case-insensitive) HTTP method used
+            for the request, e.g. 'GET' or 'POST'
+        """
+        sch_name = "%s_query_schema" % method.lower()
+        specific_schema = getattr(resource, sch_name, None)
+        if specific_schema is not None:
+            return specific_schema  # type: ignore
+        return getattr(resource, "query_schema", None)
+
+    def _resolve_schema(self, resource, method, msg_type):
+        # type: (object, str, str) -> Optional[Schema]
+        """Return the schema instance to use for a request or response
+
+        See ``_get_schema``, and ``_get_query_schema`` for the
+        ``msg_type`` 'query'. Schemas referenced by class or by name are
+        resolved through the ``schema_registry``, and schemas are
+        instrumented by the ``field_profiler``, if any.
+        """
+        if msg_type == "query":
+            ref = self._get_query_schema(resource, method)
+        else:
+            ref = self._get_schema(resource, method, msg_type)
+        sch = self._schemas.resolve(ref)  # type: Optional[Schema]
+        if isinstance(sch, Schema):
+            self._instrument(sch)
+        return sch
+
+    def _instrument(self, sch):
+        # type: (Schema) -> None
+        """Instrument a schema with the ``field_profiler``, if any"""
+        profiler = self._field_profiler
+        if profiler is None:
+            return
+        profiler.instrument(sch)
+        if isinstance(sch, Discriminated):
+            for sub_schema in sch.schemas.values():
+                profiler.instrument(sub_schema)
+
+    @staticmethod
+    def _get_route(req, resource):
+        # type: (Request, object) -> Hashable
+        """Return a key identifying the route of a request
+
+        :param req: the request object
+        :param resource: the resource object
+        """
+        template = getattr(req, "uri_template", None)
+        return req.method, template or type(resource).__name__
+
+    def _checkout(self, req, sch):
+        # type: (Request, Schema) -> ContextManager[Schema]
+        """Return a context manager lending the schema instance to use
+
+        With a ``schema_pool``, this is a copy of the schema, with the
+        request's schema context, instrumented by the ``field_profiler``,
+        if any. Otherwise, it is the schema itself.
+        """
+        if self._schema_pool is None:
+            return _Unpooled(sch)
+        return self._schema_pool.checkout(
+            sch,
+            req.context.get(SCHEMA_CONTEXT_KEY),
+            self._instrument if self._field_profiler is not None else None,
+        )
+
+    def _context_key(self, req):
+        # type: (Request) -> Optional[Hashable]
+        """Return a key of the schema context of a request, for caches
+
+        Schemas only get the request's schema context with a
+        ``schema_pool``. See ``pool.context_key``: ``None`` means that
+        data loaded for the request must not be cached.
+        """
+        if self._schema_pool is None:
+            return ()
+        return context_key(req.context.get(SCHEMA_CONTEXT_KEY))
+
+    def _get_codec(self, sch):
+        # type: (Schema) -> Any
+        """Return the module to use to encode a schema's dumped data
+
+        The middleware's ``json_module`` is used for every schema, so
+        that requests and responses go through the same codec, unless
+        the schema's ``Meta`` class explicitly specifies its own
+        ``render_module`` (or ``json_module`` under Marshmallow 2).
+
+        :param sch: the schema used to dump the response data
+        """
+        meta = getattr(type(sch), "Meta", None)
+        if hasattr(meta, "render_module"):
+            return sch.opts.render_module
+        if hasattr(meta, "json_module"):
+            return sch.opts.json_module
+        return self._json
+
+    @staticmethod
+    def _encode(data, codec, default=None):
+        # type: (Any, Any, Optional[Callable[[Any], Any]]) -> str
+        """Encode response data with the given codec
+
+        :param data: the data to encode
+        :param codec: a module implementing ``dumps()``
+        :param default: an optional ``default`` function for ``dumps()``
+
+        :raises falcon.HTTPInternalServerError: if the data cannot be
+            encoded
+        """
+        try:
+            if default is None:
+                return codec.dumps(data)  # type: ignore
+            return codec.dumps(data, default=default)  # type: ignore
+        except (TypeError, ValueError):
+            # e.g. unserializable objects, circular references, or NaN
+            # with allow_nan=False
+            raise HTTPInternalServerError(
+                title="Could not serialize response",
+                description=(
+                    "The server attempted to serialize an object that "
+                    "cannot be serialized. This is likely a server-side "
+                    "bug."
+                ),
+            )
+
     def _content_is_expected_type(self, content_type):
         # type: (str) -> bool
         """Check if the provided content type is the expected type.
@@ -314,6 +722,377 @@ class Marshmallow:
         except ValueError:
             return False
 
+    def _read_body(self, req, limits):
+        # type: (Request, Optional[JSONLimits]) -> Any
+        """Return the raw request body, checked against any limits
+
+        :param req: the request object
+        :param limits: the ``JSONLimits`` to check the body against, if any
+        """
+        body = get_stashed_content(
+            req, self._max_decompressed_size, self._max_compression_ratio
+        )
+        if limits is not None:
+            limits.check(body)
+        return body
+
+    def _parse_body(self, req, limits):
+        # type: (Request, Optional[JSONLimits]) -> Any
+        """Parse the request body with the ``json_module``, or return the
+        document already parsed for the request
+
+        :param req: the request object
+        :param limits: the ``JSONLimits`` to check the body against
+            before parsing it, if any
+        """
+        self._read_body(req, limits)
+        return get_parsed_content(req, self._json.loads)
+
+    def _load_schema(self, sch, parsed):
+        # type: (Schema, Any) -> Any
+        """Load a parsed request body with a schema (Marshmallow 3)
+
+        :param sch: the schema to load the body with
+        :param parsed: the parsed request body
+
+        :raises marshmallow.ValidationError: if the body is invalid
+        """
+        if not (sch.many and isinstance(parsed, list)):
+            return sch.load(parsed)
+        load = sch.load  # type: Callable[[Any], Any]
+        if self._bulk_loader is not None and not isinstance(sch, Discriminated):
+            load = partial(self._bulk_loader.load, sch)
+        if self._max_errors is None:
+            return load(parsed)
+        return load_fail_fast(sch, parsed, self._max_errors, load=load)
+
+    def _load_request(self, req, sch, limits=None, cache=None):
+        # type: (Request, Optional[Schema], Optional[JSONLimits], Optional[LoadCache]) -> None
+        """Deserialize the request body and store it on ``req.context``
+
+        :param req: the request object
+        :param sch: the schema to load the body with, or ``None`` to
+            parse it with the ``json_module`` alone
+        :param limits: the ``JSONLimits`` to check the body against
+            before parsing it, if any
+        :param cache: the ``LoadCache`` to look the loaded data up in,
+            and to store it in, if any
+        """
+        if sch is not None:
+            if not isinstance(sch, Schema):
+                raise TypeError(
+                    "The schema and <method>_schema properties of a resource "
+                    "must be Marshmallow schemas, schema classes, or "
+                    "registered schema names."
+                )
+
+            cache_key = None
+            if cache is not None:
+                cache_key = cache.key(
+                    sch, self._read_body(req, limits), self._context_key(req)
+                )
+                data = cache.get(cache_key)
+                if data is not NOT_CACHED:
+                    req.context[self._req_key] = data
+                    return
+
+            try:
+                parsed = self._parse_body(req, limits)
+            except UnicodeDecodeError:
+                raise HTTPBadRequest("Body was not encoded as UTF-8")
+            except ValueError:
+                # Not only the json_module's JSONDecodeError: the body may
+                # have been parsed first, with another module, by
+                # get_parsed_content()
+                raise HTTPBadRequest("Request must be valid JSON")
+
+            if MARSHMALLOW_2:
+                with self._checkout(req, sch) as instance:
+                    data, errors = instance.load(parsed)
+
+                if errors and self._max_errors is not None:
+                    errors = truncate_errors(errors, self._max_errors)
+                if errors:
+                    raise HTTPValidationError(
+                        errors, self._json, self._error_formatter
+                    )
+            else:
+                # Marshmallow 3 or higher raises a ValidationError
+                # instead of returning a (data, errors) tuple.
+                try:
+                    with self._checkout(req, sch) as instance:
+                        data = self._load_schema(instance, parsed)
+                except ValidationError as exc:
+                    messages = exc.messages
+                    if self._max_errors is not None:
+                        messages = truncate_errors(messages, self._max_errors)
+                    raise HTTPValidationError(
+                        messages, self._json, self._error_formatter
+                    )
+                except Exception as exc:
+                    raise HTTPValidationError(
+                        {"error": str(exc)}, self._json, self._error_formatter
+                    )
+
+            if cache is not None:
+                data = cache.put(cache_key, data)
+            req.context[self._req_key] = data
+
+        else:
+            try:
+                req.context[self._req_key] = self._parse_body(req, limits)
+            except (ValueError, UnicodeDecodeError):
+                raise HTTPBadRequest(
+                    description=(
+                        "Could not decode the request body, either because "
+                        "it was not valid JSON or because it was not encoded "
+                        "as UTF-8."
+                    )
+                )
+
+    def _load_data(self, sch, data, partial_fields=None):
+        # type: (Schema, Any, Any) -> Any
+        """Load data with a schema, raising an ``HTTPValidationError``
+
+        :param sch: the schema to load the data with
+        :param data: the data to load
+        :param partial_fields: the ``partial`` argument of ``sch.load()``
+        """
+        if MARSHMALLOW_2:
+            data, errors = sch.load(data, partial=partial_fields)
+        else:
+            try:
+                data, errors = sch.load(data, partial=partial_fields), None
+            except ValidationError as exc:
+                errors = exc.messages
+        if errors:
+            if self._max_errors is not None:
+                errors = truncate_errors(errors, self._max_errors)
+            raise HTTPValidationError(errors, self._json, self._error_formatter)
+        return data
+
+    @staticmethod
+    def _get_patch_type(req, resource):
+        # type: (Request, object) -> Optional[str]
+        """Return the media type of a patch body the resource can apply
+
+        Return ``None`` unless the body is a JSON Patch or a JSON Merge
+        Patch, and the resource has a ``get_patch_target`` method.
+        """
+        if req.content_type is None or not hasattr(
+            resource, "get_patch_target"
+        ):
+            return None
+        media_type = req.content_type.split(";", 1)[0].strip().lower()
+        return media_type if media_type in PATCH_CONTENT_TYPES else None
+
+    def _load_patch(self, req, sch, limits, resource, params, patch_type):
+        # type: (Request, Optional[Schema], Optional[JSONLimits], Any, dict, str) -> None
+        """Apply a patch body to a resource's document, and load the result
+
+        The resource's ``get_patch_target(req, params)`` returns the
+        current document, as it would be dumped. The patch is applied
+        without modifying it, and stored with the patched document as a
+        ``PatchResult`` on ``req.context[PATCH_KEY]``. Only the top-level
+        fields that the patch touched are loaded with the schema, as a
+        partial load, and stored under the ``req_key``, unless the patch
+        replaced the whole document, which is then loaded in full.
+
+        :param req: the request object
+        :param sch: the schema to load the touched fields with, or
+            ``None`` to store them as they are
+        :param limits: the ``JSONLimits`` to check the patch against
+            before parsing it, if any
+        :param resource: the resource object
+        :param params: the parameters parsed from the url
+        :param patch_type: the media type of the patch
+        """
+        if sch is not None and not isinstance(sch, Schema):
+            raise TypeError(
+                "The schema and <method>_schema properties of a resource "
+                "must be Marshmallow schemas, schema classes, or "
+                "registered schema names."
+            )
+
+        try:
+            patch = self._parse_body(req, limits)
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPBadRequest(
+                description=(
+                    "Could not decode the patch, either because it was not "
+                    "valid JSON or because it was not encoded as UTF-8."
+                )
+            )
+
+        document = resource.get_patch_target(req, params)
+        try:
+            result = apply_patch(patch_type, document, patch)
+        except PatchConflict as exc:
+            raise HTTPConflict(description=str(exc))
+        except PatchError as exc:
+            raise HTTPBadRequest(description=str(exc))
+        req.context[PATCH_KEY] = result
+
+        data = result.document
+        partial_fields = None
+        if result.touched is not None:
+            data = {key: data[key] for key in result.touched if key in data}
+            if sch is not None:
+                touched = {}  # type: Dict[str, bool]
+                for key, name, _ in _loaded_keys(sch):
+                    touched[name] = touched.get(name) or key in result.touched
+                partial_fields = tuple(
+                    name
+                    for name, was_touched in touched.items()
+                    if not was_touched
+                )
+        if sch is not None:
+            with self._checkout(req, sch) as instance:
+                data = self._load_data(instance, data, partial_fields)
+        req.context[self._req_key] = data
+
+    @staticmethod
+    def _query_params(req, sch):
+        # type: (Request, Schema) -> dict
+        """Return the query parameters of a request, to load with a schema
+
+        Parameters given once are strings, so they are wrapped in a list
+        for ``List`` fields.
+        """
+        params = dict(req.params)
+        for key, _, field in _loaded_keys(sch):
+            if isinstance(field, fields.List) and isinstance(
+                params.get(key), str
+            ):
+                params[key] = [params[key]]
+        return params
+
+    def _load_query(self, req, sch):
+        # type: (Request, Schema) -> None
+        """Load the query string and store it on ``req.context``
+
+        Loaded query strings are cached per schema, raw query string and
+        schema context, and each request gets its own copy of the cached
+        data.
+
+        :param req: the request object
+        :param sch: the schema to load the query parameters with
+        """
+        if not isinstance(sch, Schema):
+            raise TypeError(
+                "The query_schema and <method>_query_schema properties of a "
+                "resource must be Marshmallow schemas, schema classes, or "
+                "registered schema names."
+            )
+
+        scope = self._context_key(req)
+        cache = self._query_cache if scope is not None else None
+        cache_key = (sch, req.query_string, scope)
+        if cache is not None:
+            data = cache.get(cache_key, NOT_CACHED)
+            if data is not NOT_CACHED:
+                req.context[self._query_key] = copy.deepcopy(data)
+                return
+
+        with self._checkout(req, sch) as instance:
+            data = self._load_data(instance, self._query_params(req, sch))
+        if cache is not None:
+            cache.set(cache_key, copy.deepcopy(data))
+        req.context[self._query_key] = data
+
+    def _dump_response(self, req, resp, sch):
+        # type: (Request, Response, Optional[Schema]) -> None
+        """Serialize the result into ``resp.body``, using any cached body
+
+        :param req: the request object
+        :param resp: the response object
+        :param sch: the schema to dump the result with, or ``None`` to
+            encode it with the ``json_module`` alone
+        """
+        cache_key = None
+        if self._response_cache is not None:
+            cache_key = req.context.get(self._response_cache_key)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                resp.body = cached
+                return
+            self._serialize_response(req, resp, sch)
+            body = resp.body
+            if not isinstance(body, bytes):
+                body = body.encode("utf-8")
+            self._response_cache.set(cache_key, body)
+        else:
+            self._serialize_response(req, resp, sch)
+
+    def _serialize_response(self, req, resp, sch):
+        # type: (Request, Response, Optional[Schema]) -> None
+        """Dump and encode the result on ``req.context`` into ``resp.body``
+
+        :param req: the request object
+        :param resp: the response object
+        :param sch: the schema to dump the result with, or ``None`` to
+            encode it with the ``json_module`` alone
+        """
+        if sch is not None:
+            if not isinstance(sch, Schema):
+                raise TypeError(
+                    "The schema and <method>_schema properties of a resource "
+                    "must be Marshmallow schemas, schema classes, or "
+                    "registered schema names."
+                )
+
+            if MARSHMALLOW_2:
+                with self._checkout(req, sch) as instance:
+                    data, errors = instance.dump(req.context[self._resp_key])
+
+                if errors:
+                    raise HTTPSerializationError(
+                        errors, self._json, self._error_formatter
+                    )
+            else:
+                # Marshmallow 3 or higher raises a ValidationError
+                # instead of returning a (data, errors) tuple.
+                try:
+                    with self._checkout(req, sch) as instance:
+                        if (
+                            self._dump_accelerator is not None
+                            and not isinstance(sch, Discriminated)
+                        ):
+                            data = self._dump_accelerator.dump(
+                                instance, req.context[self._resp_key]
+                            )
+                        else:
+                            data = instance.dump(req.context[self._resp_key])
+                except ValidationError as exc:
+                    raise HTTPSerializationError(
+                        exc.messages, self._json, self._error_formatter
+                    )
+                except Exception as exc:
+                    # For some reason Marshmallow does not intercept e.g.
+                    # ValueErrors and throw a ValidationError when a value
+                    # is of the wrong type, instead letting the excpetion
+                    # percolate up.
+                    raise HTTPSerializationError(
+                        {"error": str(exc)}, self._json, self._error_formatter
+                    )
+
+            validator = self._response_validator
+            if validator is not None and validator.sample(sch):
+                with self._checkout(req, sch) as instance:
+                    messages = validator.check(req, instance, data)
+                if messages and validator.strict:
+                    raise HTTPSerializationError(
+                        messages, self._json, self._error_formatter
+                    )
+
+            resp.body = self._encode(data, self._get_codec(sch))
+
+        else:
+            resp.body = self._encode(
+                req.context[self._resp_key], self._json, self._json_default
+            )
+
     def process_resource(self, req, resp, resource, params):
         # type: (Request, Response, object, dict) -> None
         """Deserialize request body with any resource-specific schemas
@@ -322,9 +1101,22 @@ class Marshmallow:
         under the ``req_key`` provided to the class constructor
         or on the ``json`` key if none was provided.
 
+        If a query schema is defined on the passed ``resource``, first
+        load the query string with it, and store the result under the
+        ``query_key``.
+
         If a Marshmallow schema is defined on the passed ``resource``,
         use it to deserialize the request body.
 
+        If the body is a JSON Patch or a JSON Merge Patch, and the
+        ``resource`` has a ``get_patch_target`` method, apply the patch
+        to the document it returns, and load only the fields the patch
+        touched. See ``_load_patch``.
+
+        If a ``trust_policy`` is configured and trusts the request, the
+        body is loaded without the schema's validators, or stored as
+        parsed, depending on the policy's ``mode``.
+
         If no schema is defined and the class was instantiated with
         ``force_json=True``, request data will be deserialized with
         any ``json_module`` passed to the class constructor or
@@ -338,6 +1130,15 @@ class Marshmallow:
         :rtype: None
         :raises falcon.HTTPBadRequest: if the data cannot be
             deserialized or decoded
+        :raises falcon.HTTPConflict: if a patch cannot be applied to
+            the resource's current document
+        :raises falcon.HTTPServiceUnavailable: if a ``load_shedder``
+            is configured and rejects the request
+        :raises falcon.HTTPPayloadTooLarge: if the body exceeds the
+            token limit of the ``json_limits``
+        :raises falcon.HTTPUnprocessableEntity: if the body or the
+            query string cannot be loaded by the schema, or the body
+            exceeds another of the ``json_limits``
         """
         log.debug(
             "Marshmallow.process_resource(%s, %s, %s, %s)",
@@ -346,11 +1147,17 @@ class Marshmallow:
             resource,
             params,
         )
+        query_sch = self._resolve_schema(resource, req.method, "query")
+        if query_sch is not None:
+            self._load_query(req, query_sch)
+
         if req.content_length in (None, 0):
             return
 
+        patch_type = self._get_patch_type(req, resource)
         if (
-            not self._handle_unexpected_content_types
+            patch_type is None
+            and not self._handle_unexpected_content_types
             and not self._content_is_expected_type(req.content_type)
         ):
             log.info(
@@ -361,58 +1168,65 @@ class Marshmallow:
             )
             return
 
-        sch = self._get_schema(resource, req.method, "request")
-
-        if sch is not None:
-            if not isinstance(sch, Schema):
-                raise TypeError(
-                    "The schema and <method>_schema properties of a resource "
-                    "must be instantiated Marshmallow schemas."
-                )
+        sch = self._resolve_schema(resource, req.method, "request")
+        if sch is None and not self._force_json:
+            return
 
-            try:
-                body = get_stashed_content(req)
-                parsed = self._json.loads(body)
-            except UnicodeDecodeError:
-                raise HTTPBadRequest("Body was not encoded as UTF-8")
-            except self._json.JSONDecodeError:
-                raise HTTPBadRequest("Request must be valid JSON")
+        if isinstance(sch, Schema) and self._trust_policy is not None:
+            mode = self._trust_policy.check(req)
+            if mode == SKIP:
+                sch = None
+            elif mode == DESERIALIZE_ONLY:
+                sch = self._trust_policy.schema_for(sch)
+                self._instrument(sch)
+
+        limits = getattr(resource, "json_limits", self._json_limits)
+        if patch_type is not None:
+            load = partial(
+                self._load_patch,
+                resource=resource,
+                params=params,
+                patch_type=patch_type,
+            )  # type: Callable[..., None]
+        else:
+            load = partial(
+                self._load_request,
+                cache=getattr(resource, "load_cache", self._load_cache),
+            )
+        if self._load_shedder is None:
+            load(req, sch, limits)
+            return
 
-            if MARSHMALLOW_2:
-                data, errors = sch.load(parsed)
+        route = self._get_route(req, resource)
+        estimate = self._load_shedder.admit(route, req.content_length)
+        if estimate is None:
+            raise HTTPServiceUnavailable(
+                description=(
+                    "The server is too busy to process this request. "
+                    "Please try again later."
+                ),
+                retry_after=self._load_shedder.retry_after,
+            )
 
-                if errors:
-                    raise HTTPUnprocessableEntity(
-                        description=self._json.dumps(errors)
-                    )
+        start = None  # type: Optional[float]
+        try:
+            # Read the body before timing the load, so that the time spent
+            # waiting on slow clients is not counted as the route's cost
+            get_stashed_content(
+                req, self._max_decompressed_size, self._max_compression_ratio
+            )
+            start = default_timer()
+            load(req, sch, limits)
+        finally:
+            if start is None:
+                # Release the estimate without measuring a cost
+                self._load_shedder.finish_load(route, 0, estimate, 0.0)
             else:
-                # Marshmallow 3 or higher raises a ValidationError
-                # instead of returning a (data, errors) tuple.
-                try:
-                    data = sch.load(parsed)
-                except ValidationError as exc:
-                    raise HTTPUnprocessableEntity(
-                        description=self._json.dumps(exc.messages)
-                    )
-                except Exception as exc:
-                    raise HTTPUnprocessableEntity(
-                        description=self._json.dumps({"error": exc})
-                    )
-
-            req.context[self._req_key] = data
-
-        elif self._force_json:
-
-            body = get_stashed_content(req)
-            try:
-                req.context[self._req_key] = self._json.loads(body)
-            except (ValueError, UnicodeDecodeError):
-                raise HTTPBadRequest(
-                    description=(
-                        "Could not decode the request body, either because "
-                        "it was not valid JSON or because it was not encoded "
-                        "as UTF-8."
-                    )
+                self._load_shedder.finish_load(
+                    route,
+                    req.content_length,
+                    estimate,
+                    default_timer() - start,
                 )
 
     def process_response(self, req, resp, resource, req_succeeded):
@@ -424,7 +1238,9 @@ class Marshmallow:
         provided. If not found, return.
 
         If a Marshmallow schema is defined for the given ``resource``,
-        use it to serialize the result.
+        use it to serialize the result. If a ``response_validator`` is
+        configured, and samples the response, check the serialized
+        result against the schema.
 
         If no schema is defined and the class was instantiated with
         ``force_json=True``, request data will be serialized with
@@ -437,7 +1253,8 @@ class Marshmallow:
         :param bool req_succeeded: whether the request was successful
 
         :raises falcon.HTTPInternalServerError: if the data found
-            in the ``req.context`` object cannot be serialized
+            in the ``req.context`` object cannot be serialized, or is
+            invalid and the ``response_validator`` is strict
         """
         log.debug(
             "Marshmallow.process_response(%s, %s, %s, %s)",
@@ -449,54 +1266,20 @@ class Marshmallow:
         if self._resp_key not in req.context:
             return
 
-        sch = self._get_schema(resource, req.method, "response")
-
-        if sch is not None:
-            if not isinstance(sch, Schema):
-                raise TypeError(
-                    "The schema and <method>_schema properties of a resource "
-                    "must be instantiated Marshmallow schemas."
-                )
-
-            if MARSHMALLOW_2:
-                data, errors = sch.dumps(req.context[self._resp_key])
-
-                if errors:
-                    raise HTTPInternalServerError(
-                        title="Could not serialize response",
-                        description=self._json.dumps(errors),
-                    )
-            else:
-                # Marshmallow 3 or higher raises a ValidationError
-                # instead of returning a (data, errors) tuple.
-                try:
-                    data = sch.dumps(req.context[self._resp_key])
-                except ValidationError as exc:
-                    raise HTTPInternalServerError(
-                        title="Could not serialize response",
-                        description=self._json.dumps(exc.messages),
-                    )
-                except Exception as exc:
-                    # For some reason Marshmallow does not intercept e.g.
-                    # ValueErrors and throw a ValidationError when a value
-                    # is of the wrong type, instead letting the excpetion
-                    # percolate up.
-                    raise HTTPInternalServerError(
-                        title="Could not serialize response",
-                        description=self._json.dumps({"error": str(exc)}),
-                    )
+        sch = self._resolve_schema(resource, req.method, "response")
+        if sch is None and not self._force_json:
+            return
 
-            resp.body = data
+        if self._load_shedder is None:
+            self._dump_response(req, resp, sch)
+            return
 
-        elif self._force_json:
-            try:
-                resp.body = self._json.dumps(req.context[self._resp_key])
-            except TypeError:
-                raise HTTPInternalServerError(
-                    title="Could not serialize response",
-                    description=(
-                        "The server attempted to serialize an object that "
-                        "cannot be serialized. This is likely a server-side "
-                        "bug."
-                    ),
-                )
+        route = self._get_route(req, resource)
+        estimate = self._load_shedder.start_dump(route)
+        start = default_timer()
+        try:
+            self._dump_response(req, resp, sch)
+        finally:
+            self._load_shedder.finish_dump(
+                route, estimate, default_timer() - start
+            )
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Groups of options of the Marshmallow middleware"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+from typing import Any, Callable, Optional
+
+# Local
+from .encoding import default_encoder
+
+# Always true for type checkers, which do not need to import these
+MYPY = False
+if MYPY:  # pragma: no cover
+    from .limits import JSONLimits
+    from .loadcache import LoadCache
+    from .trust import TrustPolicy
+    from .validation import ResponseValidator
+
+
+class LoadOptions:
+    """How the middleware reads and loads request bodies
+
+    Given as the middleware's ``load_options``. Every option defaults to
+    leaving the body to be read and loaded in full, as Marshmallow would.
+    """
+
+    def __init__(
+        self,
+        json_limits=None,  # type: Optional[JSONLimits]
+        max_errors=None,  # type: Optional[int]
+        max_decompressed_size=None,  # type: Optional[int]
+        max_compression_ratio=None,  # type: Optional[float]
+        bulk_loader=None,  # type: Any
+        load_cache=None,  # type: Optional[LoadCache]
+        trust_policy=None,  # type: Optional[TrustPolicy]
+    ):
+        # type: (...) -> None
+        """Set the options
+
+        :param json_limits: optional ``JSONLimits`` checked against each
+            request body before it is parsed, rejecting bodies that are
+            nested too deeply or hold too many items. Resources may
+            override it with a ``json_limits`` attribute, which may be
+            ``None`` to disable the checks.
+        :param max_errors: if set, the maximum number of errors reported
+            when a schema fails to load a request body, counting each
+            field's list of messages, at any depth, as one error.
+            ``many=True`` schemas then load JSON arrays in chunks, and
+            stop after the chunk in which this many errors were found.
+            Errors beyond the limit are dropped, and ``'_truncated'`` is
+            set in the error messages.
+        :param max_decompressed_size: the maximum size, in bytes, of a
+            ``gzip`` or ``deflate`` encoded request body once
+            decompressed, by default ``MAX_DECOMPRESSED_SIZE`` (64 MiB).
+            Larger bodies are rejected with a 413 as soon as
+            decompressing them exceeds the limit.
+        :param max_compression_ratio: the maximum ratio of the
+            decompressed size of a request body to its compressed size,
+            past the first MiB, by default ``MAX_COMPRESSION_RATIO``
+            (100), above which it is rejected with a 413 as a likely
+            decompression bomb
+        :param bulk_loader: an optional object with a
+            ``load(schema, records)`` method, such as a
+            ``ColumnarLoader``, used instead of ``schema.load()`` when a
+            ``many=True`` schema loads a JSON array. Ignored for
+            Marshmallow 2.
+        :param load_cache: an optional ``LoadCache`` of the data loaded
+            by schemas, keyed by the schema and the raw request body, so
+            that repeated identical bodies are neither parsed nor loaded
+            again. Resources may override it with a ``load_cache``
+            attribute, which may be ``None`` to disable caching.
+        :param trust_policy: an optional ``TrustPolicy`` deciding which
+            requests come from trusted sources, such as other internal
+            services, whose bodies are then loaded without running the
+            schema's validators, or not loaded at all
+        """
+        self.json_limits = json_limits
+        self.max_errors = max_errors
+        self.max_decompressed_size = max_decompressed_size
+        self.max_compression_ratio = max_compression_ratio
+        self.bulk_loader = bulk_loader
+        self.load_cache = load_cache
+        self.trust_policy = trust_policy
+
+
+class DumpOptions:
+    """How the middleware dumps and encodes results
+
+    Given as the middleware's ``dump_options``.
+    """
+
+    def __init__(
+        self,
+        json_default=default_encoder,  # type: Optional[Callable[[Any], Any]]
+        dump_accelerator=None,  # type: Any
+        response_cache=None,  # type: Any
+        response_cache_key="cache_key",  # type: str
+        response_validator=None,  # type: Optional[ResponseValidator]
+    ):
+        # type: (...) -> None
+        """Set the options
+
+        :param json_default: (default ``default_encoder``) the
+            ``default`` function passed to the ``json_module``'s
+            ``dumps()`` when encoding results without a schema. The
+            default ``TypeDispatchEncoder`` handles datetimes, dates,
+            times, UUIDs, enums, sets and dataclasses. Pass ``None`` to
+            call ``dumps()`` without it.
+        :param dump_accelerator: an optional object with a
+            ``dump(schema, obj)`` method, such as a ``DumpAccelerator``,
+            used instead of ``schema.dump()`` to dump results. Ignored
+            for Marshmallow 2.
+        :param response_cache: an optional cache for serialized response
+            bodies, such as a ``SharedMemoryCache``. Any object with
+            ``get(key)`` and ``set(key, value)`` methods taking string
+            keys and bytes values may be used.
+        :param response_cache_key: (default ``'cache_key'``) the key on
+            the ``req.context`` object where a responder may store a
+            string identifying its result. If a ``response_cache`` is
+            configured and the key is present, the serialized body is
+            looked up in the cache instead of dumping the result, and
+            stored in the cache on a miss.
+        :param response_validator: an optional ``ResponseValidator``
+            checking a sample of the responses dumped with a schema
+            against that schema, and reporting the invalid ones, or, in
+            strict mode, failing them with a 500
+        """
+        self.json_default = json_default
+        self.dump_accelerator = dump_accelerator
+        self.response_cache = response_cache
+        self.response_cache_key = response_cache_key
+        self.response_validator = response_validator
+
+
+class QueryOptions:
+    """How the middleware loads query strings with query schemas
+
+    Given as the middleware's ``query_options``.
+    """
+
+    def __init__(self, key="query", cache_size=0):
+        # type: (str, int) -> None
+        """Set the options
+
+        :param key: (default ``'query'``) the key on the ``req.context``
+            object where the query string, loaded with a resource's
+            ``query_schema``, will be stored
+        :param cache_size: (default ``0``) if set, the number of loaded
+            query strings to keep, per schema, raw query string and
+            schema context, so that repeated queries are not loaded
+            again. Only enable it if the data each query schema loads
+            depends on the query string alone: not with callable
+            ``load_default`` values, ``post_load`` hooks with side
+            effects, or fields reading anything but the schema's
+            ``context``.
+        """
+        self.key = key
+        self.cache_size = cache_size
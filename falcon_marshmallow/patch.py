@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""Applying JSON Patch (RFC 6902) and JSON Merge Patch (RFC 7396) bodies"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import copy
+import logging
+import re
+from collections import namedtuple
+
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+
+log = logging.getLogger(__name__)
+
+
+JSON_PATCH_CONTENT_TYPE = "application/json-patch+json"
+MERGE_PATCH_CONTENT_TYPE = "application/merge-patch+json"
+PATCH_CONTENT_TYPES = (JSON_PATCH_CONTENT_TYPE, MERGE_PATCH_CONTENT_TYPE)
+
+# The key on req.context on which the middleware stores the PatchResult
+PATCH_KEY = "patch"
+
+
+class PatchError(ValueError):
+    """A patch document is malformed"""
+
+
+class PatchConflict(PatchError):
+    """A patch cannot be applied to the current document"""
+
+
+# Array indexes in JSON pointers: ASCII digits without leading zeros
+_INDEX = re.compile(r"(0|[1-9][0-9]*)\Z")
+
+# The patched document, the top-level keys that the patch touched, or None
+# if it replaced the whole document, and the top-level keys it removed. A
+# change deeper in the document is recorded under its top-level key only.
+PatchResult = namedtuple("PatchResult", ("document", "touched", "removed"))
+
+
+def _parse_pointer(pointer):
+    # type: (Any) -> List[str]
+    """Return the reference tokens of a JSON pointer (RFC 6901)"""
+    if not isinstance(pointer, str) or (pointer and pointer[0] != "/"):
+        raise PatchError("Invalid JSON pointer: %r" % (pointer,))
+    if not pointer:
+        return []
+    return [
+        token.replace("~1", "/").replace("~0", "~")
+        for token in pointer[1:].split("/")
+    ]
+
+
+def _index(array, token, insert=False):
+    # type: (List[Any], str, bool) -> int
+    """Return the array index referenced by a token
+
+    :param insert: whether the index is an insertion point, which may be
+        one past the end of the array, or ``-``
+    """
+    if insert and token == "-":
+        return len(array)
+    if not _INDEX.match(token):
+        raise PatchConflict("Invalid array index: %r" % token)
+    index = int(token)
+    if index > len(array) or (index == len(array) and not insert):
+        raise PatchConflict("Array index out of range: %r" % token)
+    return index
+
+
+def _get(document, tokens):
+    # type: (Any, List[str]) -> Any
+    """Return the value referenced by a pointer's tokens"""
+    for token in tokens:
+        if isinstance(document, dict):
+            if token not in document:
+                raise PatchConflict("Member %r does not exist" % token)
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_index(document, token)]
+        else:
+            raise PatchConflict("Cannot reference %r in a scalar" % token)
+    return document
+
+
+def _equal(left, right):
+    # type: (Any, Any) -> bool
+    """Return whether two JSON values are equal, as the ``test`` op sees it
+
+    Unlike Python, JSON does not consider ``true`` equal to ``1``.
+    """
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(
+            _equal(value, right[key]) for key, value in left.items()
+        )
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(
+            _equal(a, b) for a, b in zip(left, right)
+        )
+    return left == right  # type: ignore
+
+
+class _Patcher:
+    """Apply operations to a document, copying only what they modify
+
+    The document is never modified. Each container on the path to a
+    change is copied the first time an operation modifies it, and the
+    copy is modified in place by later operations, so a patch costs time
+    proportional to the size of the containers it touches, not of the
+    whole document.
+    """
+
+    def __init__(self, document):
+        # type: (Any) -> None
+        """Start patching a document"""
+        self.document = document
+        self.touched = set()  # type: Optional[Set[str]]
+        # The containers copied so far, by id, keeping them alive so
+        # that their ids are not reused
+        self._owned = {}  # type: Dict[int, Any]
+
+    def _own(self, container):
+        # type: (Any) -> Any
+        """Return a copy of a container that may be modified in place"""
+        if id(container) in self._owned:
+            return container
+        if isinstance(container, dict):
+            container = dict(container)
+        elif isinstance(container, list):
+            container = list(container)
+        else:
+            raise PatchConflict("Cannot modify a member of a scalar")
+        self._owned[id(container)] = container
+        return container
+
+    def _touch(self, tokens):
+        # type: (List[str]) -> None
+        """Record the top-level key a change was made under"""
+        if self.touched is not None:
+            if tokens:
+                self.touched.add(tokens[0])
+            else:
+                self.touched = None
+
+    def _update(self, tokens, change):
+        # type: (List[str], Any) -> None
+        """Apply ``change(parent, token)`` to the parent of a location"""
+        self._touch(tokens)
+        self.document = parent = self._own(self.document)
+        for token in tokens[:-1]:
+            if isinstance(parent, dict):
+                if token not in parent:
+                    raise PatchConflict("Member %r does not exist" % token)
+                key = token  # type: Any
+            elif isinstance(parent, list):
+                key = _index(parent, token)
+            else:
+                raise PatchConflict("Cannot reference %r in a scalar" % token)
+            parent[key] = child = self._own(parent[key])
+            parent = child
+        change(parent, tokens[-1])
+
+    def add(self, tokens, value):
+        # type: (List[str], Any) -> None
+        """Add a member or array item, or replace the document"""
+        if not tokens:
+            self._touch(tokens)
+            self.document = value
+            return
+
+        def add(parent, token):
+            # type: (Any, str) -> None
+            """Set a member, or insert an item"""
+            if isinstance(parent, dict):
+                parent[token] = value
+            else:
+                parent.insert(_index(parent, token, insert=True), value)
+
+        self._update(tokens, add)
+
+    def remove(self, tokens):
+        # type: (List[str]) -> Any
+        """Remove a member or array item, returning it"""
+        if not tokens:
+            raise PatchConflict("Cannot remove the whole document")
+        removed = []
+
+        def remove(parent, token):
+            # type: (Any, str) -> None
+            """Delete a member, or an item"""
+            if isinstance(parent, dict):
+                if token not in parent:
+                    raise PatchConflict("Member %r does not exist" % token)
+                removed.append(parent.pop(token))
+            else:
+                removed.append(parent.pop(_index(parent, token)))
+
+        self._update(tokens, remove)
+        return removed[0]
+
+    def replace(self, tokens, value):
+        # type: (List[str], Any) -> None
+        """Replace an existing member or array item, or the document"""
+        if not tokens:
+            self.add(tokens, value)
+            return
+
+        def replace(parent, token):
+            # type: (Any, str) -> None
+            """Set an existing member, or item"""
+            if isinstance(parent, dict):
+                if token not in parent:
+                    raise PatchConflict("Member %r does not exist" % token)
+                parent[token] = value
+            else:
+                parent[_index(parent, token)] = value
+
+        self._update(tokens, replace)
+
+    def apply(self, operation):
+        # type: (Any) -> None
+        """Apply one operation of a JSON Patch"""
+        if not isinstance(operation, dict):
+            raise PatchError("Patch operations must be objects")
+        op = operation.get("op")
+        tokens = _parse_pointer(operation.get("path"))
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError("The %r operation requires a value" % op)
+
+        if op == "add":
+            self.add(tokens, operation["value"])
+        elif op == "remove":
+            self.remove(tokens)
+        elif op == "replace":
+            self.replace(tokens, operation["value"])
+        elif op in ("move", "copy"):
+            source = _parse_pointer(operation.get("from"))
+            if op == "copy":
+                value = copy.deepcopy(_get(self.document, source))
+            elif source == tokens[: len(source)] and source != tokens:
+                raise PatchError("Cannot move a value into itself")
+            else:
+                _get(self.document, tokens[:-1])
+                value = self.remove(source)
+            self.add(tokens, value)
+        elif op == "test":
+            if not _equal(_get(self.document, tokens), operation["value"]):
+                raise PatchConflict(
+                    "Test of %r failed" % (operation.get("path"),)
+                )
+        else:
+            raise PatchError("Unknown patch operation: %r" % (op,))
+
+
+def apply_json_patch(document, operations):
+    # type: (Any, Any) -> Tuple[Any, Optional[Set[str]]]
+    """Apply a JSON Patch (RFC 6902) to a document, without modifying it
+
+    :param document: the current document
+    :param operations: the parsed patch: a list of operations
+
+    :return: the patched document, and the top-level keys under which
+        it was changed, or None if the whole document was replaced
+
+    :raises PatchError: if the patch is malformed
+    :raises PatchConflict: if an operation cannot be applied, e.g. its
+        path does not exist, or a ``test`` operation fails
+    """
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be an array of operations")
+    patcher = _Patcher(document)
+    for operation in operations:
+        patcher.apply(operation)
+    return patcher.document, patcher.touched
+
+
+def apply_merge_patch(document, patch):
+    # type: (Any, Any) -> Any
+    """Apply a JSON Merge Patch (RFC 7396) to a document
+
+    Only the objects that the patch changes are copied, and the document
+    is not modified.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(document) if isinstance(document, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def apply_patch(content_type, document, patch):
+    # type: (str, Any, Any) -> PatchResult
+    """Apply a JSON Patch or a JSON Merge Patch to a document
+
+    :param content_type: the media type of the patch, one of the
+        ``PATCH_CONTENT_TYPES``
+    :param document: the current document, which is not modified
+    :param patch: the parsed patch
+
+    :raises PatchError: if the patch is malformed
+    :raises PatchConflict: if the patch cannot be applied
+    """
+    if content_type == JSON_PATCH_CONTENT_TYPE:
+        patched, touched = apply_json_patch(document, patch)
+    else:
+        patched = apply_merge_patch(document, patch)
+        touched = set(patch) if isinstance(patch, dict) else None
+
+    if not (isinstance(document, dict) and isinstance(patched, dict)):
+        return PatchResult(patched, None, frozenset())
+    keys = document if touched is None else touched
+    removed = frozenset(
+        key for key in keys if key in document and key not in patched
+    )  # type: FrozenSet[str]
+    if touched is None:
+        return PatchResult(patched, None, removed)
+    return PatchResult(patched, frozenset(touched), removed)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""Lending each thread its own instance of a schema"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import copy
+import logging
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+from typing import Any, Callable, Dict, Hashable, Iterator, Mapping, Optional
+
+# Third party
+from marshmallow import Schema, fields
+
+# Local
+from .discriminator import Discriminated
+from .profiling import uninstrumented
+
+
+log = logging.getLogger(__name__)
+
+
+# The key on req.context from which the middleware takes the context of
+# the schema instances it checks out
+SCHEMA_CONTEXT_KEY = "schema_context"
+
+
+def context_key(context):
+    # type: (Optional[Mapping[Any, Any]]) -> Optional[Hashable]
+    """Return a hashable key identifying a schema context
+
+    Data loaded by a schema with a context may depend on it, so caches of
+    loaded data must key it by the context as well. Empty contexts have
+    the key ``()``. Contexts holding unhashable values have none, and
+    ``None`` is returned: data loaded with them must not be cached.
+    """
+    if not context:
+        return ()
+    try:
+        return frozenset(context.items())
+    except TypeError:
+        return None
+
+
+def _uninstrument(obj):
+    # type: (Any) -> None
+    """Remove the wrappers a ``FieldProfiler`` set on an object's original
+
+    ``copy.copy()`` carries them over, but they are bound to the original,
+    so the copy would run the original's methods.
+    """
+    for name, value in list(vars(obj).items()):
+        if callable(value) and uninstrumented(value) is not value:
+            delattr(obj, name)
+
+
+def _unbound_copy(field):
+    # type: (fields.Field) -> fields.Field
+    """Return a copy of a field, and of its inner fields, bound to nothing"""
+    field = copy.copy(field)
+    _uninstrument(field)
+    field.validators = [uninstrumented(v) for v in field.validators]
+    for attr in ("parent", "name", "root"):
+        # root is a property of the field in older releases of Marshmallow
+        if attr in vars(field):
+            setattr(field, attr, None)
+    # Any, for the attributes of the nested and container fields
+    container = field  # type: Any
+    if isinstance(field, fields.Nested):
+        # Nested schemas are instantiated on first use
+        container._schema = None
+    if isinstance(getattr(field, "inner", None), fields.Field):
+        container.inner = _unbound_copy(container.inner)
+    if getattr(field, "tuple_fields", None):
+        container.tuple_fields = [
+            _unbound_copy(f) for f in container.tuple_fields
+        ]
+    for attr in ("key_field", "value_field"):
+        if isinstance(getattr(field, attr, None), fields.Field):
+            setattr(container, attr, _unbound_copy(getattr(field, attr)))
+    return field
+
+
+def _nested_schemas(field):
+    # type: (fields.Field) -> Iterator[Schema]
+    """Yield the schemas a field, or its inner fields, has instantiated"""
+    nested = getattr(field, "_schema", None)
+    if isinstance(nested, Schema):
+        yield nested
+    inner = [getattr(field, "inner", None)]
+    inner.extend(getattr(field, "tuple_fields", None) or ())
+    inner.append(getattr(field, "key_field", None))
+    inner.append(getattr(field, "value_field", None))
+    for inner_field in inner:
+        if isinstance(inner_field, fields.Field):
+            for sch in _nested_schemas(inner_field):
+                yield sch
+
+
+def _share_context(sch, context):
+    # type: (Schema, Dict[Any, Any]) -> None
+    """Give a schema's nested and polymorphic schemas the schema's context
+
+    Marshmallow gives nested schemas a copy of their parent's context, or
+    the parent's own dictionary, only when it instantiates them, so a
+    nested schema first used under one request's context would keep
+    seeing it. Each is given the very same dictionary instead, which the
+    pool updates in place for each request.
+    """
+    if isinstance(sch, Discriminated):
+        for sub_schema in sch.schemas.values():
+            sub_schema.context = context
+            _share_context(sub_schema, context)
+    for field in sch.fields.values():
+        for nested in _nested_schemas(field):
+            nested.context = context
+            _share_context(nested, context)
+
+
+def clone_schema(sch):
+    # type: (Schema) -> Schema
+    """Return a copy of a schema instance that shares no mutable state
+
+    The copy has its own context, its own fields, bound to it, and its
+    own nested schemas, created on first use. Unlike ``copy.deepcopy()``,
+    which copies Marshmallow fields shallowly, leaving them bound to the
+    original schema, this is safe to use from another thread. Copies of
+    schemas instrumented by a ``FieldProfiler`` are not instrumented.
+    """
+    instance = copy.copy(sch)
+    _uninstrument(instance)
+    instance.context = dict(sch.context)
+    instance.declared_fields = type(sch.declared_fields)(
+        (name, _unbound_copy(field))
+        for name, field in sch.declared_fields.items()
+    )
+    instance._init_fields()
+    if isinstance(instance, Discriminated):
+        instance.schemas = {
+            value: clone_schema(sub_schema)
+            for value, sub_schema in instance.schemas.items()
+        }
+    return instance
+
+
+class SchemaPool:
+    """Lend each concurrent load or dump its own instance of a schema
+
+    Resources share one schema instance across all the threads of a
+    worker, so schemas whose hooks or fields keep per-call state on the
+    instance, or read a per-request ``context``, must otherwise be locked
+    or rebuilt for every request. Given as the middleware's
+    ``schema_pool``, each load and dump instead checks out a copy of the
+    resource's schema, made with ``clone_schema()``, and returns it to a
+    small per-schema pool of idle copies afterwards. At most as many
+    copies are made as there are concurrent requests for a schema.
+
+    The middleware sets the ``context`` of the copy to the mapping found
+    under ``req.context['schema_context']``, if any, and to the original
+    schema's context otherwise. The copy's nested schemas, and the
+    schemas of a ``Discriminated`` schema, share that same context, for
+    every request and not only the one that first used them. The
+    middleware's caches of loaded data are then keyed by the context
+    too, with ``context_key()``.
+    """
+
+    def __init__(self, max_idle=8):
+        # type: (int) -> None
+        """Create the pool
+
+        :param max_idle: the maximum number of idle copies kept per
+            schema. Copies checked in beyond that are discarded.
+        """
+        self.max_idle = max_idle
+        self.clones = 0
+        self._idle = weakref.WeakKeyDictionary()  # type: Any
+        self._lock = threading.Lock()
+
+    def _idle_copies(self, sch):
+        # type: (Schema) -> deque
+        """Return the idle copies of a schema"""
+        try:
+            return self._idle[sch]  # type: ignore
+        except KeyError:
+            with self._lock:
+                return self._idle.setdefault(sch, deque())  # type: ignore
+
+    @contextmanager
+    def checkout(self, sch, context=None, prepare=None):
+        # type: (Schema, Optional[Any], Optional[Callable[[Schema], Any]]) -> Iterator[Schema]
+        """Lend a copy of a schema for the duration of a ``with`` block
+
+        :param sch: the shared schema instance
+        :param context: the context to give the copy, by default that of
+            ``sch``
+        :param prepare: an optional callable called with each new copy,
+            e.g. to instrument it
+        """
+        idle = self._idle_copies(sch)
+        try:
+            instance = idle.pop()
+            new = False
+        except IndexError:
+            instance = clone_schema(sch)
+            new = True
+            with self._lock:
+                self.clones += 1
+            log.debug("Created copy %d of %s", self.clones, sch)
+
+        # Updated in place, for nested schemas sharing it
+        instance.context.clear()
+        instance.context.update(sch.context if context is None else context)
+        if new and prepare is not None:
+            # Once the context is set, as preparing may create the nested
+            # schemas
+            prepare(instance)
+        _share_context(instance, instance.context)
+        try:
+            yield instance
+        finally:
+            if len(idle) < self.max_idle:
+                idle.append(instance)
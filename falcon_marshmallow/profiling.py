@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Per-field timing of schema loading and dumping, for diagnostics"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+import threading
+import weakref
+from collections import namedtuple
+from functools import wraps
+from timeit import default_timer
+
+from typing import Any, Callable, Dict, List, Tuple
+
+# Third party
+from marshmallow import Schema, fields
+
+
+log = logging.getLogger(__name__)
+
+
+FieldStat = namedtuple(
+    "FieldStat", ("schema", "field", "operation", "calls", "seconds")
+)
+
+# (schema, field, operation)
+_Key = Tuple[str, str, str]
+
+# The attribute of instrumented callables holding the original callable
+_WRAPPED = "_profiled_func"
+
+
+def uninstrumented(func):
+    # type: (Callable[..., Any]) -> Callable[..., Any]
+    """Return the callable that a profiler wrapped, or ``func`` itself"""
+    return getattr(func, _WRAPPED, func)
+
+
+class FieldProfiler:
+    """Count calls to, and time spent in, each field of a schema
+
+    Instrumenting a schema wraps, on that instance only, the
+    ``deserialize()`` and ``serialize()`` methods of each of its fields,
+    each of their validators, and the schema's hooks (``pre_load``,
+    ``validates``, ``validates_schema``, etc.). Fields of nested schemas,
+    and the inner fields of lists, tuples and dicts, are instrumented as
+    well, with dotted field names such as ``"address.city"`` and
+    ``"tags[]"``. Schemas nested in themselves are instrumented at their
+    first level of nesting only.
+
+    Times are cumulative: a field's ``deserialize`` includes its
+    validators, and a ``Nested`` field's includes its schema's fields.
+    Wrapping every call adds overhead, so this is meant for finding the
+    hot fields of a route, not for running in production all the time.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        """Create a profiler with no statistics"""
+        self._stats = {}  # type: Dict[_Key, List[Any]]
+        self._lock = threading.Lock()
+        self._instrumented = weakref.WeakSet()  # type: Any
+
+    def _timed(self, key, func):
+        # type: (_Key, Callable[..., Any]) -> Callable[..., Any]
+        """Wrap a callable to record its calls under a key"""
+        stat = self._stats.setdefault(key, [0, 0.0])
+        lock = self._lock
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = default_timer() - start
+                with lock:
+                    stat[0] += 1
+                    stat[1] += elapsed
+
+        setattr(timed, _WRAPPED, func)
+        return timed
+
+    def instrument(self, sch):
+        # type: (Schema) -> Schema
+        """Instrument a schema instance, if not already done, and return it
+
+        :param sch: the schema to instrument
+        """
+        if sch in self._instrumented:
+            return sch
+        with self._lock:
+            if sch in self._instrumented:
+                return sch
+            self._instrumented.add(sch)
+        self._instrument_schema(sch, type(sch).__name__, "", ())
+        return sch
+
+    def _instrument_schema(self, sch, name, prefix, outer):
+        # type: (Schema, str, str, Tuple[type, ...]) -> None
+        """Instrument the hooks and fields of a schema
+
+        :param outer: the classes of the schemas this one is nested in
+        """
+        outer += (type(sch),)
+        for tag, hooks in sch._hooks.items():
+            for hook in hooks:
+                # Older releases of Marshmallow 3 key hooks by
+                # (tag, pass_many), and list only their names
+                attr = hook if isinstance(tag, tuple) else hook[0]
+                label = tag[0] if isinstance(tag, tuple) else tag
+                key = (name, prefix.rstrip(".") or "-", "%s %s" % (label, attr))
+                setattr(sch, attr, self._timed(key, getattr(sch, attr)))
+        for field_name, field in sch.fields.items():
+            self._instrument_field(field, name, prefix + field_name, outer)
+
+    def _instrument_field(self, field, name, path, outer):
+        # type: (fields.Field, str, str, Tuple[type, ...]) -> None
+        """Instrument a field, its validators, and any fields within it
+
+        :param outer: the classes of the schemas the field is nested in
+        """
+        for operation in ("deserialize", "serialize"):
+            setattr(
+                field,
+                operation,
+                self._timed((name, path, operation), getattr(field, operation)),
+            )
+        validators = []
+        for validator in field.validators:
+            label = getattr(validator, "__name__", type(validator).__name__)
+            key = (name, path, "validate %s" % label)
+            validators.append(self._timed(key, validator))
+        field.validators = validators
+
+        if isinstance(field, fields.Nested):
+            nested = field.schema
+            # Each level of a schema nested in itself is a new instance, so
+            # stop after the first
+            if (
+                nested not in self._instrumented
+                and outer.count(type(nested)) < 2
+            ):
+                self._instrumented.add(nested)
+                self._instrument_schema(nested, name, path + ".", outer)
+        for inner in (
+            getattr(field, "inner", None),
+            getattr(field, "value_field", None),
+        ):
+            if isinstance(inner, fields.Field):
+                self._instrument_field(inner, name, path + "[]", outer)
+        for index, inner in enumerate(getattr(field, "tuple_fields", ())):
+            self._instrument_field(inner, name, "%s[%d]" % (path, index), outer)
+
+    def report(self):
+        # type: () -> List[FieldStat]
+        """Return the statistics of every called field, costliest first"""
+        with self._lock:
+            stats = [
+                FieldStat(*(key + tuple(stat)))
+                for key, stat in self._stats.items()
+                if stat[0]
+            ]
+        stats.sort(key=lambda stat: stat.seconds, reverse=True)
+        return stats
+
+    def format_report(self, limit=20):
+        # type: (int) -> str
+        """Return the costliest statistics as a text table
+
+        :param limit: the maximum number of rows
+        """
+        lines = [
+            "%-24s %-24s %-28s %8s %10s"
+            % ("schema", "field", "operation", "calls", "ms")
+        ]
+        for stat in self.report()[:limit]:
+            lines.append(
+                "%-24s %-24s %-28s %8d %10.3f"
+                % (
+                    stat.schema,
+                    stat.field,
+                    stat.operation,
+                    stat.calls,
+                    stat.seconds * 1000,
+                )
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        # type: () -> None
+        """Zero the statistics, keeping schemas instrumented"""
+        with self._lock:
+            for stat in self._stats.values():
+                stat[0] = 0
+                stat[1] = 0.0
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Instantiate the schemas referenced by resources on first use"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+from threading import Lock
+
+from typing import Any, Dict, Hashable, List, Tuple
+
+# Third party
+from marshmallow import Schema, class_registry
+
+
+log = logging.getLogger(__name__)
+
+
+class SchemaRegistry:
+    """Resolve schema references to schema instances, creating them lazily
+
+    Resources may reference their schemas as ``Schema`` instances, as
+    before, or as ``Schema`` subclasses or names, in which case the schema
+    is only instantiated the first time a request needs it, and the
+    instance is then reused for every later request. Large APIs then pay
+    for creating only the schemas a worker actually serves.
+
+    Names may be registered with ``register()``, optionally with keyword
+    arguments for the schema's constructor (e.g. ``many=True``). Other
+    names are looked up in Marshmallow's own class registry, which holds
+    every ``Schema`` subclass by class name and by full import path.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        """Create an empty registry"""
+        self._registered = {}  # type: Dict[str, Tuple[Any, Dict[str, Any]]]
+        self._instances = {}  # type: Dict[Hashable, Schema]
+        self._lock = Lock()
+
+    def register(self, name, schema_cls, **kwargs):
+        # type: (str, Any, **Any) -> None
+        """Register a schema class under a name
+
+        :param name: the name resources may use to reference the schema
+        :param schema_cls: a ``Schema`` subclass, or the name or import
+            path of one in Marshmallow's class registry
+        :param kwargs: keyword arguments to instantiate the schema with
+        """
+        with self._lock:
+            self._registered[name] = (schema_cls, kwargs)
+            self._instances.pop(name, None)
+
+    def resolve(self, ref):
+        # type: (Any) -> Any
+        """Return the schema instance for a reference
+
+        :param ref: a ``Schema`` instance, which is returned as is, a
+            ``Schema`` subclass, or a registered or class registry name.
+            Any other object is returned unchanged.
+
+        :raises marshmallow.exceptions.RegistryError: if ``ref`` is a
+            name that is neither registered nor a known schema class
+        """
+        if isinstance(ref, Schema):
+            return ref
+        is_class = isinstance(ref, type) and issubclass(ref, Schema)
+        if not (is_class or isinstance(ref, str)):
+            return ref
+
+        try:
+            return self._instances[ref]
+        except KeyError:
+            pass
+
+        with self._lock:
+            # Another thread may have created it while we waited
+            instance = self._instances.get(ref)
+            if instance is None:
+                instance = self._create(ref)
+                self._instances[ref] = instance
+                log.debug(
+                    "Instantiated schema %r (%d live)",
+                    ref,
+                    len(self._instances),
+                )
+        return instance
+
+    def _create(self, ref):
+        # type: (Any) -> Schema
+        """Instantiate the schema for a class or name"""
+        kwargs = {}  # type: Dict[str, Any]
+        schema_cls = ref
+        if isinstance(ref, str):
+            schema_cls, kwargs = self._registered.get(ref, (ref, {}))
+        if isinstance(schema_cls, str):
+            schema_cls = class_registry.get_class(schema_cls)
+        return schema_cls(**kwargs)  # type: ignore
+
+    @property
+    def live(self):
+        # type: () -> int
+        """The number of schemas instantiated so far"""
+        return len(self._instances)
+
+    def live_schemas(self):
+        # type: () -> List[str]
+        """Return the names of the schemas instantiated so far"""
+        return sorted(
+            ref if isinstance(ref, str) else ref.__name__  # type: ignore
+            for ref in list(self._instances)
+        )
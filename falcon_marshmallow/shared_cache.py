@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""A serialized-response cache shared by all worker processes on a host
+
+Requires Python 3.8+ (for ``multiprocessing.shared_memory``) and a POSIX
+system (for ``fcntl``).
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import fcntl
+import hashlib
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from typing import Any, Optional, Tuple
+
+
+log = logging.getLogger(__name__)
+
+
+_MAGIC = b"FMSHMC01"
+# magic, generation, arena bytes used, slot count, arena size
+_HEADER = struct.Struct("=8sQQQQ")
+# sequence, key hash, arena offset, entry length
+_SLOT = struct.Struct("=QQQQ")
+# key length, prefixed to each entry in the arena
+_KEY_LEN = struct.Struct("=I")
+_HEADER_SIZE = 64
+_MAX_PROBES = 8
+# The number of seconds to wait for another process to initialize a
+# segment it has just created
+_INIT_TIMEOUT = 5.0
+
+
+def _hash_key(key):
+    # type: (bytes) -> int
+    """Return a non-zero 64-bit hash of a key, stable across processes"""
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return struct.unpack("=Q", digest)[0] or 1
+
+
+def _open_segment(name, create=False, size=0):
+    # type: (str, bool, int) -> shared_memory.SharedMemory
+    """Create or attach to a shared memory segment without tracking it
+
+    By default, the resource tracker unlinks segments when the process
+    that created or (before Python 3.13) attached to them exits, which
+    would pull the cache out from under the other workers using it. The
+    cache's lifetime is instead managed explicitly with ``unlink()``.
+    """
+    if sys.version_info >= (3, 13):
+        # pylint: disable=unexpected-keyword-arg
+        return shared_memory.SharedMemory(  # type: ignore
+            name=name, create=create, size=size, track=False
+        )
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+    return shm
+
+
+def _wait_for_header(buf, name):
+    # type: (memoryview, str) -> Tuple[Any, ...]
+    """Return the header of a segment, once its creator has written it
+
+    Segments are created zeroed, and their creator writes the magic last,
+    so a process attaching to a segment that was just created waits for
+    it rather than mistaking the segment for something else.
+
+    :raises ValueError: if the segment is not a response cache, or is
+        still not initialized after ``_INIT_TIMEOUT`` seconds
+    """
+    deadline = time.monotonic() + _INIT_TIMEOUT
+    while True:
+        header = _HEADER.unpack_from(buf, 0)
+        if header[0] == _MAGIC:
+            return header
+        if header[0] != bytes(len(_MAGIC)) or time.monotonic() > deadline:
+            raise ValueError(
+                "Shared memory segment %r is not a response cache" % name
+            )
+        time.sleep(0.001)
+
+
+class SharedMemoryCache:
+    """Cache serialized responses in a shared memory arena
+
+    The segment holds a small header, a fixed-size open-addressing index,
+    and an arena into which entries are appended. Any process on the
+    host may attach to the segment by name, so prefork workers share one
+    copy of each cached payload, and a restarted worker finds the cache
+    already warm.
+
+    Reads take no locks: each index slot is protected by a sequence
+    counter (a "seqlock"), and a reader that sees the counter change
+    while it copies an entry treats the lookup as a miss. Writes are
+    serialized by a file lock. When the arena fills up, the writer that
+    runs out of space clears the whole cache and starts again, which
+    keeps the layout simple at the cost of an occasional cold cache.
+
+    Use it as the ``response_cache`` of the ``Marshmallow`` middleware.
+    """
+
+    def __init__(
+        self,
+        name="falcon_marshmallow_cache",
+        size=64 * 1024 * 1024,
+        slots=16384,
+        lock_path=None,
+    ):
+        # type: (str, int, int, Optional[str]) -> None
+        """Create the shared segment, or attach to it if it exists
+
+        :param name: the name of the shared memory segment; every
+            process using the same name shares the same cache
+        :param size: the total size of the segment in bytes, used only
+            when creating it
+        :param slots: the number of index slots, used only when
+            creating the segment
+        :param lock_path: the path of the file used to serialize
+            writers. Defaults to a file named after the segment in the
+            system temporary directory.
+        """
+        self.name = name
+        try:
+            self._shm = _open_segment(name, create=True, size=size)
+            created = True
+        except FileExistsError:
+            self._shm = _open_segment(name)
+            created = False
+
+        buf = self._shm.buf
+        if buf is None:
+            raise ValueError("Shared memory segment %r is closed" % name)
+        # Released, rather than reset, when the segment is closed
+        self._buf = buf  # type: memoryview
+        if created:
+            arena_size = size - _HEADER_SIZE - slots * _SLOT.size
+            if arena_size <= 0:
+                raise ValueError("size is too small for the number of slots")
+            self._buf[: _HEADER_SIZE + slots * _SLOT.size] = bytes(
+                _HEADER_SIZE + slots * _SLOT.size
+            )
+            _HEADER.pack_into(
+                self._buf, 0, bytes(len(_MAGIC)), 0, 0, slots, arena_size
+            )
+            # Last, as attaching processes wait for it
+            self._buf[: len(_MAGIC)] = _MAGIC
+        else:
+            _, _, _, slots, arena_size = _wait_for_header(self._buf, name)
+
+        self._slots = slots
+        self._arena_size = arena_size
+        self._arena_start = _HEADER_SIZE + slots * _SLOT.size
+        self._max_entry = arena_size // 4
+        self._thread_lock = threading.Lock()
+        self._lock_path = lock_path or os.path.join(
+            tempfile.gettempdir(), "%s.lock" % name
+        )
+        self._lock_file = None  # type: Optional[int]
+        self._lock_pid = None  # type: Optional[int]
+
+    def _slot_offset(self, index):
+        # type: (int) -> int
+        """Return the buffer offset of an index slot"""
+        return _HEADER_SIZE + index * _SLOT.size
+
+    def _probe(self, key_hash):
+        # type: (int) -> range
+        """Return the slot indices that may hold a key"""
+        start = key_hash % self._slots
+        return range(start, start + min(_MAX_PROBES, self._slots))
+
+    def get(self, key):
+        # type: (str) -> Optional[bytes]
+        """Return the bytes cached under a key, or None
+
+        :param key: the cache key
+        """
+        key_bytes = key.encode("utf-8")
+        key_hash = _hash_key(key_bytes)
+        buf = self._buf
+        for index in self._probe(key_hash):
+            offset = self._slot_offset(index % self._slots)
+            seq, slot_hash, entry_offset, length = _SLOT.unpack_from(
+                buf, offset
+            )
+            if slot_hash == 0:
+                return None
+            if seq & 1 or slot_hash != key_hash:
+                continue
+
+            start = self._arena_start + entry_offset
+            (key_len,) = _KEY_LEN.unpack_from(buf, start)
+            key_start = start + _KEY_LEN.size
+            value = bytes(buf[key_start : start + length])
+            if _SLOT.unpack_from(buf, offset)[0] != seq:
+                # The slot was rewritten while we were reading it
+                return None
+            if value[:key_len] != key_bytes:
+                continue
+            return value[key_len:]
+        return None
+
+    def _lock_fd(self):
+        # type: () -> int
+        """Return this process's descriptor of the lock file"""
+        pid = os.getpid()
+        if self._lock_file is None or self._lock_pid != pid:
+            # Descriptors inherited across fork share flock() state, so
+            # every process opens its own.
+            self._lock_file = os.open(
+                self._lock_path, os.O_RDWR | os.O_CREAT, 0o600
+            )
+            self._lock_pid = pid
+        return self._lock_file
+
+    def _acquire(self):
+        # type: () -> None
+        """Acquire the cross-process write lock"""
+        self._thread_lock.acquire()
+        fcntl.flock(self._lock_fd(), fcntl.LOCK_EX)
+
+    def _release(self):
+        # type: () -> None
+        """Release the cross-process write lock"""
+        fcntl.flock(self._lock_fd(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def _write_slot(self, index, key_hash, entry_offset, length):
+        # type: (int, int, int, int) -> None
+        """Overwrite an index slot, bumping its sequence counter"""
+        offset = self._slot_offset(index)
+        seq = _SLOT.unpack_from(self._buf, offset)[0]
+        struct.pack_into("=Q", self._buf, offset, seq + 1)
+        struct.pack_into(
+            "=QQQ", self._buf, offset + 8, key_hash, entry_offset, length
+        )
+        struct.pack_into("=Q", self._buf, offset, seq + 2)
+
+    def _reset(self):
+        # type: () -> None
+        """Empty the cache, invalidating any concurrent reads"""
+        magic, generation, _, slots, arena_size = _HEADER.unpack_from(
+            self._buf, 0
+        )
+        for index in range(self._slots):
+            self._write_slot(index, 0, 0, 0)
+        _HEADER.pack_into(
+            self._buf, 0, magic, generation + 1, 0, slots, arena_size
+        )
+
+    def set(self, key, value):
+        # type: (str, bytes) -> None
+        """Cache bytes under a key
+
+        Values larger than a quarter of the arena are not cached.
+
+        :param key: the cache key
+        :param value: the bytes to cache
+        """
+        key_bytes = key.encode("utf-8")
+        length = _KEY_LEN.size + len(key_bytes) + len(value)
+        if length > self._max_entry:
+            return
+        key_hash = _hash_key(key_bytes)
+
+        self._acquire()
+        try:
+            used = _HEADER.unpack_from(self._buf, 0)[2]
+            if used + length > self._arena_size:
+                log.info(
+                    "Shared response cache %s is full, resetting", self.name
+                )
+                self._reset()
+                used = 0
+
+            start = self._arena_start + used
+            _KEY_LEN.pack_into(self._buf, start, len(key_bytes))
+            key_start = start + _KEY_LEN.size
+            self._buf[key_start : key_start + len(key_bytes)] = key_bytes
+            value_start = key_start + len(key_bytes)
+            self._buf[value_start : value_start + len(value)] = value
+
+            target = None
+            for index in self._probe(key_hash):
+                index %= self._slots
+                slot_hash = _SLOT.unpack_from(
+                    self._buf, self._slot_offset(index)
+                )[1]
+                if slot_hash in (0, key_hash):
+                    target = index
+                    break
+            if target is None:
+                # Every candidate slot holds another key: evict the first
+                target = key_hash % self._slots
+
+            self._write_slot(target, key_hash, used, length)
+            magic, generation, _, slots, arena_size = _HEADER.unpack_from(
+                self._buf, 0
+            )
+            _HEADER.pack_into(
+                self._buf,
+                0,
+                magic,
+                generation,
+                used + length,
+                slots,
+                arena_size,
+            )
+        finally:
+            self._release()
+
+    def clear(self):
+        # type: () -> None
+        """Remove all cached entries for every process"""
+        self._acquire()
+        try:
+            self._reset()
+        finally:
+            self._release()
+
+    def close(self):
+        # type: () -> None
+        """Detach this process from the shared segment"""
+        self._shm.close()
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            os.close(self._lock_file)
+            self._lock_file = None
+
+    def unlink(self):
+        # type: () -> None
+        """Destroy the shared segment
+
+        The segment outlives the processes using it, so call this once,
+        from the process that owns the cache's lifetime (e.g. the
+        server's master process), when the cache is no longer needed.
+        """
+        if sys.version_info < (3, 13):
+            # Balance the unregistration in _open_segment()
+            resource_tracker.register(
+                self._shm._name, "shared_memory"  # type: ignore
+            )
+        self._shm.unlink()
+        try:
+            os.unlink(self._lock_path)
+        except OSError:
+            pass
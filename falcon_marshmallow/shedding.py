@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Adaptive load shedding for (de)serialization work"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+from threading import Lock
+
+from typing import Dict, Hashable, Optional, Tuple
+
+
+log = logging.getLogger(__name__)
+
+
+class LoadShedder:
+    """Track in-flight (de)serialization work and shed excess load
+
+    The shedder keeps an exponentially weighted moving average of the
+    time spent loading a request body, per byte, and of the time spent
+    dumping a response, for each route. When a request arrives, its cost
+    is estimated from its ``Content-Length`` and added to the estimated
+    cost of all work currently in flight. If that total would exceed the
+    ``budget``, large requests are rejected before their bodies are read,
+    so that the work already admitted can finish quickly instead of all
+    requests slowing down together.
+
+    Budgets are per shedder, so with the default of one ``Marshmallow``
+    middleware per worker process they apply per process.
+    """
+
+    def __init__(
+        self,
+        budget=0.5,
+        min_content_length=16 * 1024,
+        retry_after=1,
+        smoothing=0.2,
+    ):
+        # type: (float, int, int, float) -> None
+        """Create the shedder
+
+        :param budget: the maximum estimated number of CPU seconds of
+            (de)serialization work to have in flight at once
+        :param min_content_length: requests with a smaller body are
+            always admitted, though their cost is still tracked
+        :param retry_after: the number of seconds clients are told to
+            wait before retrying a rejected request
+        :param smoothing: the weight given to each new measurement in
+            the moving averages, between 0 and 1
+        """
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing must be in (0, 1]")
+        self.budget = budget
+        self.min_content_length = min_content_length
+        self.retry_after = retry_after
+        self._smoothing = smoothing
+        self._load_cost = {}  # type: Dict[Hashable, float]
+        self._dump_cost = {}  # type: Dict[Hashable, float]
+        self._inflight = 0.0
+        self._lock = Lock()
+        self.admitted = 0
+        self.shed = 0
+
+    @property
+    def inflight(self):
+        # type: () -> float
+        """The estimated seconds of work currently in flight"""
+        return self._inflight
+
+    def estimate(self, route, content_length):
+        # type: (Hashable, int) -> float
+        """Return the estimated cost of handling a request to a route
+
+        :param route: a hashable identifying the route
+        :param content_length: the size of the request body in bytes
+        """
+        return self._load_cost.get(route, 0.0) * content_length + (
+            self._dump_cost.get(route, 0.0)
+        )
+
+    def admit(self, route, content_length):
+        # type: (Hashable, int) -> Optional[float]
+        """Decide whether to accept a request for loading
+
+        :param route: a hashable identifying the route
+        :param content_length: the size of the request body in bytes
+
+        :return: the estimated cost of the request, which must be passed
+            to ``finish_load()``, or ``None`` if the request should be
+            rejected
+        """
+        estimate = self.estimate(route, content_length)
+        with self._lock:
+            if (
+                content_length >= self.min_content_length
+                and self._inflight
+                and self._inflight + estimate > self.budget
+            ):
+                self.shed += 1
+                return None
+            self._inflight += estimate
+            self.admitted += 1
+        return estimate
+
+    def _update(self, costs, route, sample):
+        # type: (Dict[Hashable, float], Hashable, float) -> None
+        """Fold a new sample into a route's moving average"""
+        previous = costs.get(route)
+        if previous is None:
+            costs[route] = sample
+        else:
+            costs[route] = previous + self._smoothing * (sample - previous)
+
+    def finish_load(self, route, content_length, estimate, elapsed):
+        # type: (Hashable, int, float, float) -> None
+        """Record the completion of loading an admitted request
+
+        :param route: a hashable identifying the route
+        :param content_length: the size of the request body in bytes
+        :param estimate: the value returned by ``admit()``
+        :param elapsed: the number of seconds spent loading the body
+        """
+        with self._lock:
+            self._inflight = max(self._inflight - estimate, 0.0)
+            if content_length:
+                self._update(
+                    self._load_cost, route, elapsed / content_length
+                )
+
+    def start_dump(self, route):
+        # type: (Hashable) -> float
+        """Record the start of dumping a response
+
+        :param route: a hashable identifying the route
+
+        :return: the estimated cost of the dump, which must be passed to
+            ``finish_dump()``
+        """
+        estimate = self._dump_cost.get(route, 0.0)
+        with self._lock:
+            self._inflight += estimate
+        return estimate
+
+    def finish_dump(self, route, estimate, elapsed):
+        # type: (Hashable, float, float) -> None
+        """Record the completion of dumping a response
+
+        :param route: a hashable identifying the route
+        :param estimate: the value returned by ``start_dump()``
+        :param elapsed: the number of seconds spent dumping
+        """
+        with self._lock:
+            self._inflight = max(self._inflight - estimate, 0.0)
+            self._update(self._dump_cost, route, elapsed)
+
+    def costs(self):
+        # type: () -> Dict[Hashable, Tuple[float, float]]
+        """Return the current cost estimates for each route
+
+        :return: a mapping of route to a tuple of the estimated seconds
+            per byte of request body loaded and seconds per response
+            dumped
+        """
+        routes = set(self._load_cost) | set(self._dump_cost)
+        return {
+            route: (
+                self._load_cost.get(route, 0.0),
+                self._dump_cost.get(route, 0.0),
+            )
+            for route in routes
+        }
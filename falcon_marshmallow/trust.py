@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Loading request bodies from trusted sources without validating them"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import copy
+import logging
+import threading
+import weakref
+
+from typing import Any, Callable, Dict, Optional, Type
+
+# Third party
+import marshmallow
+from marshmallow import Schema, class_registry, fields
+from marshmallow.decorators import VALIDATES, VALIDATES_SCHEMA
+from marshmallow.exceptions import RegistryError
+
+from falcon import Request
+
+# Local
+from .discriminator import Discriminated
+from .pool import _unbound_copy, clone_schema
+
+
+log = logging.getLogger(__name__)
+
+
+# Load trusted request bodies with their schemas' type conversion alone
+DESERIALIZE_ONLY = "deserialize_only"
+# Store trusted request bodies as parsed, without loading them
+SKIP = "skip"
+TRUST_MODES = (DESERIALIZE_ONLY, SKIP)
+
+MARSHMALLOW_2 = marshmallow.__version_info__ < (3,)
+
+# The subclass of each schema class without validators
+_unvalidated_classes = {}  # type: Dict[Type[Schema], Type[Schema]]
+_classes_lock = threading.RLock()
+
+
+def _without_validators(hooks):
+    # type: (Any) -> Any
+    """Return a copy of a schema's hooks without its validators"""
+    hooks = copy.copy(hooks)
+    for tag in list(hooks):
+        # Older releases of Marshmallow 3 key hooks by (tag, pass_many)
+        label = tag[0] if isinstance(tag, tuple) else tag
+        if label in (VALIDATES, VALIDATES_SCHEMA):
+            del hooks[tag]
+    return hooks
+
+
+def _unvalidated_class(cls):
+    # type: (Type[Schema]) -> Type[Schema]
+    """Return a subclass of a schema class without any validators
+
+    The subclass is not registered, so that nested schemas referenced by
+    name still resolve to the original class.
+    """
+    with _classes_lock:
+        try:
+            return _unvalidated_classes[cls]
+        except KeyError:
+            pass
+        meta = type(str("Meta"), (cls.Meta,), {"register": False})
+        metaclass = type(cls)  # type: Any
+        subclass = metaclass(
+            str(cls.__name__),
+            (cls,),
+            {"Meta": meta, "__module__": cls.__module__},
+        )  # type: Type[Schema]
+        # Stored before stripping the fields, for self-referencing schemas
+        _unvalidated_classes[cls] = subclass
+        subclass._hooks = _without_validators(cls._hooks)
+        declared = type(cls._declared_fields)()
+        for name, field in cls._declared_fields.items():
+            declared[name] = _strip_field(_unbound_copy(field))
+        subclass._declared_fields = declared
+        return subclass
+
+
+def _unvalidated_nested(nested):
+    # type: (Any) -> Any
+    """Return the equivalent without validators of a ``Nested`` schema"""
+    if isinstance(nested, Schema):
+        return unvalidated_schema(nested)
+    if isinstance(nested, type) and issubclass(nested, Schema):
+        return _unvalidated_class(nested)
+    if isinstance(nested, dict):
+        return _unvalidated_class(Schema.from_dict(nested))
+    if isinstance(nested, str):
+        if nested == "self":
+            # Resolved to the class of the unvalidated root schema
+            return nested
+        try:
+            return _unvalidated_class(
+                class_registry.get_class(nested, all=False)
+            )
+        except RegistryError:
+            # Not registered yet, so validated as usual
+            return nested
+    if callable(nested):
+        return lambda: _unvalidated_nested(nested())
+    return nested
+
+
+def _strip_field(field):
+    # type: (fields.Field) -> fields.Field
+    """Remove the validators of a field, and of any fields within it
+
+    The field is modified in place, so it must be a copy.
+    """
+    field.validators = []
+    if isinstance(field, fields.Nested):
+        field.nested = _unvalidated_nested(field.nested)
+        field._schema = None
+    inner = getattr(field, "inner", None)
+    if isinstance(inner, fields.Field):
+        _strip_field(inner)
+    for inner in getattr(field, "tuple_fields", None) or ():
+        _strip_field(inner)
+    for attr in ("key_field", "value_field"):
+        if isinstance(getattr(field, attr, None), fields.Field):
+            _strip_field(getattr(field, attr))
+    return field
+
+
+def unvalidated_schema(sch):
+    # type: (Schema) -> Schema
+    """Return a copy of a schema instance that runs no validators
+
+    The copy, and the schemas nested in it, convert types, apply
+    defaults, reject unknown and missing required fields, and run their
+    ``pre_load`` and ``post_load`` hooks, as the original does, but skip
+    the validators of their fields and their ``validates`` and
+    ``validates_schema`` hooks.
+    """
+    instance = clone_schema(sch)
+    if isinstance(instance, Discriminated):
+        instance.schemas = {
+            value: unvalidated_schema(sub_schema)
+            for value, sub_schema in instance.schemas.items()
+        }
+        return instance
+    instance.__class__ = _unvalidated_class(type(sch))
+    for field in instance.declared_fields.values():
+        _strip_field(field)
+    instance._init_fields()
+    return instance
+
+
+def trusted_header(name, value):
+    # type: (str, str) -> Callable[[Request], bool]
+    """Return a predicate trusting requests with a header set to a value
+
+    For instance, ``trusted_header('X-Client-Verify', 'SUCCESS')`` trusts
+    requests whose client certificate a TLS terminating proxy verified.
+    The proxy must remove the header from the requests it forwards
+    otherwise, or any client could set it.
+    """
+
+    def is_trusted(req):
+        # type: (Request) -> bool
+        """Return whether the request has the header"""
+        return bool(req.get_header(name) == value)
+
+    return is_trusted
+
+
+def trusted_networks(*networks):
+    # type: (*str) -> Callable[[Request], bool]
+    """Return a predicate trusting requests from some IP networks
+
+    The address checked is that of the peer, ``req.remote_addr``, not any
+    address forwarded in headers, which clients may set.
+
+    :param networks: networks such as ``'10.0.0.0/8'`` or ``'::1'``
+    """
+    # Deferred, as Python 2 needs the ipaddress backport
+    import ipaddress
+
+    parsed = [ipaddress.ip_network(str(network)) for network in networks]
+
+    def is_trusted(req):
+        # type: (Request) -> bool
+        """Return whether the request comes from a trusted network"""
+        try:
+            address = ipaddress.ip_address(str(req.remote_addr))
+        except ValueError:
+            return False
+        return any(address in network for network in parsed)
+
+    return is_trusted
+
+
+class TrustPolicy:
+    """Load request bodies from trusted sources without validating them
+
+    Bodies sent by other services that validated them already need not
+    pay for validation again. Given as the ``trust_policy`` of the
+    middleware's ``LoadOptions``, requests for which ``is_trusted(req)``
+    returns true have their bodies loaded according to the ``mode``:
+
+    * ``'deserialize_only'``: with a copy of the resource's schema made
+      by ``unvalidated_schema()``, which converts types but runs no
+      validators. Under Marshmallow 2, bodies are loaded in full.
+    * ``'skip'``: not at all, storing the parsed JSON as it is
+
+    Query strings are loaded as usual. Data loaded from trusted bodies is
+    cached by a ``load_cache`` separately from fully validated data.
+    """
+
+    def __init__(self, is_trusted, mode=DESERIALIZE_ONLY):
+        # type: (Callable[[Request], bool], str) -> None
+        """Create the policy
+
+        :param is_trusted: a callable taking a request and returning
+            whether its body comes from a trusted source, such as
+            ``trusted_header()`` or ``trusted_networks()``
+        :param mode: (default ``'deserialize_only'``) how to load trusted
+            bodies, one of the ``TRUST_MODES``
+        """
+        if mode not in TRUST_MODES:
+            raise ValueError("mode must be one of %s" % ", ".join(TRUST_MODES))
+        self.is_trusted = is_trusted
+        self.mode = mode
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._schemas = weakref.WeakKeyDictionary()  # type: Any
+
+    def check(self, req):
+        # type: (Request) -> Optional[str]
+        """Return the mode in which to load a request body, if trusted
+
+        Trusted requests are counted in ``bypassed``.
+
+        :return: the ``mode``, or ``None`` to load the body in full
+        """
+        if self.mode == DESERIALIZE_ONLY and MARSHMALLOW_2:
+            return None
+        if not self.is_trusted(req):
+            return None
+        with self._lock:
+            self.bypassed += 1
+        return self.mode
+
+    def schema_for(self, sch):
+        # type: (Schema) -> Schema
+        """Return the copy of a schema without validators, made once"""
+        try:
+            return self._schemas[sch]  # type: ignore
+        except KeyError:
+            pass
+        unvalidated = unvalidated_schema(sch)
+        with self._lock:
+            return self._schemas.setdefault(sch, unvalidated)  # type: ignore
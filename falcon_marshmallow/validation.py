@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Checking a sample of dumped responses against their schemas"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+import random
+import threading
+
+from typing import Any, Callable, Dict, Mapping, Optional, Set
+
+# Third party
+import marshmallow
+from marshmallow import Schema, fields
+
+from falcon import Request
+
+# Local
+from .discriminator import Discriminated
+
+
+log = logging.getLogger(__name__)
+
+
+# Marshmallow 3 matches the partial paths of nested schemas by the data key
+# of the fields holding them, and later releases, which no longer have a
+# __version_info__, by field name
+_PARTIAL_BY_DATA_KEY = getattr(marshmallow, "__version_info__", (4,)) < (4,)
+
+
+def _loadable(sch, data, prefix, partial, many=False):
+    # type: (Schema, Any, str, Set[str], bool) -> Any
+    """Return data dumped by a schema as the schema would load it
+
+    The keys of ``dump_only`` fields, which loads reject as unknown, are
+    removed, at every level of nesting, and the ``partial`` path of each
+    ``load_only`` field, which is never dumped, is added to ``partial``.
+    The data is walked rather than the schema, so that schemas nested in
+    themselves are only walked as deep as the data goes.
+
+    :param prefix: the ``partial`` path of the schema, e.g. ``'a.b.'``
+    """
+    if many:
+        if not isinstance(data, list):
+            return data
+        return [_loadable(sch, item, prefix, partial) for item in data]
+    if not isinstance(data, Mapping):
+        return data
+    data = dict(data)
+    for name, field in sch.fields.items():
+        key = getattr(field, "data_key", None) or name
+        if field.dump_only:
+            data.pop(key, None)
+        elif field.load_only:
+            partial.add(prefix + name)
+        elif key in data:
+            path = key if _PARTIAL_BY_DATA_KEY else name
+            data[key] = _loadable_value(
+                field, data[key], prefix + path + ".", partial
+            )
+    return data
+
+
+def _loadable_value(field, value, prefix, partial):
+    # type: (fields.Field, Any, str, Set[str]) -> Any
+    """Return the dumped value of a field as it would be loaded
+
+    See ``_loadable``. The fields within lists, tuples and dicts are
+    given the ``partial`` paths of the fields holding them.
+    """
+    if isinstance(field, fields.Nested):
+        nested = field.schema
+        many = bool(nested.many or getattr(field, "many", False))
+        return _loadable(nested, value, prefix, partial, many)
+    inner = getattr(field, "inner", None)
+    if isinstance(inner, fields.Field) and isinstance(value, list):
+        return [_loadable_value(inner, item, prefix, partial) for item in value]
+    tuple_fields = getattr(field, "tuple_fields", None)
+    if tuple_fields and isinstance(value, (list, tuple)):
+        return [
+            _loadable_value(inner, item, prefix, partial)
+            for inner, item in zip(tuple_fields, value)
+        ]
+    value_field = getattr(field, "value_field", None)
+    if isinstance(value_field, fields.Field) and isinstance(value, Mapping):
+        return {
+            key: _loadable_value(value_field, item, prefix, partial)
+            for key, item in value.items()
+        }
+    return value
+
+
+def response_errors(sch, data):
+    # type: (Schema, Any) -> Dict[Any, Any]
+    """Return the errors of loading data dumped by a schema, if any
+
+    The data is validated with ``sch.validate()``, except that the
+    ``dump_only`` fields found in it are ignored, and that ``load_only``
+    fields, which are never dumped, are not required, in nested schemas
+    as well.
+    """
+    partial = set()  # type: Set[str]
+    data = _loadable(sch, data, "", partial, bool(sch.many))
+    return sch.validate(data, partial=tuple(partial) or None)
+
+
+class ResponseValidator:
+    """Validate a sample of dumped responses against their schemas
+
+    Schemas dump whatever handlers return, valid or not: a missing
+    required field, or a value out of a validator's range, is dumped as
+    is. Given as the ``response_validator`` of the middleware's
+    ``DumpOptions``, a random sample of the responses dumped with a schema
+    is loaded back with it, without running ``post_load`` hooks, and the
+    responses that the schema would reject are reported.
+
+    By default, violations are logged, and the response is sent anyway.
+    Pass a ``reporter`` to send them elsewhere, e.g. to a metrics or
+    error tracking service. In ``strict`` mode, e.g. in tests, with a
+    ``sample_rate`` of ``1``, invalid responses fail with a 500 instead.
+
+    Responses dumped with a ``Discriminated`` schema are not checked.
+    """
+
+    def __init__(self, sample_rate=0.01, strict=False, reporter=None):
+        # type: (float, bool, Optional[Callable[[Request, Schema, Any], Any]]) -> None
+        """Create the validator
+
+        :param sample_rate: (default ``0.01``) the fraction of responses
+            to check, between 0 and 1
+        :param strict: (default ``False``) whether to fail invalid
+            responses with a 500, rather than report them
+        :param reporter: an optional callable taking the request, the
+            schema and the error messages of an invalid response. By
+            default, they are logged as a warning.
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be in [0, 1]")
+        self.sample_rate = sample_rate
+        self.strict = strict
+        self.reporter = reporter
+        self.checked = 0
+        self.violations = 0
+        self._lock = threading.Lock()
+
+    def sample(self, sch):
+        # type: (Schema) -> bool
+        """Return whether to check a response dumped with a schema"""
+        if isinstance(sch, Discriminated):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def check(self, req, sch, data):
+        # type: (Request, Schema, Any) -> Dict[Any, Any]
+        """Check a dumped response, reporting it if invalid and not strict
+
+        :param req: the request object
+        :param sch: the schema the response was dumped with
+        :param data: the dumped response
+
+        :return: the error messages, or an empty dict if it is valid
+        """
+        messages = response_errors(sch, data)
+        with self._lock:
+            self.checked += 1
+            if messages:
+                self.violations += 1
+        if messages and not self.strict:
+            if self.reporter is not None:
+                self.reporter(req, sch, messages)
+            else:
+                log.warning(
+                    "Response to %s %s is invalid for %s: %s",
+                    req.method,
+                    req.path,
+                    type(sch).__name__,
+                    messages,
+                )
+        return messages
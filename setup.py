@@ -55,6 +55,7 @@ PACKAGE_DEPENDENCIES = [
     "falcon",
     "marshmallow",
     "simplejson",
+    'enum34;python_version<"3.4"',
     'typing;python_version<"3.5"',
 ]
 
@@ -70,10 +71,10 @@ TEST_DEPENDENCIES = [
     'mock;python_version<"3.3"',
 ]
 
-EXTRAS_DEPENDENCIES = {}  # type: dict
+EXTRAS_DEPENDENCIES = {"columnar": ["numpy"]}  # type: dict
 
 
-PACKAGE_EXCLUDE = ["*.tests", "*.tests.*"]
+PACKAGE_EXCLUDE = ["*.tests", "*.tests.*", "benchmarks", "benchmarks.*"]
 
 # See https://pypi.python.org/pypi?%3Aaction=list_classifiers for all
 # available setup classifiers
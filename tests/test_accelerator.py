@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.accelerator
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from collections import namedtuple
+from datetime import datetime
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, fields, post_dump, pre_dump
+
+# Local
+from falcon_marshmallow import DumpAccelerator, DumpOptions
+from falcon_marshmallow import middleware as m
+
+try:
+    from dataclasses import dataclass
+except ImportError:  # pragma: no cover
+    dataclass = None  # type: ignore
+
+
+class Owner(Schema):
+    """A nested schema"""
+
+    name = fields.String()
+
+
+class Thing(Schema):
+    """A schema exercising each way a field may get its value"""
+
+    id = fields.Integer()
+    name = fields.String(data_key="title")
+    created = fields.DateTime()
+    score = fields.Float(attribute="points")
+    tags = fields.List(fields.String())
+    owner = fields.Nested(Owner)
+    owner_name = fields.String(attribute="owner.name")
+    shout = fields.Method("get_shout")
+    rank = fields.Integer(dump_default=0)
+
+    def get_shout(self, obj):
+        """Return the thing's name in capitals"""
+        name = obj["name"] if isinstance(obj, dict) else obj.name
+        return name.upper()
+
+
+VALUES = {
+    "id": 1,
+    "name": "foo",
+    "created": datetime(2020, 1, 2, 3, 4, 5),
+    "points": 0.5,
+    "tags": ["a", "b"],
+    "owner": {"name": "bar"},
+    "rank": 3,
+}
+
+
+class PlainThing:
+    """A plain object"""
+
+    def __init__(self, **kwargs):
+        """Set each keyword argument as an attribute"""
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class SlottedThing:
+    """An object with __slots__"""
+
+    __slots__ = tuple(VALUES)
+
+    def __init__(self, **kwargs):
+        """Set each keyword argument as an attribute"""
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+TupleThing = namedtuple("TupleThing", list(VALUES))  # type: ignore
+
+KINDS = [dict, PlainThing, SlottedThing, TupleThing]
+
+if dataclass is not None:
+
+    @dataclass
+    class DataThing:
+        """A dataclass"""
+
+        id: int
+        name: str
+        created: datetime
+        points: float
+        tags: list
+        owner: dict
+        rank: int
+
+    KINDS.append(DataThing)
+
+
+class TestDumpAccelerator:
+    """Test that the accelerator dumps exactly as Marshmallow does"""
+
+    @pytest.mark.parametrize("kind", KINDS)
+    def test_matches_marshmallow(self, kind):
+        """Each supported kind of object dumps the same data"""
+        obj = kind(**VALUES)
+        acc = DumpAccelerator()
+        assert acc.dump(Thing(), obj) == Thing().dump(obj)
+        assert acc.dump(Thing(many=True), [obj, obj]) == Thing(many=True).dump(
+            [obj, obj]
+        )
+
+    def test_mixed_and_incomplete_objects(self):
+        """Objects missing values fall back, so dump defaults apply"""
+        values = dict(VALUES)
+        del values["rank"]
+        del values["points"]
+        objs = [kind(**VALUES) for kind in KINDS[:3]]
+        objs += [PlainThing(**values), dict(values)]
+        sch = Thing(many=True)
+        assert DumpAccelerator().dump(sch, objs) == sch.dump(objs)
+
+    def test_plans_are_cached(self):
+        """A plan is compiled once per schema and class"""
+        sch = Thing(many=True)
+        acc = DumpAccelerator()
+        acc.dump(sch, [PlainThing(**VALUES), PlainThing(**VALUES)])
+        acc.dump(sch, [dict(VALUES)])
+        assert len(acc._plans) == 2
+        assert acc._plans.get((sch, PlainThing)) is not None
+
+    def test_hooks(self):
+        """pre_dump and post_dump hooks run as usual"""
+
+        class Hooked(Thing):
+            """A schema with hooks"""
+
+            @pre_dump
+            def bump(self, obj, **_):
+                """Bump the id"""
+                return dict(obj, id=obj["id"] + 1)
+
+            @post_dump(pass_many=True)
+            def wrap(self, data, many, **_):
+                """Wrap the output in an envelope"""
+                return {"data": data}
+
+        sch = Hooked(many=True)
+        objs = [dict(VALUES), dict(VALUES)]
+        result = DumpAccelerator().dump(sch, objs)
+        assert result == sch.dump(objs)
+        assert result["data"][0]["id"] == 2
+
+    def test_custom_get_attribute_is_not_accelerated(self):
+        """Schemas overriding get_attribute() are handled by it"""
+
+        class Custom(Schema):
+            """A schema reading attributes its own way"""
+
+            id = fields.Integer()
+
+            def get_attribute(self, obj, attr, default):
+                """Return a constant"""
+                return 42
+
+        sch = Custom()
+        acc = DumpAccelerator()
+        assert acc.dump(sch, PlainThing(id=1)) == {"id": 42}
+        assert (sch, PlainThing) in acc._plans
+        assert acc._plans.get((sch, PlainThing)) is None
+
+
+class TestMarshmallowDumpAccelerator:
+    """Test the dump_accelerator option of the Marshmallow middleware"""
+
+    def test_responses_use_accelerator(self):
+        """Results are dumped through the accelerator"""
+        acc = DumpAccelerator()
+
+        class Things:
+            """A collection of things"""
+
+            schema = Thing(many=True)
+
+            def on_get(self, req, resp):
+                """Return some things"""
+                req.context["result"] = [
+                    SlottedThing(**VALUES),
+                    PlainThing(**VALUES),
+                ]
+
+        app = API(
+            middleware=[
+                m.Marshmallow(dump_options=DumpOptions(dump_accelerator=acc))
+            ]
+        )
+        app.add_route("/things", Things())
+        resp = testing.TestClient(app).simulate_get("/things")
+
+        assert resp.status_code == 200
+        expected = Thing(many=True).dump(
+            [SlottedThing(**VALUES), PlainThing(**VALUES)]
+        )
+        assert json.loads(resp.text) == json.loads(json.dumps(expected))
+        assert len(acc._plans) == 2
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.batch
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import threading
+
+# Third party
+import simplejson as json
+from falcon import API, HTTPNotFound, testing
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow import BatchResource, Marshmallow
+
+
+class Thing(Schema):
+    """A thing schema"""
+
+    id = fields.Integer()
+    name = fields.String(required=True)
+
+
+class ThingResource:
+    """A single thing"""
+
+    schema = Thing()
+
+    def on_get(self, req, resp, thing_id):
+        """Return a thing"""
+        if thing_id == "404":
+            raise HTTPNotFound()
+        req.context["result"] = {
+            "id": int(thing_id),
+            "name": req.get_param("name") or "thing",
+        }
+
+
+class ThingCollection:
+    """Things"""
+
+    schema = Thing()
+
+    def __init__(self):
+        """Record the threads handling requests"""
+        self.threads = set()
+
+    def on_post(self, req, resp):
+        """Create a thing"""
+        self.threads.add(threading.current_thread().name)
+        req.context["result"] = dict(req.context["json"], id=1)
+
+
+class Echo:
+    """Return request headers as plain text"""
+
+    def on_get(self, req, resp):
+        """Echo the auth, custom and idempotency key headers"""
+        resp.content_type = "text/plain"
+        resp.body = "%s %s %s" % (
+            req.auth,
+            req.get_header("X-Thing"),
+            req.get_header("Idempotency-Key"),
+        )
+
+
+def make_client(**kwargs):
+    """Create a client for an app with a batch resource"""
+    app = API(middleware=[Marshmallow()])
+    collection = ThingCollection()
+    app.add_route("/things", collection)
+    app.add_route("/things/{thing_id}", ThingResource())
+    app.add_route("/echo", Echo())
+    app.add_route("/batch", BatchResource(app, **kwargs))
+    return testing.TestClient(app), collection
+
+
+class BytesJSON:
+    """A json module whose dumps() returns bytes, as orjson's does"""
+
+    @staticmethod
+    def dumps(obj):
+        """Encode an object as UTF-8 JSON"""
+        return json.dumps(obj).encode("utf-8")
+
+
+def post_batch(client, subs, **kwargs):
+    """Post a batch and return the response"""
+    return client.simulate_post("/batch", body=json.dumps(subs), **kwargs)
+
+
+class TestBatchResource:
+    """Test running sub-requests through the app"""
+
+    def test_sub_requests(self):
+        """Each sub-request gets its own status and body, in order"""
+        client, _ = make_client()
+        resp = post_batch(
+            client,
+            [
+                {"method": "GET", "path": "/things/3?name=foo"},
+                {"method": "POST", "path": "/things", "body": {"name": "a"}},
+                {"method": "POST", "path": "/things", "body": {}},
+                {"method": "GET", "path": "/things/404"},
+                {"method": "GET", "path": "/nowhere"},
+            ],
+        )
+
+        assert resp.status_code == 200
+        results = json.loads(resp.text)
+        assert [r["status"] for r in results] == [200, 200, 422, 404, 404]
+        assert results[0]["body"] == {"id": 3, "name": "foo"}
+        assert results[1]["body"] == {"id": 1, "name": "a"}
+        assert "name" in results[2]["body"]["description"]
+
+    def test_headers(self):
+        """Sub-requests inherit and may override the batch's headers"""
+        client, _ = make_client()
+        resp = post_batch(
+            client,
+            [
+                {"method": "GET", "path": "/echo"},
+                {
+                    "method": "GET",
+                    "path": "/echo",
+                    "headers": {
+                        "Authorization": "other",
+                        "X-Thing": "x",
+                        "Idempotency-Key": "sub",
+                    },
+                },
+            ],
+            headers={"Authorization": "token", "Idempotency-Key": "batch"},
+        )
+        results = json.loads(resp.text)
+        assert [r["body"] for r in results] == [
+            "token None None",
+            "other x sub",
+        ]
+
+    def test_invalid_batches(self):
+        """Malformed, oversized and nested batches are rejected"""
+        client, _ = make_client(max_requests=2)
+        get = {"method": "GET", "path": "/things/1"}
+
+        assert post_batch(client, [{"path": "things"}]).status_code == 422
+        assert post_batch(client, [get] * 3).status_code == 400
+        assert client.simulate_post("/batch").status_code == 400
+
+        resp = post_batch(
+            client, [{"method": "POST", "path": "/batch", "body": [get]}]
+        )
+        assert json.loads(resp.text)[0]["status"] == 400
+
+    def test_concurrent(self):
+        """Sub-requests may run on a thread pool, keeping their order"""
+        client, collection = make_client(max_workers=4)
+        subs = [
+            {"method": "POST", "path": "/things", "body": {"name": str(i)}}
+            for i in range(20)
+        ]
+        results = json.loads(post_batch(client, subs).text)
+        assert [r["body"]["name"] for r in results] == [
+            str(i) for i in range(20)
+        ]
+        assert threading.current_thread().name not in collection.threads
+
+    def test_bytes_json_module(self):
+        """Json modules encoding to bytes are supported"""
+        client, _ = make_client(json_module=BytesJSON)
+        resp = post_batch(
+            client,
+            [
+                {"method": "POST", "path": "/things", "body": {"name": "a"}},
+                {"method": "GET", "path": "/echo"},
+            ],
+        )
+        results = json.loads(resp.text)
+        assert results[0]["body"] == {"id": 1, "name": "a"}
+        assert results[1]["body"] == "None None None"
+
+    def test_close(self):
+        """Closing the resource shuts its thread pool down"""
+        resource = BatchResource(API(), max_workers=2)
+        executor = resource._get_executor()
+        resource.close()
+        assert executor._shutdown
+        assert resource._get_executor() is not executor
+        resource.close()
+        resource.close()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.columnar
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # type: ignore
+
+# Third party
+import pytest
+from falcon import errors
+from marshmallow import (
+    EXCLUDE,
+    INCLUDE,
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    validate,
+)
+
+# Local
+from falcon_marshmallow import LoadOptions
+from falcon_marshmallow import middleware as mid
+
+pytest.importorskip("numpy")
+if mid.MARSHMALLOW_2:
+    pytest.skip(
+        "ColumnarLoader requires Marshmallow 3", allow_module_level=True
+    )
+
+from falcon_marshmallow.columnar import ColumnarLoader  # noqa: E402
+
+
+class Reading(Schema):
+    """A flat schema the loader supports"""
+
+    sensor = fields.String(required=True, validate=validate.Length(max=8))
+    value = fields.Float(validate=validate.Range(min=-100, max=100))
+    count = fields.Integer(data_key="n", validate=validate.Range(min=0, max=10))
+    kind = fields.String(validate=validate.OneOf(["a", "b"]), load_default="a")
+    ok = fields.Boolean(allow_none=True)
+
+
+def reading(index, **overrides):
+    """Return a valid raw reading"""
+    record = {
+        "sensor": "s%d" % index,
+        "value": index / 10.0,
+        "n": index % 10,
+        "kind": "b",
+        "ok": True,
+    }
+    record.update(overrides)
+    return record
+
+
+def load_both(sch, records):
+    """Load records with Marshmallow and with the loader"""
+
+    def run(load):
+        try:
+            return load(), None
+        except ValidationError as exc:
+            return exc.valid_data, exc.messages
+
+    return (
+        run(lambda: sch.load(records)),
+        run(lambda: ColumnarLoader(min_records=1).load(sch, records)),
+    )
+
+
+class TestColumnarLoader:
+    """Test that the loader agrees with Marshmallow"""
+
+    def test_valid_records(self):
+        """Valid records load exactly as with Marshmallow"""
+        records = [reading(i) for i in range(50)]
+        records[3].pop("kind")
+        records[4].pop("ok")
+        records[5]["ok"] = None
+        expected, actual = load_both(Reading(many=True), records)
+        assert actual == expected
+        assert actual[1] is None
+        assert actual[0][3]["kind"] == "a"
+        assert "ok" not in actual[0][4]
+        assert actual[0][0]["count"] == 0
+
+    @pytest.mark.parametrize(
+        "bad",
+        [
+            {"n": 11},
+            {"n": "12"},
+            {"n": "nope"},
+            {"value": 3},
+            {"value": float("nan")},
+            {"sensor": "too long a name"},
+            {"sensor": None},
+            {"sensor": 5},
+            {"kind": "c"},
+            {"ok": "true"},
+            {"extra": 1},
+        ],
+    )
+    def test_invalid_records(self, bad):
+        """Errors and coercions match Marshmallow's, by record index"""
+        records = [reading(i) for i in range(20)]
+        records[7].update(bad)
+        expected, actual = load_both(Reading(many=True), records)
+        assert actual == expected
+
+    def test_missing_required_and_non_dicts(self):
+        """Missing fields and non-object records are reported"""
+        records = [reading(i) for i in range(20)]
+        del records[2]["sensor"]
+        records[9] = 5
+        expected, actual = load_both(Reading(many=True), records)
+        assert actual == expected
+        assert set(actual[1]) == {2, 9}
+
+    @pytest.mark.parametrize("unknown", [EXCLUDE, INCLUDE])
+    def test_unknown(self, unknown):
+        """Unknown keys are handled as the schema specifies"""
+        records = [reading(i, extra=i) for i in range(20)]
+        expected, actual = load_both(
+            Reading(many=True, unknown=unknown), records
+        )
+        assert actual == expected
+
+    def test_unsupported_schema_falls_back(self):
+        """Schemas with hooks are loaded by Marshmallow"""
+
+        class Hooked(Reading):
+            """A schema with a post_load hook"""
+
+            @post_load(pass_many=True)
+            def tag(self, data, **_):
+                """Tag the loaded data"""
+                return {"data": data}
+
+        sch = Hooked(many=True)
+        loader = ColumnarLoader(min_records=1)
+        records = [reading(i) for i in range(5)]
+        assert loader.load(sch, records) == sch.load(records)
+        assert loader._get_plan(sch) is None
+
+    def test_small_payloads_use_marshmallow(self):
+        """Payloads below the threshold never build a plan"""
+        loader = ColumnarLoader(min_records=10)
+        sch = Reading(many=True)
+        assert loader.load(sch, [reading(1)]) == sch.load([reading(1)])
+        assert sch not in loader._plans
+
+
+class TestMarshmallowBulkLoader:
+    """Test the bulk_loader option of the Marshmallow middleware"""
+
+    def make_req(self, body):
+        """Create a mock request"""
+        req = mock.Mock(method="POST", content_type="application/json")
+        req.bounded_stream.read.return_value = body
+        req.context = {}
+        return req
+
+    def test_many_lists_use_bulk_loader(self):
+        """Arrays loaded by many=True schemas go to the bulk loader"""
+        loader = ColumnarLoader(min_records=1)
+        mw = mid.Marshmallow(load_options=LoadOptions(bulk_loader=loader))
+        sch = Reading(many=True)
+        setattr(mw, "_get_schema", lambda *_, **__: sch)
+
+        req = self.make_req('[{"sensor": "a", "n": 1}]')
+        mw.process_resource(req, "foo", "foo", {})
+        assert req.context["json"] == [{"sensor": "a", "count": 1, "kind": "a"}]
+        assert sch in loader._plans
+
+        req = self.make_req('[{"sensor": "a", "n": 20}]')
+        with pytest.raises(errors.HTTPUnprocessableEntity):
+            mw.process_resource(req, "foo", "foo", {})
+
+    def test_single_objects_skip_bulk_loader(self):
+        """Schemas loading single objects do not use the bulk loader"""
+        loader = mock.Mock()
+        mw = mid.Marshmallow(load_options=LoadOptions(bulk_loader=loader))
+        setattr(mw, "_get_schema", lambda *_, **__: Reading())
+
+        req = self.make_req('{"sensor": "a"}')
+        mw.process_resource(req, "foo", "foo", {})
+        assert req.context["json"] == {"sensor": "a", "kind": "a"}
+        loader.load.assert_not_called()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.discriminator
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from collections import namedtuple
+
+from typing import Any, List, Optional
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, ValidationError, fields, post_load
+
+# Local
+from falcon_marshmallow import (
+    CompactLoader,
+    Discriminated,
+    DumpAccelerator,
+    DumpOptions,
+    LoadOptions,
+    Marshmallow,
+)
+
+
+class Click(Schema):
+    """A click event"""
+
+    type = fields.String(required=True)
+    x = fields.Integer(required=True)
+    y = fields.Integer(required=True)
+
+
+class View(Schema):
+    """A page view event"""
+
+    type = fields.String(required=True)
+    page = fields.String(required=True)
+
+    batches = []  # type: List[int]
+
+    def load(self, data, many=None, **kwargs):
+        # type: (Any, Optional[bool], **Any) -> Any
+        """Record the number of records loaded at once"""
+        self.batches.append(len(data) if many else 1)
+        return super(View, self).load(data, many=many, **kwargs)
+
+
+class Tagged(View):
+    """A view loaded into an object"""
+
+    @post_load
+    def make(self, data, **kwargs):
+        """Return a tuple"""
+        return ("view", data["page"])
+
+
+Event = namedtuple("Event", ("kind", "page"))
+
+
+def events(many=True):
+    """Return the event schema"""
+    return Discriminated("type", {"click": Click, "view": View()}, many=many)
+
+
+CLICK = {"type": "click", "x": 1, "y": 2}
+VIEW = {"type": "view", "page": "/"}
+
+
+class TestLoad:
+    """Test loading with the schema of each record"""
+
+    def test_single(self):
+        """Single records load with their own schema"""
+        sch = events(many=False)
+        assert sch.load(CLICK) == CLICK
+        assert sch.load(VIEW) == VIEW
+
+    def test_many(self):
+        """Records are loaded a group at a time, and keep their order"""
+        del View.batches[:]
+        data = [VIEW, CLICK, VIEW, CLICK, VIEW]
+        assert events().load(data) == data
+        assert View.batches == [3]
+        assert events(many=False).load(data, many=True) == data
+
+    def test_post_load(self):
+        """Each schema's hooks apply to its records"""
+        sch = Discriminated("type", {"click": Click, "view": Tagged}, many=True)
+        assert sch.load([CLICK, VIEW]) == [CLICK, ("view", "/")]
+
+    def test_invalid_records_do_not_share_data(self):
+        """Each invalid record has valid data of its own"""
+        with pytest.raises(ValidationError) as exc_info:
+            events().load([{"type": "hover"}, {"type": "hover"}])
+        valid_data = exc_info.value.valid_data
+        assert valid_data == [{}, {}]
+        assert isinstance(valid_data, list)
+        assert valid_data[0] is not valid_data[1]
+
+    @pytest.mark.parametrize(
+        "record, messages",
+        [
+            ({"x": 1}, {"type": ["Missing data for required field."]}),
+            ({"type": "hover"}, {"type": ["Must be one of: click, view."]}),
+            ({"type": ["click"]}, {"type": ["Must be one of: click, view."]}),
+            ("click", {"_schema": ["Invalid input type."]}),
+            (
+                {"type": "click", "x": 1},
+                {"y": ["Missing data for required field."]},
+            ),
+        ],
+    )
+    def test_errors(self, record, messages):
+        """Errors are keyed by the index of the invalid records"""
+        with pytest.raises(ValidationError) as exc_info:
+            events().load([CLICK, VIEW, record, CLICK])
+        assert exc_info.value.messages == {2: messages}
+        valid_data = exc_info.value.valid_data
+        assert isinstance(valid_data, list)
+        assert valid_data[:2] == [CLICK, VIEW]
+        assert valid_data[3] == CLICK
+
+        with pytest.raises(ValidationError) as exc_info:
+            events(many=False).load(record)
+        assert exc_info.value.messages == messages
+
+    def test_error_order(self):
+        """Errors from different schemas are ordered by index"""
+        data = [{"type": "view"}] * 11 + [{"type": "click"}] * 2
+        messages = events().validate(data)
+        assert list(messages) == list(range(13))
+        assert events().validate([CLICK]) == {}
+
+    def test_not_a_list(self):
+        """Many schemas only load lists"""
+        with pytest.raises(ValidationError) as exc_info:
+            events().load(CLICK)
+        assert exc_info.value.messages == {"_schema": ["Invalid input type."]}
+
+
+class TestDump:
+    """Test dumping with the schema of each object"""
+
+    def test_dump(self):
+        """Dicts and objects are dumped with their own schemas"""
+        sch = Discriminated(
+            "type", {"click": Click, "view": View}, attribute="kind"
+        )
+        assert sch.dump(Event("view", "/")) == {"page": "/"}
+        dumped = sch.dump(
+            [{"kind": "click", "x": 1, "y": 2}, Event("view", "/")], many=True
+        )
+        assert dumped == [{"x": 1, "y": 2}, {"page": "/"}]
+
+    def test_errors(self):
+        """Objects without a known discriminator cannot be dumped"""
+        with pytest.raises(ValidationError) as exc_info:
+            events().dump([CLICK, {"type": "hover"}])
+        assert list(exc_info.value.messages) == [1]
+
+
+class Events:
+    """An events resource"""
+
+    post_request_schema = events()
+    post_response_schema = events()
+
+    def on_post(self, req, resp):
+        """Echo the events"""
+        req.context["result"] = req.context["json"]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"load_options": LoadOptions(max_errors=2)},
+        {
+            "load_options": LoadOptions(bulk_loader=CompactLoader()),
+            "dump_options": DumpOptions(dump_accelerator=DumpAccelerator()),
+        },
+    ],
+)
+def test_middleware(options):
+    """The middleware loads and dumps each record with its schema"""
+    app = API(middleware=[Marshmallow(**options)])
+    app.add_route("/", Events())
+    client = testing.TestClient(app)
+
+    data = [CLICK, VIEW] * 3
+    resp = client.simulate_post("/", body=json.dumps(data))
+    assert resp.status_code == 200
+    assert json.loads(resp.text) == data
+
+    resp = client.simulate_post("/", body=json.dumps([VIEW, {"type": 1}]))
+    assert resp.status_code == 422
+    assert json.loads(json.loads(resp.text)["description"]) == {
+        "1": {"type": ["Must be one of: click, view."]}
+    }
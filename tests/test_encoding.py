@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.encoding
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import datetime
+import json as stdlib_json
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+
+# Local
+from falcon_marshmallow import DumpOptions, Marshmallow, TypeDispatchEncoder
+from falcon_marshmallow.encoding import default_encoder
+
+try:
+    from dataclasses import dataclass
+except ImportError:  # pragma: no cover
+    dataclass = None  # type: ignore
+
+
+class Color(Enum):
+    """An enum"""
+
+    RED = "red"
+
+
+class Moment(datetime.datetime):
+    """A datetime subclass"""
+
+
+RICH = {
+    "when": datetime.datetime(2020, 1, 2, 3, 4, 5),
+    "day": datetime.date(2020, 1, 2),
+    "at": datetime.time(3, 4, 5),
+    "id": UUID("12345678123456781234567812345678"),
+    "color": Color.RED,
+    "tags": {"a"},
+    "frozen": frozenset(["b"]),
+    "moment": Moment(2020, 1, 2),
+}
+
+EXPECTED = {
+    "when": "2020-01-02T03:04:05",
+    "day": "2020-01-02",
+    "at": "03:04:05",
+    "id": "12345678-1234-5678-1234-567812345678",
+    "color": "red",
+    "tags": ["a"],
+    "frozen": ["b"],
+    "moment": "2020-01-02T00:00:00",
+}
+
+
+class TestTypeDispatchEncoder:
+    """Test the type-dispatched default hook"""
+
+    @pytest.mark.parametrize("module", [json, stdlib_json])
+    def test_default_types(self, module):
+        """Common rich types are encoded by default"""
+        encoded = module.dumps(RICH, default=default_encoder)
+        assert json.loads(encoded) == EXPECTED
+
+    @pytest.mark.skipif(dataclass is None, reason="requires dataclasses")
+    def test_dataclasses(self):
+        """Dataclasses are encoded as mappings, recursively"""
+
+        @dataclass
+        class Event:
+            """A dataclass"""
+
+            name: str
+            when: datetime.date
+
+        encoded = json.dumps(
+            [Event("x", datetime.date(2020, 1, 1))], default=default_encoder
+        )
+        assert json.loads(encoded) == [{"name": "x", "when": "2020-01-01"}]
+
+    def test_unknown_types(self):
+        """Objects without a handler raise TypeError"""
+        with pytest.raises(TypeError):
+            default_encoder(object())
+
+    def test_register(self):
+        """Handlers may be registered, also as a decorator"""
+        encoder = TypeDispatchEncoder()
+        encoder.register(Decimal, str)
+
+        @encoder.register(complex)
+        def encode_complex(obj):
+            """Encode a complex number as a pair"""
+            return [obj.real, obj.imag]
+
+        assert (
+            stdlib_json.dumps([Decimal("1.10"), 1j], default=encoder)
+            == '["1.10", [0.0, 1.0]]'
+        )
+
+    def test_mro_lookup_is_cached(self):
+        """Subclasses use their base's handler, resolved once"""
+        encoder = TypeDispatchEncoder(include_defaults=False)
+        encoder.register(datetime.date, lambda obj: "date")
+        assert encoder(Moment(2020, 1, 1)) == "date"
+        assert encoder._cache[Moment] is encoder._handlers[datetime.date]
+
+        encoder.register(Moment, lambda obj: "moment")
+        assert encoder(Moment(2020, 1, 1)) == "moment"
+        with pytest.raises(TypeError):
+            encoder(UUID(int=0))
+
+
+class TestMarshmallowJSONDefault:
+    """Test encoding schema-less results in the Marshmallow middleware"""
+
+    def make_client(self, **kwargs):
+        """Create a client for a schema-less resource"""
+
+        class Rich:
+            """A resource without a schema"""
+
+            def on_get(self, req, resp):
+                """Return rich types"""
+                req.context["result"] = RICH
+
+        app = API(middleware=[Marshmallow(**kwargs)])
+        app.add_route("/rich", Rich())
+        return testing.TestClient(app)
+
+    def test_rich_types_without_schema(self):
+        """Rich types are encoded in the force_json path"""
+        resp = self.make_client().simulate_get("/rich")
+        assert resp.status_code == 200
+        assert json.loads(resp.text) == EXPECTED
+
+    def test_json_default_disabled(self):
+        """Without a default hook, rich types cannot be encoded"""
+        resp = self.make_client(
+            dump_options=DumpOptions(json_default=None)
+        ).simulate_get("/rich")
+        assert resp.status_code == 500
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.errors
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from collections import OrderedDict
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, HTTPUnprocessableEntity, testing
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow import (
+    HTTPSerializationError,
+    HTTPValidationError,
+    Marshmallow,
+)
+from falcon_marshmallow.errors import format_errors
+
+
+MESSAGES = {"name": ["Missing data for required field."]}
+
+
+class CountingCodec:
+    """A json module counting its encodes"""
+
+    def __init__(self):
+        """Start counting"""
+        self.dumps_calls = 0
+        self.JSONDecodeError = json.JSONDecodeError
+
+    def dumps(self, obj, **kwargs):
+        """Encode and count"""
+        self.dumps_calls += 1
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, data, **kwargs):
+        """Decode"""
+        return json.loads(data, **kwargs)
+
+
+class BytesCodec(CountingCodec):
+    """A json module encoding to bytes, like orjson"""
+
+    def dumps(self, obj, **kwargs):
+        """Encode to bytes"""
+        return super(BytesCodec, self).dumps(obj, **kwargs).encode("utf-8")
+
+
+class TestErrors:
+    """Test the errors on their own"""
+
+    def test_legacy(self):
+        """Without a formatter, messages are encoded in the description"""
+        error = HTTPValidationError(MESSAGES, json)
+        assert isinstance(error, HTTPUnprocessableEntity)
+        assert error.messages == MESSAGES
+        body = json.loads(error.to_json())
+        assert json.loads(body["description"]) == MESSAGES
+
+    def test_formatted(self):
+        """With a formatter, messages are embedded as data"""
+        codec = CountingCodec()
+        error = HTTPSerializationError(MESSAGES, codec, format_errors)
+        assert codec.dumps_calls == 0
+        assert json.loads(error.to_json()) == {
+            "title": "Could not serialize response",
+            "errors": MESSAGES,
+        }
+        assert codec.dumps_calls == 1
+        assert error.description is None
+
+    @pytest.mark.parametrize("formatter", [None, format_errors])
+    def test_bytes_codec(self, formatter):
+        """Codecs encoding to bytes give text descriptions and bodies"""
+        error = HTTPValidationError(MESSAGES, BytesCodec(), formatter)
+        body = error.to_json()
+        assert isinstance(body, str)
+        if formatter is None:
+            assert json.loads(json.loads(body)["description"]) == MESSAGES
+        else:
+            assert json.loads(body)["errors"] == MESSAGES
+
+    def test_obj_type(self):
+        """to_dict() returns the mapping type it is asked for"""
+        error = HTTPValidationError(MESSAGES, json, format_errors)
+        assert type(error.to_dict(OrderedDict)) is OrderedDict
+
+
+class Person(Schema):
+    """A person schema"""
+
+    name = fields.String(required=True)
+    age = fields.Integer()
+
+
+class People:
+    """A resource with a schema"""
+
+    schema = Person()
+
+    def on_post(self, req, resp):
+        """Echo the loaded body"""
+        req.context["result"] = req.context["json"]
+
+    def on_get(self, req, resp):
+        """Return a result that cannot be dumped"""
+        req.context["result"] = {"name": "x", "age": "old"}
+
+
+class TestMiddleware:
+    """Test the middleware raising structured errors"""
+
+    @pytest.fixture
+    def codec(self):
+        """A codec counting its encodes"""
+        return CountingCodec()
+
+    def make_client(self, **kwargs):
+        """Create a client for an app with the middleware"""
+        app = API(middleware=[Marshmallow(**kwargs)])
+        app.add_route("/people", People())
+        return testing.TestClient(app)
+
+    def test_load_errors(self, codec):
+        """Load errors are encoded once, with the configured codec"""
+        client = self.make_client(
+            json_module=codec, error_formatter=format_errors
+        )
+        resp = client.simulate_post("/people", body="{}")
+
+        assert resp.status_code == 422
+        assert resp.json == {
+            "title": "422 Unprocessable Entity",
+            "errors": MESSAGES,
+        }
+        assert codec.dumps_calls == 1
+
+    def test_dump_errors(self):
+        """Dump errors are structured too"""
+        client = self.make_client(error_formatter=format_errors)
+        resp = client.simulate_get("/people")
+        assert resp.status_code == 500
+        assert resp.json["title"] == "Could not serialize response"
+        assert "error" in resp.json["errors"]
+
+    def test_custom_formatter(self):
+        """Any callable may shape the error body"""
+        client = self.make_client(
+            error_formatter=lambda error, messages: {
+                "status": int(error.status[:3]),
+                "fields": sorted(messages),
+            }
+        )
+        resp = client.simulate_post("/people", body="{}")
+        assert resp.json == {"status": 422, "fields": ["name"]}
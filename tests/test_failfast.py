@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.failfast
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, ValidationError, fields, validates_schema
+
+# Local
+from falcon_marshmallow import LoadOptions, Marshmallow
+from falcon_marshmallow.failfast import (
+    TRUNCATED_KEY,
+    count_errors,
+    load_fail_fast,
+    truncate_errors,
+)
+
+
+def count(value):
+    """Count the valid ids"""
+    Counted.calls += 1
+
+
+class Counted(Schema):
+    """A schema counting the records it validates"""
+
+    calls = 0
+
+    id = fields.Integer(required=True, validate=count)
+
+
+class WholeList(Schema):
+    """A schema validating the whole list at once"""
+
+    id = fields.Integer(required=True)
+
+    @validates_schema(pass_many=True)
+    def check(self, data, many, **kwargs):
+        """Nothing to check"""
+
+
+class Batch(Schema):
+    """A schema nesting lists of records"""
+
+    items = fields.List(fields.Nested(Counted))
+    records = fields.Nested(Counted, many=True)
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    """Reset the count of validated records"""
+    Counted.calls = 0
+
+
+def bad_records(count):
+    """Return records that are all invalid"""
+    return [{"id": "nope"}] * count
+
+
+class TestTruncateErrors:
+    """Test truncating error messages"""
+
+    def test_truncate(self):
+        """At most max_errors entries are kept, in order"""
+        messages = {i: ["bad"] for i in range(5)}
+        assert truncate_errors(messages, 2) == {
+            0: ["bad"],
+            1: ["bad"],
+            TRUNCATED_KEY: True,
+        }
+
+    def test_nested(self):
+        """Errors nested in lists and schemas are counted and dropped"""
+        with pytest.raises(ValidationError) as exc_info:
+            Batch().load({"items": bad_records(50), "records": bad_records(50)})
+        messages = exc_info.value.messages
+        assert count_errors(messages) == 100
+
+        truncated = truncate_errors(messages, 3)
+        assert truncated == {
+            "items": {i: {"id": ["Not a valid integer."]} for i in range(3)},
+            TRUNCATED_KEY: True,
+        }
+        assert count_errors(truncated) == 3
+        truncated = truncate_errors(messages, 52)
+        assert list(truncated) == ["items", "records", TRUNCATED_KEY]
+        assert list(truncated["records"]) == [0, 1]
+
+    def test_unchanged(self):
+        """Short dicts and other messages are returned as they are"""
+        messages = {0: ["bad"]}
+        assert truncate_errors(messages, 1) is messages
+        assert truncate_errors(["bad"], 0) == ["bad"]
+
+
+class TestLoadFailFast:
+    """Test loading lists in chunks"""
+
+    def test_valid(self):
+        """Valid lists load as they would with the schema"""
+        records = [{"id": i} for i in range(25)]
+        sch = Counted(many=True)
+        assert load_fail_fast(sch, records, 1, chunk_size=10) == records
+
+    def test_stops_early(self):
+        """Loading stops after the chunk reaching the error limit"""
+        records = [{"id": 1}] * 5 + bad_records(100) + [{"id": 1}] * 100
+        with pytest.raises(ValidationError) as exc_info:
+            load_fail_fast(Counted(many=True), records, 3, chunk_size=10)
+
+        messages = exc_info.value.messages
+        assert list(messages) == [5, 6, 7, TRUNCATED_KEY]
+        assert "id" in messages[5]
+        assert Counted.calls == 5
+        # As for Marshmallow, with the (empty) data of invalid records
+        valid_data = exc_info.value.valid_data
+        assert isinstance(valid_data, list) and len(valid_data) == 10
+
+    def test_offsets(self):
+        """Errors are keyed by their index in the whole list"""
+        records = [{"id": 1}] * 25 + bad_records(1)
+        with pytest.raises(ValidationError) as exc_info:
+            load_fail_fast(Counted(many=True), records, 3, chunk_size=10)
+        assert list(exc_info.value.messages) == [25]
+
+    def test_whole_list_hooks(self):
+        """Schemas needing the whole list load it at once"""
+        with pytest.raises(ValidationError) as exc_info:
+            load_fail_fast(
+                WholeList(many=True), bad_records(30), 3, chunk_size=10
+            )
+        assert list(exc_info.value.messages) == [0, 1, 2, TRUNCATED_KEY]
+
+
+class TestMiddleware:
+    """Test the middleware's max_errors option"""
+
+    class Resource:
+        """A resource loading lists of records"""
+
+        schema = Counted(many=True)  # type: Schema
+
+        def on_post(self, req, resp):
+            """Echo the loaded records"""
+            req.context["result"] = req.context["json"]
+
+    @pytest.mark.parametrize("many", [True, False])
+    def test_errors_capped(self, many):
+        """Error payloads list at most max_errors errors"""
+        resource = self.Resource()
+        if not many:
+            resource.schema = Counted()
+        app = API(
+            middleware=[Marshmallow(load_options=LoadOptions(max_errors=2))]
+        )
+        app.add_route("/", resource)
+        client = testing.TestClient(app)
+
+        body = bad_records(5000) if many else {"id": "x", "a": 1, "b": 2}
+        resp = client.simulate_post("/", body=json.dumps(body))
+
+        assert resp.status_code == 422
+        messages = json.loads(resp.json["description"])
+        assert len(messages) == 3
+        assert messages[TRUNCATED_KEY] is True
+
+    def test_nested_errors_capped(self):
+        """Errors nested in the records count towards max_errors"""
+        resource = self.Resource()
+        resource.schema = Batch()
+        app = API(
+            middleware=[Marshmallow(load_options=LoadOptions(max_errors=2))]
+        )
+        app.add_route("/", resource)
+        client = testing.TestClient(app)
+
+        body = {"items": bad_records(5000)}
+        resp = client.simulate_post("/", body=json.dumps(body))
+
+        assert resp.status_code == 422
+        messages = json.loads(resp.json["description"])
+        assert list(messages["items"]) == ["0", "1"]
+        assert messages[TRUNCATED_KEY] is True
@@ -8,6 +8,10 @@ from __future__ import (
     print_function,
     unicode_literals,
 )
+import sys
+
+# Third party
+import pytest
 
 # Local
 import falcon_marshmallow
@@ -43,3 +47,41 @@ class TestPublicInterface:
         )
         for attr in expected_attrs:
             assert hasattr(falcon_marshmallow, attr)
+
+    def test_lazy_attributes(self):
+        """Public names not yet imported are listed and resolvable"""
+        for name in ("Marshmallow", "LoadShedder", "DumpAccelerator"):
+            assert name in dir(falcon_marshmallow)
+            assert getattr(falcon_marshmallow, name).__name__ == name
+        with pytest.raises(AttributeError):
+            getattr(falcon_marshmallow, "NotAThing")
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="lazy imports require Python 3.7"
+)
+class TestImportTime:
+    """Keep importing the package cheap for short-lived processes"""
+
+    def test_package_import_is_lazy(self):
+        """Importing the package loads none of its dependencies"""
+        from benchmarks.importtime import measure
+
+        _, modules = measure("import falcon_marshmallow")
+        assert "falcon_marshmallow" in modules
+        for heavy in ("falcon", "marshmallow", "simplejson", "typing"):
+            assert heavy not in modules
+        assert "falcon_marshmallow.middleware" not in modules
+
+    def test_json_backend_is_deferred(self):
+        """The default JSON backend is imported by the middleware's use"""
+        from benchmarks.importtime import measure
+
+        _, modules = measure("from falcon_marshmallow import Marshmallow")
+        assert "falcon_marshmallow.middleware" in modules
+        assert "simplejson" not in modules
+
+        _, modules = measure(
+            "from falcon_marshmallow import Marshmallow; Marshmallow()"
+        )
+        assert "simplejson" in modules
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.idempotency
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import os
+import sqlite3
+import time
+
+from typing import Any, List
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, HTTPServiceUnavailable, testing
+from marshmallow import fields, Schema
+
+# Local
+from falcon_marshmallow import idempotency as idem
+from falcon_marshmallow import middleware as m
+
+
+class Thing(Schema):
+    """A thing schema"""
+
+    id = fields.Integer()
+    name = fields.String(required=True)
+
+
+def make_client(store):
+    """Create a test client and a list recording handled bodies"""
+    handled = []
+
+    class ThingCollection:
+        """Things"""
+
+        schema = Thing()
+
+        def on_post(self, req, resp):
+            """Create a thing"""
+            handled.append(req.context["json"])
+            req.context["result"] = dict(req.context["json"], id=len(handled))
+            resp.location = "/things/%d" % len(handled)
+            resp.set_header("X-Handled", str(len(handled)))
+
+    app = API(middleware=[idem.IdempotencyCache(store=store), m.Marshmallow()])
+    app.add_route("/things", ThingCollection())
+    return testing.TestClient(app), handled
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmpdir):
+    """Return each kind of store"""
+    if request.param == "memory":
+        return idem.MemoryStore()
+    return idem.SQLiteStore(os.path.join(str(tmpdir), "idem.db"))
+
+
+class TestIdempotencyCache:
+    """Test the idempotency middleware"""
+
+    body = json.dumps({"name": "foo"})
+
+    def post(self, client, key=None, body=None):
+        """Post a thing, optionally with an idempotency key"""
+        headers = {str("Idempotency-Key"): str(key)} if key else {}
+        return client.simulate_post(
+            "/things", body=body or self.body, headers=headers
+        )
+
+    def test_replays_response(self, store):
+        """A retried request is answered without calling the handler"""
+        client, handled = make_client(store)
+
+        first = self.post(client, key="abc")
+        second = self.post(client, key="abc")
+
+        assert len(handled) == 1
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert second.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert first.headers["location"].endswith("/things/1")
+        assert second.headers["location"] == first.headers["location"]
+        # Only the configured headers are replayed
+        assert "x-handled" not in second.headers
+
+    def test_no_key_is_not_cached(self, store):
+        """Requests without the header are always handled"""
+        client, handled = make_client(store)
+
+        self.post(client)
+        self.post(client)
+
+        assert len(handled) == 2
+
+    @pytest.mark.parametrize(
+        "key, body", [("other", None), ("abc", json.dumps({"name": "bar"}))]
+    )
+    def test_different_key_or_body_is_handled(self, store, key, body):
+        """Only the same key with the same body is replayed"""
+        client, handled = make_client(store)
+
+        self.post(client, key="abc")
+        resp = self.post(client, key=key, body=body)
+
+        assert len(handled) == 2
+        assert resp.json["id"] == 2
+
+    def test_failures_are_not_stored(self, store):
+        """Failed requests are handled again when retried"""
+        attempts = []
+
+        class Flaky:
+            """Fail the first request only"""
+
+            def on_post(self, req, resp):
+                """Create a thing, eventually"""
+                attempts.append(req.context["json"])
+                if len(attempts) == 1:
+                    raise HTTPServiceUnavailable()
+                req.context["result"] = req.context["json"]
+
+        app = API(
+            middleware=[idem.IdempotencyCache(store=store), m.Marshmallow()]
+        )
+        app.add_route("/things", Flaky())
+        client = testing.TestClient(app)
+
+        assert self.post(client, key="abc").status_code == 503
+        assert self.post(client, key="abc").status_code == 200
+        assert self.post(client, key="abc").status_code == 200
+        assert len(attempts) == 2
+
+    def test_concurrent_requests_conflict(self):
+        """A key is not handled again while its first request is handled"""
+        nested = []  # type: List[Any]
+        post = self.post
+
+        class Retrying:
+            """Retry the request while handling it"""
+
+            def on_post(self, req, resp):
+                """Create a thing, retrying once"""
+                if not nested:
+                    nested.append(post(client, key="abc"))
+                req.context["result"] = req.context["json"]
+
+        app = API(middleware=[idem.IdempotencyCache(), m.Marshmallow()])
+        app.add_route("/things", Retrying())
+        client = testing.TestClient(app)
+
+        assert self.post(client, key="abc").status_code == 200
+        assert nested[0].status_code == 409
+        # Once handled, the response is replayed
+        resp = self.post(client, key="abc")
+        assert resp.headers["idempotent-replayed"] == "true"
+
+    def test_scope_isolates_clients(self):
+        """Keys are not replayed across scopes"""
+        store = idem.MemoryStore()
+        mw = idem.IdempotencyCache(
+            store=store, scope=lambda req: req.get_header("X-User")
+        )
+        app = API(middleware=[mw, m.Marshmallow()])
+        handled = []
+
+        class Echo:
+            """Echo the request body"""
+
+            def on_post(self, req, resp):
+                """Echo"""
+                handled.append(req.context["json"])
+                req.context["result"] = req.context["json"]
+
+        app.add_route("/echo", Echo())
+        client = testing.TestClient(app)
+        for user in ("alice", "bob", "alice"):
+            client.simulate_post(
+                "/echo",
+                body=self.body,
+                headers={
+                    str("Idempotency-Key"): str("abc"),
+                    str("X-User"): str(user),
+                },
+            )
+
+        assert len(handled) == 2
+
+
+class TestStores:
+    """Test the response stores"""
+
+    def test_memory_store_evicts_least_recent(self):
+        """The memory store is bounded"""
+        store = idem.MemoryStore(max_entries=2)
+        response = idem.StoredResponse("200 OK", "application/json", b"{}", ())
+        store.set("a", response)
+        store.set("b", response)
+        store.get("a")
+        store.set("c", response)
+
+        assert store.get("a") == response
+        assert store.get("b") is None
+        assert store.get("c") == response
+
+    def test_sqlite_store_is_shared(self, tmpdir):
+        """Separate SQLite stores on one file see each other's responses"""
+        path = os.path.join(str(tmpdir), "idem.db")
+        response = idem.StoredResponse(
+            "201 Created", None, b'{"id": 1}', (("Location", "/things/1"),)
+        )
+
+        idem.SQLiteStore(path).set("a", response)
+
+        assert idem.SQLiteStore(path).get("a") == response
+
+    def test_sqlite_store_adds_headers(self, tmpdir):
+        """Databases created before headers were stored are upgraded"""
+        path = os.path.join(str(tmpdir), "idem.db")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE idempotent_responses ("
+            "key TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "content_type TEXT, body BLOB NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO idempotent_responses VALUES (?, ?, ?, ?, ?)",
+            ("a", "200 OK", None, b"{}", time.time()),
+        )
+        conn.commit()
+        conn.close()
+
+        store = idem.SQLiteStore(path)
+
+        assert store.get("a") == idem.StoredResponse("200 OK", None, b"{}", ())
+
+    def test_sqlite_store_expires(self, tmpdir):
+        """Responses older than the TTL are not returned"""
+        store = idem.SQLiteStore(os.path.join(str(tmpdir), "idem.db"), ttl=-1)
+        store.set("a", idem.StoredResponse("200 OK", None, b"{}", ()))
+
+        assert store.get("a") is None
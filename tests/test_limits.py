@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.limits
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+from typing import Optional
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, HTTPPayloadTooLarge, HTTPUnprocessableEntity, testing
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow import JSONLimits, LoadOptions, Marshmallow
+
+LIMITS = JSONLimits(
+    max_depth=3,
+    max_array_length=4,
+    max_object_keys=2,
+    max_string_length=10,
+    max_tokens=40,
+)
+
+
+class TestJSONLimits:
+    """Test checking documents against the limits"""
+
+    @pytest.mark.parametrize(
+        "doc",
+        [
+            "",
+            "{}",
+            "[1, 2, 3, 4]",
+            '{"a": [[1, 2], [3]], "b": "0123456789"}',
+            # Brackets, commas and quotes inside strings are not counted
+            '{"a": "[[[[,,,,", "b": "\\"{{{{\\\\"}',
+            '  [ "a" , "b" , {"c": null} ]  ',
+            # Characters are counted, not the bytes encoding them
+            '["\u00e9\u00e9\u00e9\u00e9\u00e9\u00e9\u00e9\u00e9\u00e9\u00e9"]',
+        ],
+    )
+    @pytest.mark.parametrize("as_bytes", [False, True])
+    def test_within_limits(self, doc, as_bytes):
+        """Documents within every limit pass, as bytes or text"""
+        LIMITS.check(doc.encode("utf-8") if as_bytes else doc)
+
+    @pytest.mark.parametrize(
+        "doc, reason",
+        [
+            ("[[[[1]]]]", "nested deeper than 3 levels"),
+            ('{"a": {"b": [{}]}}', "nested deeper than 3 levels"),
+            ("[1, 2, 3, 4, 5]", "array of more than 4 items"),
+            ('[{"a": 1, "b": 2, "c": 3}]', "object of more than 2 keys"),
+            ('["01234567890"]', "string longer than 10 characters"),
+        ],
+    )
+    @pytest.mark.parametrize("as_bytes", [False, True])
+    def test_structure_exceeded(self, doc, reason, as_bytes):
+        """Structural limits are reported as unprocessable entities"""
+        with pytest.raises(HTTPUnprocessableEntity) as exc_info:
+            LIMITS.check(doc.encode("utf-8") if as_bytes else doc)
+        assert reason in exc_info.value.description
+
+    def test_tokens_exceeded(self):
+        """Too many tokens in total is reported as too large"""
+        doc = json.dumps([[["a", "b", "c", "d"]] * 4] * 4)
+        with pytest.raises(HTTPPayloadTooLarge):
+            LIMITS.check(doc)
+
+    @pytest.mark.parametrize("as_bytes", [False, True])
+    def test_deeply_nested(self, as_bytes):
+        """Containers nested deeper than a few levels are checked too"""
+        limits = JSONLimits(max_depth=25, max_array_length=3)
+        for depth, items, reason in (
+            (20, 3, None),
+            (20, 4, "array of more than 3 items"),
+            (30, 3, "nested deeper than 25 levels"),
+        ):
+            doc = "[1, " * depth + "[%s]" % ", ".join("1" * items)
+            doc += "]" * depth
+            body = doc.encode("utf-8") if as_bytes else doc
+            if reason is None:
+                limits.check(body)
+                continue
+            with pytest.raises(HTTPUnprocessableEntity) as exc_info:
+                limits.check(body)
+            assert reason in exc_info.value.description
+
+    def test_opened_in_a_row(self):
+        """Brackets opened in a row are rejected as too deep at once"""
+        with pytest.raises(HTTPUnprocessableEntity) as exc_info:
+            JSONLimits(max_depth=100).check("[" * 100000 + "]" * 100000)
+        assert "nested deeper than 100 levels" in exc_info.value.description
+
+    def test_unlimited(self):
+        """Without limits, anything goes"""
+        JSONLimits().check(json.dumps([[[["x" * 100] * 100]]]))
+
+    def test_malformed(self):
+        """Malformed documents are left to the parser"""
+        LIMITS.check("]]}, [")
+
+
+class Thing(Schema):
+    """A thing schema"""
+
+    tags = fields.List(fields.String())
+
+
+class Things:
+    """A resource with a schema"""
+
+    schema = Thing()
+
+    def on_post(self, req, resp):
+        """Echo the loaded body"""
+        req.context["result"] = req.context["json"]
+
+
+class Raw:
+    """A resource without a schema, and with its own limits"""
+
+    json_limits = JSONLimits(max_array_length=10)  # type: Optional[JSONLimits]
+
+    def on_post(self, req, resp):
+        """Echo the parsed body"""
+        req.context["result"] = req.context["json"]
+
+
+class Unlimited(Raw):
+    """A resource disabling the limits"""
+
+    json_limits = None
+
+
+class TestMiddleware:
+    """Test the middleware applying the limits"""
+
+    @pytest.fixture
+    def client(self):
+        """A client for an app with limits"""
+        app = API(
+            middleware=[
+                Marshmallow(load_options=LoadOptions(json_limits=LIMITS))
+            ]
+        )
+        app.add_route("/things", Things())
+        app.add_route("/raw", Raw())
+        app.add_route("/unlimited", Unlimited())
+        return testing.TestClient(app)
+
+    def test_schema(self, client):
+        """Bodies loaded by a schema are checked"""
+        body = {"tags": ["a", "b"]}
+        resp = client.simulate_post("/things", body=json.dumps(body))
+        assert resp.status_code == 200
+        assert json.loads(resp.text) == body
+
+        body = {"tags": list("abcde")}
+        resp = client.simulate_post("/things", body=json.dumps(body))
+        assert resp.status_code == 422
+        assert "array of more than 4 items" in resp.json["description"]
+
+        nested = [[["a", "b", "c", "d"]] * 4] * 4
+        resp = client.simulate_post("/things", body=json.dumps(nested))
+        assert resp.status_code == 413
+
+    def test_resource_override(self, client):
+        """Resources may replace or disable the limits"""
+        body = json.dumps(list(range(8)))
+        assert client.simulate_post("/raw", body=body).status_code == 200
+        body = json.dumps(list(range(12)))
+        assert client.simulate_post("/raw", body=body).status_code == 422
+        assert client.simulate_post("/unlimited", body=body).status_code == 200
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.loadcache
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import copy
+import pickle
+
+from typing import Any, Dict
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, fields
+
+# Local
+from falcon_marshmallow import LoadCache, LoadOptions, Marshmallow
+from falcon_marshmallow.loadcache import NOT_CACHED, FrozenDict, freeze
+
+
+class Query(Schema):
+    """A search query schema"""
+
+    q = fields.String(required=True)
+    tags = fields.List(fields.String())
+
+
+class TestFreeze:
+    """Test freezing loaded data"""
+
+    def test_freeze(self):
+        """Containers are frozen recursively"""
+        frozen = freeze({"a": [1, {"b": {2}}], "c": "d"})
+        assert frozen == {"a": (1, {"b": frozenset([2])}), "c": "d"}
+        assert isinstance(frozen, dict)
+        frozen = freeze({"a": [1, {"b": 2}]})
+        assert json.loads(json.dumps(frozen)) == {"a": [1, {"b": 2}]}
+
+    @pytest.mark.parametrize(
+        "mutate",
+        [
+            lambda d: d.__setitem__("x", 1),
+            lambda d: d.__delitem__("c"),
+            lambda d: d.update(x=1),
+            lambda d: d.pop("c"),
+            lambda d: d.setdefault("x", 1),
+            lambda d: d.clear(),
+            lambda d: d.__ior__({"x": 1}),
+            lambda d: d["a"][1].popitem(),
+        ],
+    )
+    def test_immutable(self, mutate):
+        """Frozen dicts cannot be modified"""
+        frozen = freeze({"a": [1, {"b": 2}], "c": "d"})
+        with pytest.raises((TypeError, AttributeError)):
+            mutate(frozen)
+
+    def test_copies_are_mutable(self):
+        """Copies of frozen dicts are plain dicts"""
+        frozen = freeze({"a": {"b": 1}})
+        for copied in (
+            copy.copy(frozen),
+            copy.deepcopy(frozen),
+            pickle.loads(pickle.dumps(frozen)),
+        ):
+            assert type(copied) is dict
+            copied["x"] = 1
+        assert type(copy.deepcopy(frozen)["a"]) is dict
+        assert type(copy.copy(frozen)["a"]) is FrozenDict
+
+
+class TestLoadCache:
+    """Test caching loaded data"""
+
+    def test_keys(self):
+        """Keys depend on the schema and body, and bound the body size"""
+        cache = LoadCache(max_body_size=10)
+        sch, other = Query(), Query()
+        assert cache.key(sch, b"{}") == cache.key(sch, "{}")
+        assert cache.key(sch, b"{}") != cache.key(other, b"{}")
+        assert cache.key(sch, b"{}") != cache.key(sch, b"[]")
+        assert cache.key(sch, b"") is None
+        assert cache.key(sch, b"[" + b" " * 10 + b"]") is None
+
+    def test_copies(self):
+        """Without freezing, hits return copies of what was loaded"""
+        cache = LoadCache()
+        key = cache.key(Query(), b"{}")
+        assert cache.get(key) is NOT_CACHED
+
+        data = {"q": "x", "tags": ["a"]}
+        assert cache.put(key, data) is data
+        data["tags"].append("b")
+
+        hit = cache.get(key)
+        assert hit == {"q": "x", "tags": ["a"]}
+        hit["tags"].append("c")
+        assert cache.get(key) == {"q": "x", "tags": ["a"]}
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_frozen(self):
+        """When freezing, misses and hits return the same frozen data"""
+        cache = LoadCache(freeze=True)
+        key = cache.key(Query(), b"{}")
+        frozen = cache.put(key, {"q": "x", "tags": ["a"]})
+        assert frozen == {"q": "x", "tags": ("a",)}
+        assert cache.get(key) is frozen
+
+    def test_uncacheable(self):
+        """Data for a None key is passed through"""
+        cache = LoadCache(freeze=True)
+        data = {"tags": []}  # type: Dict[str, Any]
+        assert cache.put(None, data) is data
+        assert cache.get(None) is NOT_CACHED
+
+    def test_lru(self):
+        """The least recently used bodies are evicted"""
+        cache = LoadCache(max_entries=2)
+        sch = Query()
+        keys = [cache.key(sch, body) for body in (b"1", b"2", b"3")]
+        for key in keys:
+            cache.put(key, {})
+        assert cache.get(keys[0]) is NOT_CACHED
+        assert cache.get(keys[2]) == {}
+
+
+class Search:
+    """A search resource"""
+
+    post_request_schema = Query()
+
+    def __init__(self):
+        """Record what handlers received"""
+        self.received = []
+
+    def on_post(self, req, resp):
+        """Record the query, and modify it"""
+        query = req.context["json"]
+        self.received.append(dict(query))
+        query["q"] = "changed"
+        req.context["result"] = {"ok": True}
+
+
+class Uncached(Search):
+    """A resource disabling the cache"""
+
+    load_cache = None
+
+
+class TestMiddleware:
+    """Test the middleware using the cache"""
+
+    def test_hits(self):
+        """Repeated bodies are neither parsed nor loaded again"""
+        cache = LoadCache()
+        search, uncached = Search(), Uncached()
+        app = API(
+            middleware=[Marshmallow(load_options=LoadOptions(load_cache=cache))]
+        )
+        app.add_route("/search", search)
+        app.add_route("/uncached", uncached)
+        client = testing.TestClient(app)
+        body = json.dumps({"q": "foo", "tags": ["a"]})
+
+        for _ in range(3):
+            assert client.simulate_post("/search", body=body).status_code == 200
+            client.simulate_post("/uncached", body=body)
+
+        assert search.received == [{"q": "foo", "tags": ["a"]}] * 3
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert len(uncached.received) == 3
+
+        # Invalid bodies are not cached
+        for _ in range(2):
+            resp = client.simulate_post("/search", body="{}")
+            assert resp.status_code == 422
+        assert cache.hits == 2
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the load-test harness in benchmarks.loadtest
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import sys
+
+from typing import Any
+
+# Third party
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 4), reason="the harness requires Python 3"
+)
+
+
+class TestLatencyHistogram:
+    """Test the HDR-style latency histogram"""
+
+    @pytest.fixture()
+    def histogram(self):
+        """Return an empty histogram"""
+        from benchmarks.loadtest import LatencyHistogram
+
+        return LatencyHistogram()
+
+    def test_small_values_are_exact(self, histogram):
+        """Values below the sub-bucket count are recorded exactly"""
+        for value in range(100):
+            histogram.record(value)
+        assert histogram.value_at_percentile(50) == 49
+        assert histogram.value_at_percentile(100) == 99
+        assert histogram.min == 0
+        assert histogram.max == 99
+
+    @pytest.mark.parametrize("value", [128, 1000, 12345, 999999, 10 ** 9])
+    def test_relative_error_is_bounded(self, histogram, value):
+        # type: (Any, int) -> None
+        """Large values are reported within the configured precision"""
+        histogram.record(value)
+        histogram.record(value + 1)
+        reported = histogram.value_at_percentile(50)
+        assert value <= reported
+        assert (reported - value) / value < 2.0 ** -6
+
+    def test_merge_and_distribution(self, histogram):
+        """Merged histograms contribute to a monotonic distribution"""
+        from benchmarks.loadtest import LatencyHistogram
+
+        other = LatencyHistogram()
+        for value in range(1, 1001):
+            (histogram if value % 2 else other).record(value * 10)
+        histogram.merge(other)
+
+        assert histogram.total == 1000
+        assert histogram.max == 10000
+        rows = histogram.distribution()
+        values = [value for _, value, _ in rows]
+        assert values == sorted(values)
+        assert rows[-1] == (100.0, 10000, 1000)
@@ -15,15 +15,21 @@ try:
     from unittest import mock
 except ImportError:
     import mock  # type: ignore
+import gzip
+import io
+import json
+import zlib
 
-from typing import Optional
+from typing import Any, Dict, Optional
 
 # Third party
 import pytest
-from falcon import errors
+import simplejson
+from falcon import API, errors, testing
 from marshmallow import fields, Schema
 
 # Local
+from falcon_marshmallow import LoadOptions, QueryOptions
 from falcon_marshmallow import middleware as mid
 from falcon_marshmallow.middleware import MARSHMALLOW_2
 
@@ -271,7 +277,7 @@ class TestMarshmallow:
         :param content_type: the value of the request's Content-Type header (req.content_type)
         :param schema: whether a schema should be returned (TestSchema)
         :param schema_err: whether a schema error is expected
-        :param bad_sch: pass an uninstantiated or non-schema object
+        :param bad_sch: pass a non-schema object
         :param force_json: whether to try json if no schema is found
         :param json_err: whether a JSON error is expected
         :param exp_ret: expected return if no errors are raised
@@ -281,7 +287,7 @@ class TestMarshmallow:
         mw._force_json = force_json
         if schema:
             if bad_sch:
-                setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema)
+                setattr(mw, "_get_schema", lambda *_, **__: object())
             else:
                 setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
         else:
@@ -386,7 +392,7 @@ class TestMarshmallow:
                 '{"bar": "test"}',
             ),
             (  # 4: Unserializable response, no schema, force json
-                set("foo"),
+                object(),
                 False,
                 False,
                 False,
@@ -422,7 +428,7 @@ class TestMarshmallow:
         :param res: the value to put in the result key on req.context
         :param schema: whether a schema should be available
         :param sch_err: whether an error is expected dumping the data
-        :param bad_sch: pass an uninstantiated or non-schema object
+        :param bad_sch: pass a non-schema object
         :param force_json: whether force_json is true
         :param json_err: whether an error is expected dumping the data
         :param exp_ret: expected return if no errors are raised
@@ -432,7 +438,7 @@ class TestMarshmallow:
         mw._force_json = force_json
         if schema:
             if bad_sch:
-                setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema)
+                setattr(mw, "_get_schema", lambda *_, **__: object())
             else:
                 setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
         else:
@@ -466,6 +472,61 @@ class TestMarshmallow:
         else:
             assert resp.body == exp_ret
 
+    def test_process_response_encodes_with_json_module(self):
+        """Schema-dumped data is encoded with the configured codec"""
+        codec = mock.Mock(wraps=simplejson)
+        mw = mid.Marshmallow(json_module=codec)
+        setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
+        req = mock.Mock(method="GET")
+        req.context = {mw._resp_key: {"bar": "test"}}
+        resp = mock.Mock()
+
+        mw.process_response(req, resp, "foo", "foo")  # type: ignore
+
+        codec.dumps.assert_called_once_with({"foo": "test"})
+        assert resp.body == '{"foo": "test"}'
+
+    def test_process_response_unencodable(self):
+        """Data the codec rejects with a ValueError is a server error"""
+        mw = mid.Marshmallow()
+        setattr(mw, "_get_schema", lambda *_, **__: None)
+        circular = {}  # type: Dict[str, Any]
+        circular["self"] = circular
+        req = mock.Mock(method="GET")
+        req.context = {mw._resp_key: circular}
+        resp = mock.Mock()
+
+        with pytest.raises(errors.HTTPInternalServerError):
+            mw.process_response(req, resp, "foo", True)
+
+    def test_process_response_respects_schema_render_module(self):
+        """A render module set on a schema's Meta takes precedence"""
+        codec = mock.Mock(wraps=simplejson)
+        renderer = mock.Mock()
+        renderer.dumps.return_value = "rendered"
+
+        class RenderSchema(self.FooSchema):  # type: ignore
+            """Schema with its own render module"""
+
+            class Meta:
+                """Schema options"""
+
+                if MARSHMALLOW_2:
+                    json_module = renderer
+                else:
+                    render_module = renderer
+
+        mw = mid.Marshmallow(json_module=codec)
+        setattr(mw, "_get_schema", lambda *_, **__: RenderSchema())
+        req = mock.Mock(method="GET")
+        req.context = {mw._resp_key: {"bar": "test"}}
+        resp = mock.Mock()
+
+        mw.process_response(req, resp, "foo", "foo")  # type: ignore
+
+        codec.dumps.assert_not_called()
+        assert resp.body == "rendered"
+
 
 class TestJSONEnforcer:
     """Test enforcement of JSON requests"""
@@ -555,3 +616,310 @@ class TestEmptyRequestDropper:
         else:
             # noinspection PyTypeChecker
             self.dropper.process_request(req, "foo")
+
+
+class TestGetParsedContent:
+    """Tests for sharing the parsed request body"""
+
+    @staticmethod
+    def make_req(body):
+        # type: (str) -> mock.Mock
+        """Return a mock request with a body"""
+        req = mock.Mock(content_length=len(body), context={})
+        req.bounded_stream.read.return_value = body
+        return req
+
+    def test_parsed_once(self):
+        # type: () -> None
+        """Test that the body is parsed once, and the result reused"""
+        req = self.make_req('{"a": 1}')
+        loads = mock.Mock(side_effect=simplejson.loads)
+
+        first = mid.get_parsed_content(req, loads)
+        assert first == {"a": 1}
+        assert mid.get_parsed_content(req, loads) is first
+        assert mid.get_parsed_content(req) is first
+        assert loads.call_count == 1
+        assert req.bounded_stream.read.call_count == 1
+
+    def test_error_stashed(self):
+        # type: () -> None
+        """Test that a parse error is raised again without parsing"""
+        req = self.make_req("{")
+        loads = mock.Mock(side_effect=simplejson.loads)
+
+        for _ in range(2):
+            with pytest.raises(simplejson.JSONDecodeError):
+                mid.get_parsed_content(req, loads)
+        assert loads.call_count == 1
+
+    @pytest.mark.parametrize("body", ['{"name": "x"}', "{"])
+    def test_shared_with_middleware(self, body):
+        # type: (str) -> None
+        """Test that the middleware loads the document parsed earlier"""
+        req = self.make_req(body)
+        req.content_type = "application/json"
+        req.method = "POST"
+        try:
+            mid.get_parsed_content(req)
+        except ValueError:
+            pass
+
+        class TestSchema(Schema):
+            name = fields.String()
+
+        class TestResource:
+            schema = TestSchema()
+
+        json_module = mock.Mock(wraps=simplejson)
+        json_module.JSONDecodeError = simplejson.JSONDecodeError
+        middleware = mid.Marshmallow(json_module=json_module)
+
+        if body == "{":
+            with pytest.raises(errors.HTTPBadRequest):
+                middleware.process_resource(req, "foo", TestResource(), {})
+        else:
+            middleware.process_resource(req, "foo", TestResource(), {})
+            assert req.context["json"] == {"name": "x"}
+        json_module.loads.assert_not_called()
+
+    def test_error_from_another_parser(self):
+        # type: () -> None
+        """Test that errors of a body parsed with another module are 400s"""
+        req = self.make_req("{")
+        req.content_type = "application/json"
+        req.method = "POST"
+        with pytest.raises(json.JSONDecodeError):
+            mid.get_parsed_content(req, json.loads)
+
+        class TestSchema(Schema):
+            name = fields.String()
+
+        class TestResource:
+            schema = TestSchema()
+
+        with pytest.raises(errors.HTTPBadRequest):
+            mid.Marshmallow().process_resource(req, "foo", TestResource(), {})
+
+
+class TestDecompression:
+    """Tests for reading compressed request bodies"""
+
+    body = simplejson.dumps([{"name": "x" * 20, "id": i} for i in range(500)])
+
+    @staticmethod
+    def make_req(data, encoding):
+        # type: (bytes, Optional[str]) -> mock.Mock
+        """Return a mock request streaming compressed data"""
+        req = mock.Mock(content_length=len(data), context={})
+        req.get_header.return_value = encoding
+        req.bounded_stream = io.BytesIO(data)
+        return req
+
+    @staticmethod
+    def gzip(data):
+        # type: (bytes) -> bytes
+        """Compress data with gzip"""
+        out = io.BytesIO()
+        with gzip.GzipFile(fileobj=out, mode="wb") as compressed:
+            compressed.write(data)
+        return out.getvalue()
+
+    @pytest.mark.parametrize("encoding", ["gzip", "deflate", " GZip "])
+    def test_decompress(self, encoding):
+        # type: (str) -> None
+        """Test that gzip and deflate bodies are stashed decompressed"""
+        raw = self.body.encode("utf-8")
+        if "zip" in encoding.lower():
+            data = self.gzip(raw)
+        else:
+            data = zlib.compress(raw)
+        req = self.make_req(data, encoding)
+
+        assert mid.get_stashed_content(req) == raw
+        assert mid.get_parsed_content(req) == simplejson.loads(self.body)
+
+    @pytest.mark.parametrize("encoding", [None, "identity", "br"])
+    def test_other_encodings(self, encoding):
+        # type: (Optional[str]) -> None
+        """Test that other bodies are stashed as they are"""
+        req = self.make_req(b"abc", encoding)
+        assert mid.get_stashed_content(req) == b"abc"
+
+    def test_max_size(self):
+        # type: () -> None
+        """Test that bodies growing past the maximum size are rejected"""
+        data = zlib.compress(self.body.encode("utf-8"))
+        with pytest.raises(errors.HTTPPayloadTooLarge):
+            mid.get_stashed_content(
+                self.make_req(data, "deflate"), max_size=len(self.body) - 1
+            )
+        assert mid.get_stashed_content(
+            self.make_req(data, "deflate"), max_size=len(self.body)
+        )
+
+    def test_bomb(self):
+        # type: () -> None
+        """Test that bodies compressed too well are rejected early"""
+        data = zlib.compress(b" " * (20 * 1024 * 1024), 9)
+        stream = mock.Mock(wraps=io.BytesIO(data))
+        req = self.make_req(data, "deflate")
+        req.bounded_stream = stream
+
+        with pytest.raises(errors.HTTPPayloadTooLarge):
+            mid.get_stashed_content(req)
+        assert stream.read.call_count == 1
+
+    @pytest.mark.parametrize(
+        "data", [b"not compressed", zlib.compress(b"ab")[:-3]]
+    )
+    def test_corrupt(self, data):
+        # type: (bytes) -> None
+        """Test that corrupt or truncated bodies are bad requests"""
+        with pytest.raises(errors.HTTPBadRequest):
+            mid.get_stashed_content(self.make_req(data, "deflate"))
+
+    def test_middleware_limits(self):
+        # type: () -> None
+        """Test that the middleware applies its own limits"""
+
+        class TestResource:
+            schema = None
+
+        req = self.make_req(zlib.compress(b'{"a": 1}'), "deflate")
+        req.content_type = "application/json"
+        middleware = mid.Marshmallow(
+            load_options=LoadOptions(max_decompressed_size=4)
+        )
+        with pytest.raises(errors.HTTPPayloadTooLarge):
+            middleware.process_resource(req, "foo", TestResource(), {})
+
+
+class TestQuerySchema:
+    """Test loading query strings with query schemas"""
+
+    class FilterSchema(Schema):
+        page = fields.Integer(required=True)
+        tags = fields.List(fields.String())
+
+    class SortSchema(Schema):
+        sort = fields.String(required=True)
+
+    class Resource:
+        """A resource with query schemas"""
+
+        query_schema = None  # type: Any
+        get_query_schema = None  # type: Any
+        post_query_schema = None  # type: Any
+
+        def __init__(self):
+            # type: () -> None
+            """Record the loaded queries"""
+            self.queries = []  # type: list
+
+        def on_get(self, req, resp):
+            # type: (...) -> None
+            """Record the loaded query, and modify it"""
+            self.queries.append(dict(req.context["query"]))
+            req.context["query"]["page"] = 0
+            req.context["result"] = {"body": req.context.get("json")}
+
+        on_post = on_get
+
+    def client(self, resource, **kwargs):
+        # type: (object, **Any) -> testing.TestClient
+        """Return a client for an app serving a resource"""
+        app = API(middleware=[mid.Marshmallow(**kwargs)])
+        app.add_route("/", resource)
+        return testing.TestClient(app)
+
+    def test_load(self):
+        # type: () -> None
+        """Test that query strings are loaded into their own key"""
+        resource = self.Resource()
+        resource.query_schema = self.FilterSchema()
+        client = self.client(resource)
+
+        client.simulate_get("/", query_string="page=2&tags=a")
+        client.simulate_get("/", query_string="page=3&tags=a&tags=b")
+        resp = client.simulate_post(
+            "/", query_string="page=4", body=simplejson.dumps({"a": 1})
+        )
+
+        assert resource.queries == [
+            {"page": 2, "tags": ["a"]},
+            {"page": 3, "tags": ["a", "b"]},
+            {"page": 4},
+        ]
+        assert resp.json == {"body": {"a": 1}}
+
+    def test_method_specific(self):
+        # type: () -> None
+        """Test that method-specific query schemas take precedence"""
+        resource = self.Resource()
+        resource.query_schema = self.FilterSchema()
+        resource.post_query_schema = self.SortSchema
+        client = self.client(resource)
+
+        client.simulate_get("/", query_string="page=1")
+        client.simulate_post("/", query_string="sort=name")
+        assert resource.queries == [{"page": 1}, {"sort": "name"}]
+
+    def test_invalid(self):
+        # type: () -> None
+        """Test that invalid query strings are rejected"""
+        resource = self.Resource()
+        resource.get_query_schema = self.FilterSchema()
+        resp = self.client(resource).simulate_get("/", query_string="page=x")
+        assert resp.status_code == 422
+        assert simplejson.loads(resp.json["description"]) == {
+            "page": ["Not a valid integer."]
+        }
+        assert resource.queries == []
+
+    @pytest.mark.skipif(MARSHMALLOW_2, reason="load errors are returned")
+    @pytest.mark.parametrize(
+        "options, loads",
+        [
+            ({"query_options": QueryOptions(cache_size=256)}, 2),
+            ({"query_options": QueryOptions(cache_size=0)}, 4),
+            ({}, 4),
+        ],
+    )
+    def test_cache(self, options, loads):
+        # type: (Dict[str, QueryOptions], int) -> None
+        """Test that repeated query strings are loaded once, if enabled"""
+        resource = self.Resource()
+        resource.query_schema = sch = self.FilterSchema()
+        client = self.client(resource, **options)
+
+        with mock.patch.object(sch, "load", wraps=sch.load) as load:
+            for query_string in ("page=1", "page=2", "page=1", "page=2"):
+                client.simulate_get("/", query_string=query_string)
+
+        assert load.call_count == loads
+        assert resource.queries == [{"page": 1}, {"page": 2}] * 2
+
+    @pytest.mark.skipif(MARSHMALLOW_2, reason="data_key is Marshmallow 3")
+    def test_data_key(self):
+        # type: () -> None
+        """Test that single parameters are listed under their data key"""
+
+        class TaggedSchema(Schema):
+            labels = fields.List(fields.String(), data_key="tag")
+
+        resource = self.Resource()
+        resource.query_schema = TaggedSchema()
+        self.client(resource).simulate_get("/", query_string="tag=a")
+        assert resource.queries == [{"labels": ["a"]}]
+
+    def test_loaded_keys_marshmallow_2(self):
+        # type: () -> None
+        """Test that Marshmallow 2 fields are loaded from either key"""
+        sch = self.FilterSchema()
+        tags = sch.fields["tags"]
+        setattr(tags, "load_from", "tag")
+        setattr(sch.fields["page"], "dump_only", True)
+        with mock.patch.object(mid, "MARSHMALLOW_2", True):
+            keys = list(mid._loaded_keys(sch))
+        assert keys == [("tags", "tags", tags), ("tag", "tags", tags)]
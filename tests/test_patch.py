@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.patch
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import copy
+
+from typing import Any
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, fields, validate
+
+# Local
+from falcon_marshmallow import JSONEnforcer, Marshmallow
+from falcon_marshmallow.middleware import MARSHMALLOW_2
+from falcon_marshmallow.patch import (
+    JSON_PATCH_CONTENT_TYPE,
+    MERGE_PATCH_CONTENT_TYPE,
+    PatchConflict,
+    PatchError,
+    apply_json_patch,
+    apply_merge_patch,
+    apply_patch,
+)
+
+
+class TestJSONPatch:
+    """Test applying JSON Patches, with the examples of RFC 6902"""
+
+    @pytest.mark.parametrize(
+        "document, patch, expected",
+        [
+            (
+                {"foo": "bar"},
+                [{"op": "add", "path": "/baz", "value": "qux"}],
+                {"baz": "qux", "foo": "bar"},
+            ),
+            (
+                {"foo": ["bar", "baz"]},
+                [{"op": "add", "path": "/foo/1", "value": "qux"}],
+                {"foo": ["bar", "qux", "baz"]},
+            ),
+            (
+                {"baz": "qux", "foo": "bar"},
+                [{"op": "remove", "path": "/baz"}],
+                {"foo": "bar"},
+            ),
+            (
+                {"foo": ["bar", "qux", "baz"]},
+                [{"op": "remove", "path": "/foo/1"}],
+                {"foo": ["bar", "baz"]},
+            ),
+            (
+                {"baz": "qux", "foo": "bar"},
+                [{"op": "replace", "path": "/baz", "value": "boo"}],
+                {"baz": "boo", "foo": "bar"},
+            ),
+            (
+                {"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": 1}},
+                [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+                {"foo": {"bar": "baz"}, "qux": {"corge": 1, "thud": "fred"}},
+            ),
+            (
+                {"foo": ["all", "grass", "cows", "eat"]},
+                [{"op": "move", "from": "/foo/1", "path": "/foo/3"}],
+                {"foo": ["all", "cows", "eat", "grass"]},
+            ),
+            (
+                {"foo": "bar"},
+                [{"op": "add", "path": "/child", "value": {"grand": "c"}}],
+                {"foo": "bar", "child": {"grand": "c"}},
+            ),
+            (
+                {"foo": ["bar"]},
+                [{"op": "add", "path": "/foo/-", "value": ["abc", "def"]}],
+                {"foo": ["bar", ["abc", "def"]]},
+            ),
+            (
+                {"/": 0, "m~n": 1},
+                [
+                    {"op": "test", "path": "/~1", "value": 0},
+                    {"op": "copy", "from": "/m~0n", "path": "/a"},
+                ],
+                {"/": 0, "m~n": 1, "a": 1},
+            ),
+            ({"a": 1}, [{"op": "replace", "path": "", "value": [1]}], [1]),
+        ],
+    )
+    def test_apply(self, document, patch, expected):
+        """Operations are applied without modifying the document"""
+        original = copy.deepcopy(document)
+        patched, _ = apply_json_patch(document, patch)
+        assert patched == expected
+        assert document == original
+
+    @pytest.mark.parametrize(
+        "patch",
+        [
+            [{"op": "test", "path": "/baz", "value": "bar"}],
+            [{"op": "test", "path": "/n", "value": True}],
+            [{"op": "add", "path": "/baz/bat", "value": "qux"}],
+            [{"op": "remove", "path": "/missing"}],
+            [{"op": "replace", "path": "/list/2", "value": 1}],
+            [{"op": "add", "path": "/list/01", "value": 1}],
+            [{"op": "add", "path": "/list/\u0661", "value": 1}],
+            [{"op": "add", "path": "/list/\u00b2", "value": 1}],
+            [{"op": "add", "path": "/list/1\n", "value": 1}],
+            [{"op": "add", "path": "/n/x", "value": 1}],
+            [{"op": "move", "from": "/list/0", "path": "/missing/x"}],
+        ],
+    )
+    def test_conflicts(self, patch):
+        """Operations that do not fit the document are conflicts"""
+        document = {"baz": "qux", "n": 1, "list": [1, 2]}
+        with pytest.raises(PatchConflict):
+            apply_json_patch(document, patch)
+        assert document == {"baz": "qux", "n": 1, "list": [1, 2]}
+
+    @pytest.mark.parametrize(
+        "patch",
+        [
+            {"op": "add", "path": "/a", "value": 1},
+            ["add"],
+            [{"op": "frobnicate", "path": "/a"}],
+            [{"op": "add", "path": "/a"}],
+            [{"op": "add", "path": "a", "value": 1}],
+            [{"op": "copy", "path": "/a"}],
+            [{"op": "move", "from": "/a", "path": "/a/b"}],
+        ],
+    )
+    def test_malformed(self, patch):
+        """Malformed patches are errors"""
+        with pytest.raises(PatchError) as exc_info:
+            apply_json_patch({"a": {}}, patch)
+        assert not isinstance(exc_info.value, PatchConflict)
+
+    def test_copies_touched_containers_only(self):
+        """Untouched values are shared with the document"""
+        document = {"big": {"x": list(range(1000))}, "edit": {"a": [1]}}
+        patched, touched = apply_json_patch(
+            document,
+            [
+                {"op": "add", "path": "/edit/a/-", "value": 2},
+                {"op": "add", "path": "/edit/b", "value": 3},
+            ],
+        )
+        assert patched["big"] is document["big"]
+        assert patched["edit"] == {"a": [1, 2], "b": 3}
+        assert document["edit"] == {"a": [1]}
+        assert touched == {"edit"}
+
+
+class TestMergePatch:
+    """Test applying merge patches, with examples of RFC 7396"""
+
+    @pytest.mark.parametrize(
+        "document, patch, expected",
+        [
+            ({"a": "b"}, {"a": "c"}, {"a": "c"}),
+            ({"a": "b"}, {"b": "c"}, {"a": "b", "b": "c"}),
+            ({"a": "b", "b": "c"}, {"a": None}, {"b": "c"}),
+            ({"a": [{"b": "c"}]}, {"a": [1]}, {"a": [1]}),
+            ({"e": None}, {"a": 1}, {"e": None, "a": 1}),
+            ({"a": "foo"}, "bar", "bar"),
+            ({}, {"a": {"bb": {"ccc": None}}}, {"a": {"bb": {}}}),
+            (
+                {"a": {"b": "c", "d": "e"}, "f": {}},
+                {"a": {"d": None}},
+                {"a": {"b": "c"}, "f": {}},
+            ),
+        ],
+    )
+    def test_apply(self, document, patch, expected):
+        """Patches are merged without modifying the document"""
+        original = copy.deepcopy(document)
+        patched = apply_merge_patch(document, patch)
+        assert patched == expected
+        assert document == original
+        if isinstance(patched, dict) and "f" in patched:
+            assert patched["f"] is document["f"]
+
+
+@pytest.mark.parametrize(
+    "content_type, patch",
+    [
+        (
+            JSON_PATCH_CONTENT_TYPE,
+            [
+                {"op": "remove", "path": "/b"},
+                {"op": "replace", "path": "/c/0", "value": 1},
+            ],
+        ),
+        (MERGE_PATCH_CONTENT_TYPE, {"b": None, "c": [1], "d": None}),
+    ],
+)
+def test_apply_patch(content_type, patch):
+    """Results report the touched and removed top-level keys"""
+    result = apply_patch(content_type, {"a": 1, "b": 2, "c": [0]}, patch)
+    assert result.document == {"a": 1, "c": [1]}
+    assert result.touched >= {"b", "c"}
+    assert result.removed == {"b"}
+
+
+def test_apply_patch_replacing_document():
+    """Results report patches replacing the whole document"""
+    result = apply_patch(MERGE_PATCH_CONTENT_TYPE, [1], {"a": 1})
+    assert result == ({"a": 1}, None, frozenset())
+    result = apply_patch(
+        JSON_PATCH_CONTENT_TYPE,
+        {"a": 1},
+        [{"op": "replace", "path": "", "value": {"b": 2}}],
+    )
+    assert result == ({"b": 2}, None, {"a"})
+
+
+class Person(Schema):
+    """A person"""
+
+    id = fields.Integer(dump_only=True)
+    name = fields.String(required=True)
+    email = fields.Email(required=True)
+    nickname = fields.String()
+    age = fields.Integer(validate=validate.Range(min=0))
+
+
+class PersonResource:
+    """A person resource"""
+
+    schema = Person()  # type: Schema
+
+    def __init__(self):
+        """Create a person"""
+        self.document = {"id": 1, "name": "Ada", "email": "ada@example.com"}
+        self.document["nickname"] = "The Enchantress of Numbers"
+        self.patched = None  # type: Any
+
+    def get_patch_target(self, req, params):
+        """Return the current person"""
+        return self.document
+
+    def on_patch(self, req, resp):
+        """Record the patch"""
+        self.patched = (req.context["json"], req.context["patch"])
+        req.context["result"] = req.context["patch"].document
+
+
+class TestMiddleware:
+    """Test applying patches in the middleware"""
+
+    def setup_method(self):
+        """Serve a person"""
+        self.resource = PersonResource()
+        app = API(middleware=[JSONEnforcer(), Marshmallow()])
+        app.add_route("/", self.resource)
+        self.client = testing.TestClient(app)
+
+    def patch(self, body, content_type=JSON_PATCH_CONTENT_TYPE):
+        """Send a patch"""
+        return self.client.simulate_patch(
+            "/",
+            body=json.dumps(body),
+            headers={"Content-Type": content_type + "; charset=UTF-8"},
+        )
+
+    def test_json_patch(self):
+        """Only the touched fields are loaded"""
+        resp = self.patch(
+            [
+                {"op": "test", "path": "/name", "value": "Ada"},
+                {"op": "add", "path": "/age", "value": 36},
+                {"op": "remove", "path": "/nickname"},
+            ]
+        )
+        assert resp.status_code == 200
+        loaded, result = self.resource.patched
+        assert loaded == {"age": 36}
+        assert result.touched == {"age", "nickname"}
+        assert result.removed == {"nickname"}
+        assert resp.json == {
+            "id": 1,
+            "name": "Ada",
+            "email": "ada@example.com",
+            "age": 36,
+        }
+        assert "nickname" in self.resource.document
+
+    def test_merge_patch(self):
+        """Merge patches load the touched fields too"""
+        resp = self.patch(
+            {"email": "ada@lovelace.name", "nickname": None},
+            MERGE_PATCH_CONTENT_TYPE,
+        )
+        assert resp.status_code == 200
+        loaded, result = self.resource.patched
+        assert loaded == {"email": "ada@lovelace.name"}
+        assert result.removed == {"nickname"}
+
+    @pytest.mark.parametrize(
+        "body, status",
+        [
+            ([{"op": "add", "path": "/age", "value": -1}], 422),
+            ([{"op": "remove", "path": "/name"}], 422),
+            ([{"op": "replace", "path": "", "value": {"name": "A"}}], 422),
+            ([{"op": "test", "path": "/name", "value": "Bob"}], 409),
+            ([{"op": "remove", "path": "/age"}], 409),
+            ([{"op": "jump", "path": "/age"}], 400),
+        ],
+    )
+    def test_errors(self, body, status):
+        """Invalid and conflicting patches are rejected"""
+        assert self.patch(body).status_code == status
+
+    def test_without_target(self):
+        """Resources without a patch target ignore patch bodies"""
+
+        class Plain:
+            """A resource without a patch target"""
+
+            schema = Person()
+
+            def on_patch(self, req, resp):
+                """Do nothing"""
+
+        app = API(middleware=[Marshmallow()])
+        app.add_route("/", Plain())
+        resp = testing.TestClient(app).simulate_patch(
+            "/", body="[]", headers={"Content-Type": MERGE_PATCH_CONTENT_TYPE}
+        )
+        assert resp.status_code == 200
+
+    @pytest.mark.skipif(MARSHMALLOW_2, reason="data_key is Marshmallow 3")
+    def test_data_key(self):
+        """Fields are touched by their data key, and partial by name"""
+
+        class Handle(Schema):
+            """A handle, under another key"""
+
+            name = fields.String(required=True)
+            handle = fields.String(required=True, data_key="nick")
+
+        self.resource.schema = Handle()
+        self.resource.document = {"name": "Ada", "nick": "ada"}
+        resp = self.patch([{"op": "replace", "path": "/nick", "value": "al"}])
+        assert resp.status_code == 200
+        assert self.resource.patched[0] == {"handle": "al"}
+        resp = self.patch([{"op": "replace", "path": "/name", "value": "Al"}])
+        assert resp.status_code == 200
+        assert self.resource.patched[0] == {"name": "Al"}
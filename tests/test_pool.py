@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.pool
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import threading
+import time
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, fields, post_load, pre_load
+
+# Local
+from falcon_marshmallow import (
+    Discriminated,
+    FieldProfiler,
+    LoadCache,
+    LoadOptions,
+    Marshmallow,
+    QueryOptions,
+    SchemaPool,
+)
+from falcon_marshmallow.pool import clone_schema
+
+
+class Owner(Schema):
+    """An owner, named from the context"""
+
+    name = fields.Method("get_name")
+
+    def get_name(self, obj):
+        """Return the user in the context"""
+        return self.context.get("user")
+
+
+class Stateful(Schema):
+    """A schema keeping per-call state on the instance"""
+
+    id = fields.Integer(required=True)
+    seen = fields.Integer(dump_only=True)
+    user = fields.Method("get_user")
+    owners = fields.List(fields.Nested(Owner))
+
+    @pre_load
+    def remember(self, data, **kwargs):
+        """Remember the record being loaded, then let others run"""
+        self.current_id = data["id"]
+        time.sleep(0.0005)
+        return data
+
+    @post_load
+    def check(self, data, **kwargs):
+        """Record the remembered id"""
+        data["seen"] = self.current_id
+        data["owners"] = [{}]
+        return data
+
+    def get_user(self, obj):
+        """Return the user in the context"""
+        return self.context.get("user")
+
+
+class TestCloneSchema:
+    """Test copying schemas"""
+
+    def test_isolated(self):
+        """Copies share no fields or context with the original"""
+        sch = Stateful(context={"user": "a"})
+        sch.dump({"id": 1, "owners": [{}]})
+        clone = clone_schema(sch)
+        clone.context["user"] = "b"
+
+        assert clone.dump({"id": 1, "owners": [{}]}) == {
+            "id": 1,
+            "user": "b",
+            "owners": [{"name": "b"}],
+        }
+        assert sch.dump({"id": 1, "owners": [{}]})["owners"] == [{"name": "a"}]
+        for name, field in clone.fields.items():
+            assert field is not sch.fields[name]
+            assert field.parent is clone
+        owners = clone.fields["owners"]
+        assert isinstance(owners, fields.List)
+        assert owners.inner.parent is owners
+
+    def test_discriminated(self):
+        """Polymorphic schemas copy each of their schemas"""
+        sch = Discriminated("type", {"a": Stateful})
+        clone = clone_schema(sch)
+        assert isinstance(clone, Discriminated)
+        assert clone.schemas["a"] is not sch.schemas["a"]
+        assert clone.schemas["a"].fields["id"].parent is clone.schemas["a"]
+
+
+class TestSchemaPool:
+    """Test lending schema copies"""
+
+    def test_checkout(self):
+        """Copies are reused, up to the maximum number kept idle"""
+        pool = SchemaPool(max_idle=1)
+        sch = Stateful(context={"user": "a"})
+        with pool.checkout(sch, {"user": "b"}) as first:
+            with pool.checkout(sch) as second:
+                assert first is not sch and second is not first
+                assert first.context == {"user": "b"}
+                assert second.context == {"user": "a"}
+        # Only the copy checked in first was kept
+        with pool.checkout(sch) as third:
+            assert third is second
+            assert third.context == {"user": "a"}
+        assert pool.clones == 2
+
+    def test_nested_context(self):
+        """Nested schemas see each checkout's context, not the first's"""
+        pool = SchemaPool(max_idle=1)
+        sch = Stateful()
+        with pool.checkout(sch) as first:
+            # The nested schema is first instantiated with no context
+            assert first.dump({"id": 1, "owners": [{}]})["owners"] == [
+                {"name": None}
+            ]
+        with pool.checkout(sch, {"user": "b"}) as second:
+            assert second is first
+            assert second.dump({"id": 1, "owners": [{}]})["owners"] == [
+                {"name": "b"}
+            ]
+
+
+class SetContext:
+    """Set the schema context from a header"""
+
+    def process_request(self, req, resp):
+        """Set the user"""
+        req.context["schema_context"] = {"user": req.get_header("X-User")}
+
+
+class Things:
+    """A resource loading and dumping with a stateful schema"""
+
+    schema = Stateful()
+
+    def on_post(self, req, resp):
+        """Echo the thing"""
+        req.context["result"] = req.context["json"]
+
+
+class TypedOwner(Owner):
+    """An owner, tagged with its type"""
+
+    type = fields.String()
+
+
+class Owners:
+    """A resource loading and dumping polymorphic records"""
+
+    schema = Discriminated("type", {"owner": TypedOwner})
+
+    def on_post(self, req, resp):
+        """Echo the owner"""
+        req.context["result"] = req.context["json"]
+
+
+def test_discriminated_context():
+    """The schemas of polymorphic schemas see each request's context"""
+    app = API(middleware=[SetContext(), Marshmallow(schema_pool=SchemaPool())])
+    app.add_route("/", Owners())
+    client = testing.TestClient(app)
+    for user in ("alice", "bob"):
+        resp = client.simulate_post(
+            "/", body=json.dumps({"type": "owner"}), headers={"X-User": user}
+        )
+        assert resp.json == {"type": "owner", "name": user}
+
+
+def test_concurrent_requests():
+    """Concurrent requests each load and dump with their own copy"""
+    pool = SchemaPool()
+    app = API(middleware=[SetContext(), Marshmallow(schema_pool=pool)])
+    app.add_route("/", Things())
+    client = testing.TestClient(app)
+    failures = []
+
+    def run(thread):
+        """Post things, and check that they come back as posted"""
+        for index in range(25):
+            thing_id = thread * 1000 + index
+            user = "user%d" % thing_id
+            resp = client.simulate_post(
+                "/",
+                body=json.dumps({"id": thing_id}),
+                headers={"X-User": user},
+            )
+            expected = {
+                "id": thing_id,
+                "seen": thing_id,
+                "user": user,
+                "owners": [{"name": user}],
+            }
+            if resp.status_code != 200 or resp.json != expected:
+                failures.append((resp.status_code, resp.text, expected))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    assert 1 <= pool.clones <= 16
+
+
+class Search(Schema):
+    """A query, tagged with the user from the context"""
+
+    q = fields.Method(deserialize="tag")
+
+    def tag(self, value):
+        """Tag the value with the user"""
+        return "%s:%s" % (value, self.context.get("user"))
+
+
+class Searches:
+    """A resource loading query strings and bodies with the context"""
+
+    query_schema = Search()
+    post_request_schema = Search()
+
+    def on_post(self, req, resp):
+        """Echo the query and the body"""
+        req.context["result"] = {
+            "query": req.context["query"]["q"],
+            "body": req.context["json"]["q"],
+        }
+
+
+class ContextFromHeader:
+    """Set the schema context from a header, as JSON"""
+
+    def process_request(self, req, resp):
+        """Set the context"""
+        req.context["schema_context"] = json.loads(req.get_header("X-Ctx"))
+
+
+@pytest.mark.parametrize("load_cache", [None, LoadCache()])
+def test_caches_keyed_by_context(load_cache):
+    """Cached query strings and bodies are not shared between contexts"""
+    app = API(
+        middleware=[
+            ContextFromHeader(),
+            Marshmallow(
+                schema_pool=SchemaPool(),
+                load_options=LoadOptions(load_cache=load_cache),
+                query_options=QueryOptions(cache_size=256),
+            ),
+        ]
+    )
+    app.add_route("/", Searches())
+    client = testing.TestClient(app)
+
+    for context in (
+        {"user": "alice"},
+        {"user": "bob"},
+        {"user": "alice"},
+        {"user": ["carol"]},
+        {"user": ["dave"]},
+    ):
+        user = context["user"]
+        if isinstance(user, list):
+            user = str(user)
+        resp = client.simulate_post(
+            "/",
+            query_string="q=q",
+            body=json.dumps({"q": "b"}),
+            headers={"X-Ctx": json.dumps(context)},
+        )
+        assert resp.json == {"query": "q:%s" % user, "body": "b:%s" % user}
+    if load_cache is not None:
+        # alice's body was loaded once, and unhashable contexts never cached
+        assert (load_cache.hits, load_cache.misses) == (1, 2)
+
+
+def test_profiled():
+    """Pooled copies of profiled schemas are profiled, with their context"""
+    profiler = FieldProfiler()
+    app = API(
+        middleware=[
+            SetContext(),
+            Marshmallow(schema_pool=SchemaPool(), field_profiler=profiler),
+        ]
+    )
+    app.add_route("/", Things())
+    client = testing.TestClient(app)
+    for user in ("alice", "bob"):
+        resp = client.simulate_post(
+            "/", body=json.dumps({"id": 1}), headers={"X-User": user}
+        )
+        assert resp.json["user"] == user
+        assert resp.json["owners"] == [{"name": user}]
+
+    calls = {
+        (stat.field, stat.operation): stat.calls for stat in profiler.report()
+    }
+    assert calls[("user", "serialize")] == 2
+    assert calls[("-", "pre_load remember")] == 2
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.profiling
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import time
+
+# Third party
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, fields, validate, validates
+
+# Local
+from falcon_marshmallow import FieldProfiler, Marshmallow
+
+
+def slow(value):
+    """A slow validator"""
+    time.sleep(0.01)
+
+
+class Address(Schema):
+    """An address schema"""
+
+    city = fields.String(validate=slow)
+
+
+class Person(Schema):
+    """A person schema"""
+
+    name = fields.String(validate=validate.Length(max=10))
+    email = fields.Email()
+    address = fields.Nested(Address)
+    tags = fields.List(fields.String())
+
+    @validates("name")
+    def check_name(self, value, **kwargs):
+        """Check the name"""
+
+
+PERSON = {
+    "name": "Ann",
+    "email": "ann@example.com",
+    "address": {"city": "Paris"},
+    "tags": ["a", "b", "c"],
+}
+
+
+def stats_by_key(profiler):
+    """Return the report as a dict of (field, operation) to stats"""
+    return {(s.field, s.operation): s for s in profiler.report()}
+
+
+class TestFieldProfiler:
+    """Test instrumenting schemas"""
+
+    def test_load(self):
+        """Fields, validators, nested fields and hooks are counted"""
+        profiler = FieldProfiler()
+        sch = profiler.instrument(Person())
+        assert sch.load(PERSON) == PERSON
+        sch.load(PERSON)
+
+        stats = stats_by_key(profiler)
+        assert stats["name", "deserialize"].calls == 2
+        assert stats["name", "validate Length"].calls == 2
+        assert stats["email", "validate Email"].calls == 2
+        assert stats["address.city", "validate slow"].calls == 2
+        assert stats["tags[]", "deserialize"].calls == 6
+        assert stats["-", "validates check_name"].calls == 2
+        assert {s.schema for s in profiler.report()} == {"Person"}
+
+        # Nested time includes the slow validator within it
+        report = profiler.report()
+        assert report[0].field in ("address", "address.city")
+        assert report[0].seconds >= 0.02
+
+    def test_dump_and_reset(self):
+        """Dumps are counted, and statistics may be reset"""
+        profiler = FieldProfiler()
+        sch = profiler.instrument(Person())
+        sch.dump(PERSON)
+        assert stats_by_key(profiler)["email", "serialize"].calls == 1
+
+        profiler.reset()
+        assert profiler.report() == []
+        sch.dump(PERSON)
+        assert stats_by_key(profiler)["email", "serialize"].calls == 1
+
+    def test_instrument_once(self):
+        """Instrumenting a schema again has no effect"""
+        profiler = FieldProfiler()
+        sch = Person()
+        profiler.instrument(sch)
+        profiler.instrument(sch)
+        sch.load(PERSON)
+        assert stats_by_key(profiler)["name", "deserialize"].calls == 1
+
+    def test_nested_in_itself(self):
+        """Schemas nested in themselves are instrumented once"""
+
+        class Node(Schema):
+            name = fields.String()
+            children = fields.List(fields.Nested(lambda: Node()))
+
+        profiler = FieldProfiler()
+        tree = {"name": "a", "children": [{"name": "b", "children": []}]}
+        assert profiler.instrument(Node()).load(tree) == tree
+        stats = stats_by_key(profiler)
+        assert stats["children[]", "deserialize"].calls == 1
+        assert stats["children[].name", "deserialize"].calls == 1
+
+    def test_format_report(self):
+        """The report renders as a table"""
+        profiler = FieldProfiler()
+        profiler.instrument(Person()).load(PERSON)
+        lines = profiler.format_report(limit=3).splitlines()
+        assert len(lines) == 4
+        assert lines[0].split() == [
+            "schema",
+            "field",
+            "operation",
+            "calls",
+            "ms",
+        ]
+
+
+class People:
+    """A resource with a schema"""
+
+    schema = Person()
+
+    def on_post(self, req, resp):
+        """Echo the loaded body"""
+        req.context["result"] = req.context["json"]
+
+
+def test_middleware():
+    """The middleware instruments the schemas it uses"""
+    profiler = FieldProfiler()
+    app = API(middleware=[Marshmallow(field_profiler=profiler)])
+    app.add_route("/people", People())
+    client = testing.TestClient(app)
+
+    resp = client.simulate_post("/people", body=json.dumps(PERSON))
+
+    assert resp.status_code == 200
+    stats = stats_by_key(profiler)
+    assert stats["name", "deserialize"].calls == 1
+    assert stats["name", "serialize"].calls == 1
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.records
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import INCLUDE, Schema, ValidationError, fields, post_load
+
+# Local
+from falcon_marshmallow import LoadOptions, Marshmallow
+from falcon_marshmallow.records import CompactLoader
+
+
+class Reading(Schema):
+    """A reading schema"""
+
+    sensor_id = fields.Integer(data_key="sensorId", required=True)
+    value = fields.Float()
+
+
+class Loose(Reading):
+    """A schema keeping unknown fields"""
+
+    class Meta:
+        """Keep unknown fields"""
+
+        unknown = INCLUDE
+
+
+class Built(Reading):
+    """A schema building its own objects"""
+
+    @post_load
+    def build(self, data, **kwargs):
+        """Return a tuple"""
+        return tuple(sorted(data.items()))
+
+
+class Keyword(Schema):
+    """A schema with a field that cannot be a namedtuple field"""
+
+    cls = fields.String(attribute="class")
+
+
+def readings(count):
+    """Return ``count`` readings"""
+    return [{"sensorId": i, "value": i / 2} for i in range(count)]
+
+
+class TestCompactLoader:
+    """Test loading records as namedtuples"""
+
+    def test_load(self):
+        """Records load as namedtuples, across chunks"""
+        loader = CompactLoader(chunk_size=3)
+        loaded = loader.load(
+            Reading(many=True), readings(7) + [{"sensorId": 7}]
+        )
+
+        assert len(loaded) == 8
+        assert loaded[1].sensor_id == 1
+        assert loaded[1].value == 0.5
+        assert loaded[7].value is None
+        assert type(loaded[0]).__name__ == "ReadingRecord"
+        assert loaded[0]._asdict() == {"sensor_id": 0, "value": 0.0}
+
+    def test_class_cached(self):
+        """Each schema gets one record class"""
+        loader = CompactLoader()
+        sch = Reading(many=True)
+        assert loader.record_class(sch) is loader.record_class(sch)
+
+    @pytest.mark.parametrize("schema_cls", [Loose, Built, Keyword])
+    def test_unsupported(self, schema_cls):
+        """Other schemas load as usual"""
+        sch = schema_cls(many=True)
+        loader = CompactLoader()
+        assert loader.record_class(sch) is None
+        records = [{"sensorId": 1}] if schema_cls is not Keyword else [{}]
+        assert loader.load(sch, records) == sch.load(records)
+
+    def test_errors(self):
+        """Errors are keyed by their index in the whole payload"""
+        records = readings(5) + [{"value": 1}]
+        with pytest.raises(ValidationError) as exc_info:
+            CompactLoader(chunk_size=2).load(Reading(many=True), records)
+        assert list(exc_info.value.messages) == [5]
+
+    def test_wrapped_loader(self):
+        """Chunks may be loaded by another bulk loader"""
+
+        class Recorder:
+            """Record the chunks loaded"""
+
+            chunks = []
+
+            def load(self, sch, records):
+                """Load with the schema"""
+                self.chunks.append(len(records))
+                return sch.load(records)
+
+        loader = CompactLoader(chunk_size=4, loader=Recorder())
+        loaded = loader.load(Reading(many=True), readings(10))
+        assert [r.sensor_id for r in loaded] == list(range(10))
+        assert Recorder.chunks == [4, 4, 2]
+
+
+def test_middleware():
+    """The middleware may load bodies into compact records"""
+
+    class Readings:
+        """A resource loading readings"""
+
+        schema = Reading(many=True)
+
+        def on_post(self, req, resp):
+            """Return the loaded records"""
+            req.context["result"] = req.context["json"]
+
+    app = API(
+        middleware=[
+            Marshmallow(load_options=LoadOptions(bulk_loader=CompactLoader()))
+        ]
+    )
+    app.add_route("/", Readings())
+    resp = testing.TestClient(app).simulate_post(
+        "/", body=json.dumps(readings(3))
+    )
+    assert resp.status_code == 200
+    assert json.loads(resp.text) == readings(3)
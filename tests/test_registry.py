@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.registry
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import threading
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, testing
+from marshmallow import Schema, fields
+from marshmallow.exceptions import RegistryError
+
+# Local
+from falcon_marshmallow import Marshmallow, SchemaRegistry
+
+
+class RegistryThing(Schema):
+    """A schema to reference by name"""
+
+    id = fields.Integer()
+    name = fields.String(required=True)
+
+
+class CountedSchema(Schema):
+    """A schema counting its instantiations"""
+
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        """Count the instantiation"""
+        type(self).instances += 1
+        super(CountedSchema, self).__init__(*args, **kwargs)
+
+
+class TestSchemaRegistry:
+    """Test resolving schema references"""
+
+    def test_instances_pass_through(self):
+        """Schema instances and other objects are returned unchanged"""
+        registry = SchemaRegistry()
+        sch = RegistryThing()
+        other = object()
+        assert registry.resolve(sch) is sch
+        assert registry.resolve(other) is other
+        assert registry.resolve(None) is None
+        assert registry.live == 0
+
+    def test_classes_are_instantiated_once(self):
+        """A schema class is instantiated on first use and then reused"""
+        registry = SchemaRegistry()
+        first = registry.resolve(RegistryThing)
+        assert isinstance(first, RegistryThing)
+        assert registry.resolve(RegistryThing) is first
+        assert registry.live == 1
+        assert registry.live_schemas() == ["RegistryThing"]
+
+    def test_class_registry_names(self):
+        """Unregistered names are looked up in Marshmallow's registry"""
+        registry = SchemaRegistry()
+        assert isinstance(registry.resolve("RegistryThing"), RegistryThing)
+        with pytest.raises(RegistryError):
+            registry.resolve("NoSuchSchema")
+
+    def test_registered_names(self):
+        """Registered names are instantiated with their arguments"""
+        registry = SchemaRegistry()
+        registry.register("things", RegistryThing, many=True)
+        registry.register("thing", "RegistryThing")
+
+        things = registry.resolve("things")
+        assert isinstance(things, RegistryThing)
+        assert things.many
+        assert not registry.resolve("thing").many
+        assert registry.live_schemas() == ["thing", "things"]
+
+        registry.register("things", RegistryThing, only=("id",))
+        assert registry.resolve("things").only == {"id"}
+
+    def test_thread_safe(self):
+        """Concurrent first uses create a single instance"""
+        registry = SchemaRegistry()
+        CountedSchema.instances = 0
+        results = []
+        start = threading.Event()
+
+        def resolve():
+            start.wait()
+            results.append(registry.resolve(CountedSchema))
+
+        threads = [threading.Thread(target=resolve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        assert CountedSchema.instances == 1
+        assert all(result is results[0] for result in results)
+
+
+class TestMarshmallowRegistry:
+    """Test lazily resolved schemas in the Marshmallow middleware"""
+
+    def test_resources_reference_schemas(self):
+        """Resources may use schema classes and names"""
+        registry = SchemaRegistry()
+        registry.register("things", RegistryThing, many=True)
+
+        class Things:
+            """A collection of things"""
+
+            get_schema = "things"
+            post_schema = RegistryThing
+
+            def on_get(self, req, resp):
+                """List things"""
+                req.context["result"] = [{"id": 1, "name": "foo"}]
+
+            def on_post(self, req, resp):
+                """Create a thing"""
+                req.context["result"] = dict(req.context["json"], id=2)
+
+        app = API(middleware=[Marshmallow(schema_registry=registry)])
+        app.add_route("/things", Things())
+        client = testing.TestClient(app)
+        assert registry.live == 0
+
+        resp = client.simulate_get("/things")
+        assert json.loads(resp.text) == [{"id": 1, "name": "foo"}]
+        assert registry.live_schemas() == ["things"]
+
+        resp = client.simulate_post("/things", body=json.dumps({}))
+        assert resp.status_code == 422
+        resp = client.simulate_post("/things", body=json.dumps({"name": "bar"}))
+        assert json.loads(resp.text) == {"id": 2, "name": "bar"}
+        assert registry.live == 2
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.shared_cache
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import multiprocessing
+import sys
+import threading
+import uuid
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # type: ignore
+
+# Third party
+import pytest
+
+# Local
+from falcon_marshmallow import DumpOptions
+from falcon_marshmallow import middleware as mid
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 8) or sys.platform == "win32",
+    reason="shared memory caching requires Python 3.8+ on POSIX",
+)
+
+
+@pytest.fixture()
+def cache_factory(tmpdir):
+    """Return a function creating caches on one fresh segment"""
+    from falcon_marshmallow.shared_cache import SharedMemoryCache
+
+    name = "fm_test_%s" % uuid.uuid4().hex[:12]
+    lock_path = str(tmpdir.join("cache.lock"))
+    caches = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("size", 64 * 1024)
+        kwargs.setdefault("slots", 64)
+        cache = SharedMemoryCache(name=name, lock_path=lock_path, **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield factory
+
+    caches[0].unlink()
+    for cache in caches:
+        cache.close()
+
+
+def _populate(cache, key, value):
+    """Set a value from a child process"""
+    cache.set(key, value)
+
+
+class TestSharedMemoryCache:
+    """Test the shared memory response cache"""
+
+    def test_get_and_set(self, cache_factory):
+        """Values can be stored, replaced, and retrieved"""
+        cache = cache_factory()
+        assert cache.get("a") is None
+
+        cache.set("a", b'{"a": 1}')
+        cache.set("b", b"")
+        assert cache.get("a") == b'{"a": 1}'
+        assert cache.get("b") == b""
+
+        cache.set("a", b'{"a": 2}')
+        assert cache.get("a") == b'{"a": 2}'
+
+    def test_attached_caches_share_entries(self, cache_factory):
+        """A second cache on the same segment sees existing entries"""
+        first = cache_factory()
+        first.set("a", b"1")
+
+        second = cache_factory(size=1, slots=1)  # ignored when attaching
+        assert second.get("a") == b"1"
+        second.set("b", b"2")
+        assert first.get("b") == b"2"
+
+    def test_populated_by_other_process(self, cache_factory):
+        """Entries written by a forked worker are visible to the parent"""
+        cache = cache_factory()
+        ctx = multiprocessing.get_context("fork")
+        proc = ctx.Process(target=_populate, args=(cache, "a", b"from child"))
+        proc.start()
+        proc.join()
+
+        assert proc.exitcode == 0
+        assert cache.get("a") == b"from child"
+
+    def test_resets_when_full(self, cache_factory):
+        """Filling the arena clears old entries rather than failing"""
+        cache = cache_factory(size=64 + 64 * 32 + 4000)
+        value = b"x" * 900
+        for i in range(5):
+            cache.set(str(i), value)
+
+        assert cache.get("0") is None
+        assert cache.get("4") == value
+
+    def test_oversized_values_are_skipped(self, cache_factory):
+        """Values larger than a quarter of the arena are not cached"""
+        cache = cache_factory(size=64 + 64 * 32 + 4000)
+        cache.set("big", b"x" * 2000)
+
+        assert cache.get("big") is None
+
+    def test_attach_waits_for_creator(self, cache_factory):
+        """Attaching to a segment being initialized waits for its header"""
+        from falcon_marshmallow import shared_cache
+
+        first = cache_factory()
+        first.set("a", b"1")
+        magic = bytes(first._buf[:8])
+        first._buf[:8] = bytes(8)
+        timer = threading.Timer(0.05, first._buf.__setitem__, (slice(8), magic))
+        timer.start()
+        try:
+            second = cache_factory()
+        finally:
+            timer.join()
+        assert second.get("a") == b"1"
+
+        first._buf[:8] = bytes(8)
+        with mock.patch.object(shared_cache, "_INIT_TIMEOUT", 0.01):
+            with pytest.raises(ValueError):
+                cache_factory()
+        first._buf[:8] = b"whatever"
+        with pytest.raises(ValueError):
+            cache_factory()
+        first._buf[:8] = magic
+
+    def test_colliding_slots(self, cache_factory):
+        """Keys probing into the same slots are kept apart"""
+        cache = cache_factory(slots=1)
+        for i in range(5):
+            cache.set(str(i), str(i).encode())
+
+        assert cache.get("4") == b"4"
+        assert cache.get("5") is None
+
+
+class TestMarshmallowResponseCache:
+    """Test caching serialized responses in the middleware"""
+
+    def test_hit_skips_serialization(self, cache_factory):
+        """A cached body is used instead of dumping the result"""
+        cache = cache_factory()
+        mw = mid.Marshmallow(dump_options=DumpOptions(response_cache=cache))
+        setattr(mw, "_get_schema", lambda *_, **__: None)
+
+        req = mock.Mock(method="GET")
+        req.context = {"result": {"foo": "bar"}, "cache_key": "foo"}
+        resp = mock.Mock()
+        mw.process_response(req, resp, "foo", True)
+        assert resp.body == '{"foo": "bar"}'
+        assert cache.get("foo") == b'{"foo": "bar"}'
+
+        req.context["result"] = {"foo": "changed"}
+        resp = mock.Mock()
+        mw.process_response(req, resp, "foo", True)
+        assert resp.body == b'{"foo": "bar"}'
+
+    def test_no_key_is_not_cached(self):
+        """Results without a cache key are always serialized"""
+        cache = mock.Mock()
+        mw = mid.Marshmallow(dump_options=DumpOptions(response_cache=cache))
+        setattr(mw, "_get_schema", lambda *_, **__: None)
+
+        req = mock.Mock(method="GET")
+        req.context = {"result": {"foo": "bar"}}
+        resp = mock.Mock()
+        mw.process_response(req, resp, "foo", True)
+
+        assert resp.body == '{"foo": "bar"}'
+        cache.get.assert_not_called()
+        cache.set.assert_not_called()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.shedding
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # type: ignore
+
+# Third party
+import pytest
+from falcon import errors
+from marshmallow import fields, Schema
+
+# Local
+from falcon_marshmallow import middleware as mid
+from falcon_marshmallow.shedding import LoadShedder
+
+
+ROUTE = ("POST", "/things")
+
+
+class TestLoadShedder:
+    """Test the load shedder's bookkeeping"""
+
+    @staticmethod
+    def admit(shedder, content_length):
+        # type: (LoadShedder, int) -> float
+        """Admit a request that must not be shed"""
+        estimate = shedder.admit(ROUTE, content_length)
+        assert estimate is not None
+        return estimate
+
+    def test_admits_when_idle(self):
+        """Nothing is shed while no work is in flight"""
+        shedder = LoadShedder(budget=0.0, min_content_length=0)
+        shedder.finish_load(ROUTE, 100, self.admit(shedder, 100), 10.0)
+
+        assert shedder.admit(ROUTE, 10**9) is not None
+        assert shedder.shed == 0
+
+    def test_sheds_large_requests_over_budget(self):
+        """Large requests are shed once the budget would be exceeded"""
+        shedder = LoadShedder(budget=1.0, min_content_length=1000)
+        # Teach the shedder that this route costs 1ms per byte
+        shedder.finish_load(ROUTE, 1000, self.admit(shedder, 1000), 1.0)
+
+        in_flight = self.admit(shedder, 800)
+        assert in_flight == pytest.approx(0.8)
+        assert shedder.admit(ROUTE, 1000) is None
+        assert shedder.admit(ROUTE, 100) is not None
+        assert shedder.shed == 1
+
+        shedder.finish_load(ROUTE, 800, in_flight, 0.8)
+        shedder.finish_load(ROUTE, 100, 0.1, 0.1)
+        assert shedder.inflight == pytest.approx(0.0)
+        assert shedder.admit(ROUTE, 1000) is not None
+
+    def test_costs_are_smoothed(self):
+        """Cost estimates move towards new measurements"""
+        shedder = LoadShedder(smoothing=0.5)
+        shedder.finish_dump(ROUTE, shedder.start_dump(ROUTE), 1.0)
+        shedder.finish_dump(ROUTE, shedder.start_dump(ROUTE), 3.0)
+
+        assert shedder.costs()[ROUTE] == (0.0, 2.0)
+        assert shedder.inflight == pytest.approx(0.0)
+
+
+class TestMarshmallowShedding:
+    """Test load shedding in the Marshmallow middleware"""
+
+    class FooSchema(Schema):
+        """A trivial schema"""
+
+        foo = fields.String()
+
+    def make_req(self, content_length):
+        """Create a mock request"""
+        req = mock.Mock(
+            method="POST",
+            content_type="application/json",
+            content_length=content_length,
+            uri_template="/things",
+        )
+        req.bounded_stream.read.return_value = '{"foo": "bar"}'
+        req.context = {}
+        return req
+
+    def test_rejects_before_reading_body(self):
+        """Shed requests get a 503 without their bodies being read"""
+        shedder = LoadShedder(budget=0.5, min_content_length=10)
+        mw = mid.Marshmallow(load_shedder=shedder)
+        setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
+        estimate = shedder.admit(ROUTE, 10)
+        assert estimate is not None
+        shedder.finish_load(ROUTE, 10, estimate, 1.0)
+        shedder.admit(ROUTE, 1)  # Something else is in flight
+
+        req = self.make_req(14)
+        with pytest.raises(errors.HTTPServiceUnavailable) as exc_info:
+            mw.process_resource(req, "foo", "foo", {})
+
+        assert exc_info.value.headers["Retry-After"] == "1"
+        req.bounded_stream.read.assert_not_called()
+
+    def test_tracks_load_and_dump_costs(self):
+        """Admitted requests update the route's cost estimates"""
+        shedder = LoadShedder()
+        mw = mid.Marshmallow(load_shedder=shedder)
+        setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
+
+        req = self.make_req(14)
+        mw.process_resource(req, "foo", "foo", {})
+        assert req.context["json"] == {"foo": "bar"}
+
+        req.context["result"] = {"foo": "baz"}
+        resp = mock.Mock()
+        mw.process_response(req, resp, "foo", True)
+        assert resp.body == '{"foo": "baz"}'
+
+        load_cost, dump_cost = shedder.costs()[ROUTE]
+        assert load_cost > 0
+        assert dump_cost > 0
+        assert shedder.inflight == pytest.approx(0.0)
+        assert shedder.admitted == 1
+
+    def test_reading_is_not_a_cost(self):
+        """The time spent reading a body is not counted as loading it"""
+        shedder = LoadShedder()
+        mw = mid.Marshmallow(load_shedder=shedder)
+        setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
+
+        def slow_read(*_):
+            """Read the body from a slow client"""
+            time.sleep(0.05)
+            return '{"foo": "bar"}'
+
+        req = self.make_req(14)
+        req.bounded_stream.read.side_effect = slow_read
+        mw.process_resource(req, "foo", "foo", {})
+
+        assert req.context["json"] == {"foo": "bar"}
+        assert shedder.costs()[ROUTE][0] * 14 < 0.01
+        assert shedder.inflight == pytest.approx(0.0)
+
+    def test_unreadable_body_releases_estimate(self):
+        """Requests whose bodies cannot be read are no longer in flight"""
+        shedder = LoadShedder()
+        mw = mid.Marshmallow(load_shedder=shedder)
+        setattr(mw, "_get_schema", lambda *_, **__: self.FooSchema())
+        estimate = shedder.admit(ROUTE, 14)
+        assert estimate is not None
+        shedder.finish_load(ROUTE, 14, estimate, 1.0)
+
+        req = self.make_req(14)
+        req.get_header.return_value = "gzip"
+        req.bounded_stream.read.return_value = b"not gzip"
+        with pytest.raises(errors.HTTPBadRequest):
+            mw.process_resource(req, "foo", "foo", {})
+
+        assert shedder.inflight == pytest.approx(0.0)
+        assert shedder.costs()[ROUTE][0] == pytest.approx(1.0 / 14)
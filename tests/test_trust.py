@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.trust
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+# Third party
+import pytest
+import simplejson as json
+from falcon import API, Request, testing
+from marshmallow import (
+    Schema,
+    ValidationError,
+    class_registry,
+    fields,
+    validate,
+    validates,
+    validates_schema,
+)
+
+# Local
+from falcon_marshmallow import (
+    Discriminated,
+    FieldProfiler,
+    LoadCache,
+    LoadOptions,
+    Marshmallow,
+    SchemaPool,
+    TrustPolicy,
+)
+from falcon_marshmallow.trust import (
+    trusted_header,
+    trusted_networks,
+    unvalidated_schema,
+)
+
+
+class ShippingAddress(Schema):
+    """A shipping address"""
+
+    zip = fields.String(validate=validate.Length(equal=5))
+
+
+class PurchaseOrder(Schema):
+    """An order, validated every way there is"""
+
+    id = fields.Integer(required=True)
+    quantity = fields.Integer(validate=validate.Range(min=1))
+    address = fields.Nested(ShippingAddress)
+    addresses = fields.List(fields.Nested("ShippingAddress"))
+    parts = fields.List(fields.Nested(lambda: PurchaseOrder()))
+
+    @validates("id")
+    def check_id(self, value, **kwargs):
+        """Reject negative ids"""
+        if value < 0:
+            raise ValidationError("Invalid id")
+
+    @validates_schema
+    def check_order(self, data, **kwargs):
+        """Reject orders of nothing"""
+        if data.get("quantity") == 0:
+            raise ValidationError("Empty order")
+
+
+INVALID = {
+    "id": "-1",
+    "quantity": 0,
+    "address": {"zip": "1"},
+    "addresses": [{"zip": "2"}],
+    "parts": [{"id": -2, "address": {"zip": "3"}}],
+}
+LOADED = dict(INVALID, id=-1)
+
+
+class TestUnvalidatedSchema:
+    """Test copying schemas without their validators"""
+
+    def test_load(self):
+        """Fields, nested fields and hooks are not validated"""
+        sch = PurchaseOrder()
+        assert unvalidated_schema(sch).load(INVALID) == LOADED
+        with pytest.raises(ValidationError) as exc_info:
+            sch.load(INVALID)
+        assert set(exc_info.value.messages) == set(INVALID)
+        assert class_registry.get_class("PurchaseOrder") is PurchaseOrder
+
+    def test_conversion(self):
+        """Types are still converted, and required fields checked"""
+        with pytest.raises(ValidationError) as exc_info:
+            unvalidated_schema(PurchaseOrder()).load({"quantity": "many"})
+        assert exc_info.value.messages == {
+            "id": ["Missing data for required field."],
+            "quantity": ["Not a valid integer."],
+        }
+
+    def test_discriminated(self):
+        """Each schema of a polymorphic schema is copied"""
+        sch = Discriminated("kind", {"order": PurchaseOrder(unknown="exclude")})
+        loaded = unvalidated_schema(sch).load(dict(INVALID, kind="order"))
+        assert loaded == LOADED
+
+
+class TestPredicates:
+    """Test deciding which requests are trusted"""
+
+    def test_header(self):
+        """Requests with the header set to the value are trusted"""
+        is_trusted = trusted_header("X-Client-Verify", "SUCCESS")
+        for value, expected in (("SUCCESS", True), ("FAILED", False)):
+            req = Request(
+                testing.create_environ(headers={"X-Client-Verify": value})
+            )
+            assert is_trusted(req) is expected
+        assert not is_trusted(Request(testing.create_environ()))
+
+    @pytest.mark.parametrize(
+        "address, expected",
+        [("10.1.2.3", True), ("::1", True), ("8.8.8.8", False), ("", False)],
+    )
+    def test_networks(self, address, expected):
+        """Requests from the networks are trusted"""
+        is_trusted = trusted_networks("10.0.0.0/8", "::1")
+        req = Request(testing.create_environ(remote_addr=address))
+        assert is_trusted(req) is expected
+
+
+class Orders:
+    """An orders resource"""
+
+    schema = PurchaseOrder()
+
+    def on_post(self, req, resp):
+        """Record the order"""
+        self.loaded = req.context["json"]
+
+
+class TestMiddleware:
+    """Test loading trusted requests in the middleware"""
+
+    def post(self, policy, trusted, body=INVALID, load_cache=None, **options):
+        """Post an order"""
+        resource = Orders()
+        load_options = LoadOptions(trust_policy=policy, load_cache=load_cache)
+        app = API(
+            middleware=[Marshmallow(load_options=load_options, **options)]
+        )
+        app.add_route("/", resource)
+        headers = {"X-Internal": "yes"} if trusted else {}
+        resp = testing.TestClient(app).simulate_post(
+            "/", body=json.dumps(body), headers=headers
+        )
+        return resp, getattr(resource, "loaded", None)
+
+    @pytest.mark.parametrize(
+        "mode, expected", [("deserialize_only", LOADED), ("skip", INVALID)]
+    )
+    def test_trusted(self, mode, expected):
+        """Trusted bodies are loaded without validation, and counted"""
+        policy = TrustPolicy(trusted_header("X-Internal", "yes"), mode)
+        resp, loaded = self.post(policy, trusted=True)
+        assert resp.status_code == 200
+        assert loaded == expected
+        assert policy.bypassed == 1
+
+        resp, _ = self.post(policy, trusted=False)
+        assert resp.status_code == 422
+        assert policy.bypassed == 1
+
+    def test_pooled(self):
+        """Pooled copies of unvalidated schemas do not validate either"""
+        policy = TrustPolicy(trusted_header("X-Internal", "yes"))
+        resp, loaded = self.post(policy, True, schema_pool=SchemaPool())
+        assert resp.status_code == 200
+        assert loaded == LOADED
+
+    def test_profiled(self):
+        """Unvalidated copies of profiled schemas do not validate either"""
+        policy = TrustPolicy(trusted_header("X-Internal", "yes"))
+        profiler = FieldProfiler()
+        resp, loaded = self.post(policy, True, field_profiler=profiler)
+        assert resp.status_code == 200
+        assert loaded == LOADED
+        assert policy.bypassed == 1
+        operations = {
+            (stat.field, stat.operation) for stat in profiler.report()
+        }
+        assert ("quantity", "deserialize") in operations
+        assert ("quantity", "validate Range") not in operations
+
+    def test_load_cache(self):
+        """Data loaded without validation is not served to others"""
+        policy = TrustPolicy(trusted_header("X-Internal", "yes"))
+        cache = LoadCache()
+        resp, _ = self.post(policy, True, load_cache=cache)
+        assert resp.status_code == 200
+        resp, _ = self.post(policy, False, load_cache=cache)
+        assert resp.status_code == 422
+
+    def test_invalid_mode(self):
+        """Unknown modes are rejected"""
+        with pytest.raises(ValueError):
+            TrustPolicy(trusted_header("X-Internal", "yes"), "trust_me")
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for falcon_marshmallow.validation
+"""
+
+# Std lib
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+from typing import Any, Dict, Set
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # type: ignore
+
+# Third party
+import pytest
+from falcon import API, testing
+from marshmallow import Schema, fields, validate
+
+# Local
+from falcon_marshmallow import (
+    Discriminated,
+    DumpOptions,
+    Marshmallow,
+    ResponseValidator,
+)
+from falcon_marshmallow import validation
+from falcon_marshmallow.validation import response_errors
+
+
+class Account(Schema):
+    """An account"""
+
+    id = fields.Integer(dump_only=True)
+    email = fields.Email(required=True)
+    password = fields.String(required=True, load_only=True)
+    balance = fields.Integer(validate=validate.Range(min=0))
+
+
+class Holder(Schema):
+    """An account holder, with a nested account and dependants"""
+
+    id = fields.Integer(dump_only=True)
+    name = fields.String(required=True, data_key="fullName")
+    account = fields.Nested(Account, data_key="acct")
+    accounts = fields.List(fields.Nested(Account))
+    dependants = fields.List(fields.Nested(lambda: Holder()))
+
+
+VALID = {"id": 1, "email": "ada@example.com", "balance": 0}
+INVALID = {"id": 2, "email": "ada", "balance": -1}
+
+
+class TestResponseErrors:
+    """Test validating dumped data"""
+
+    def test_valid(self):
+        """Dump-only fields are ignored, and load-only fields optional"""
+        assert response_errors(Account(), VALID) == {}
+        assert response_errors(Account(many=True), [VALID]) == {}
+
+    def test_invalid(self):
+        """Data the schema would not load is invalid"""
+        assert set(response_errors(Account(), INVALID)) == {"email", "balance"}
+        errors = response_errors(Account(many=True), [VALID, INVALID])
+        assert list(errors) == [1]
+
+    def test_nested(self):
+        """Nested schemas ignore dump-only and load-only fields as well"""
+        holder = {
+            "id": 1,
+            "fullName": "Ada",
+            "acct": VALID,
+            "accounts": [VALID, VALID],
+            "dependants": [{"id": 2, "fullName": "Byron", "acct": VALID}],
+        }  # type: Dict[str, Any]
+        assert response_errors(Holder(), holder) == {}
+
+        holder["dependants"][0]["acct"] = INVALID
+        errors = response_errors(Holder(), holder)
+        assert set(errors["dependants"][0]["acct"]) == {"email", "balance"}
+
+        del holder["dependants"][0]["fullName"]
+        errors = response_errors(Holder(), holder)
+        assert errors["dependants"][0]["fullName"] == [
+            "Missing data for required field."
+        ]
+
+    @pytest.mark.parametrize(
+        "by_data_key, account", [(True, "acct"), (False, "account")]
+    )
+    def test_partial_paths(self, by_data_key, account):
+        """Nested partial paths use data keys or names, per release"""
+        holder = {
+            "acct": VALID,
+            "accounts": [VALID],
+            "dependants": [{"acct": VALID}],
+        }
+        partial = set()  # type: Set[str]
+        with mock.patch.object(validation, "_PARTIAL_BY_DATA_KEY", by_data_key):
+            validation._loadable(Holder(), holder, "", partial)
+        assert partial == {
+            account + ".password",
+            "accounts.password",
+            "dependants.%s.password" % account,
+        }
+
+
+class TestResponseValidator:
+    """Test sampling and reporting responses"""
+
+    @pytest.mark.parametrize("rate, expected", [(0, False), (1, True)])
+    def test_sample(self, rate, expected):
+        """Responses are sampled at the sample rate"""
+        validator = ResponseValidator(sample_rate=rate)
+        assert validator.sample(Account()) is expected
+
+    def test_discriminated(self):
+        """Polymorphic schemas are never sampled"""
+        validator = ResponseValidator(sample_rate=1)
+        assert not validator.sample(Discriminated("type", {"a": Account}))
+
+    def test_invalid_rate(self):
+        """Sample rates are fractions"""
+        with pytest.raises(ValueError):
+            ResponseValidator(sample_rate=2)
+
+
+class Accounts:
+    """An accounts resource"""
+
+    schema = Account()
+
+    def __init__(self, result):
+        """Return the given result"""
+        self.result = result
+
+    def on_get(self, req, resp):
+        """Return the result"""
+        req.context["result"] = self.result
+
+
+def get(validator, result):
+    """Get a result through the middleware"""
+    app = API(
+        middleware=[
+            Marshmallow(dump_options=DumpOptions(response_validator=validator))
+        ]
+    )
+    app.add_route("/", Accounts(result))
+    return testing.TestClient(app).simulate_get("/")
+
+
+class TestMiddleware:
+    """Test validating responses in the middleware"""
+
+    def test_report(self):
+        """Invalid responses are reported, and sent anyway"""
+        reports = []
+        validator = ResponseValidator(
+            sample_rate=1,
+            reporter=lambda req, sch, messages: reports.append(messages),
+        )
+        assert get(validator, VALID).status_code == 200
+        resp = get(validator, INVALID)
+        assert resp.status_code == 200
+        assert resp.json == INVALID
+        assert len(reports) == 1 and set(reports[0]) == {"email", "balance"}
+        assert (validator.checked, validator.violations) == (2, 1)
+
+    def test_strict(self):
+        """Invalid responses fail in strict mode"""
+        validator = ResponseValidator(sample_rate=1, strict=True)
+        assert get(validator, VALID).status_code == 200
+        assert get(validator, INVALID).status_code == 500
+
+    def test_unsampled(self):
+        """Responses that are not sampled are not checked"""
+        validator = ResponseValidator(sample_rate=0, strict=True)
+        assert get(validator, INVALID).status_code == 200
+        assert validator.checked == 0